@@ -0,0 +1,386 @@
+"""
+Append-only archive of finished games.
+
+An archive is a directory of segments. Each segment holds up to
+segment_games games in two files:
+
+    000000.games  the game records, back to back
+    000000.index  one 64-bit offset into the .games file per game
+
+A game record is a small header (ply count, result, length of the start FEN),
+the start FEN when the game didn't begin from the standard position, and one
+16-bit word per move. Game N lives in segment N // segment_games at the offset
+stored in slot N % segment_games of that segment's index, so random access is
+O(1) and a sequential scan just walks the mapped .games files.
+
+Writers buffer games and write them in batches with one fsync per file per
+batch. Records are written and synced before their index entries, so the index
+is the commit point: after a crash, records past the last indexed game are
+discarded when the archive is reopened for writing.
+
+Add games in UCI or PGN notation and read them back, from the backend directory:
+
+    python archive.py add games/ games.pgn
+    python archive.py show games/ 42
+    python archive.py stats games/
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from game import Game
+
+DATA_MAGIC = b"PCGAMES1"
+INDEX_MAGIC = b"PCINDEX1"
+# Index header: magic and games per segment
+INDEX_HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<Q")
+# Record header: plies, result code, start FEN length in bytes (0 for the standard start)
+GAME_HEADER = struct.Struct("<HBH")
+
+DEFAULT_SEGMENT_GAMES = 1 << 16
+DEFAULT_BATCH_SIZE = 1024
+RESULTS = ["*", "1-0", "0-1", "1/2-1/2"]
+START_FEN = Game().to_fen()
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def encode_move(move: Move) -> int:
+    """Pack a move into 16 bits, 4 per coordinate, for boards up to 16x16."""
+    (x1, y1), (x2, y2) = move
+    if max(x1, y1, x2, y2) >= 16:
+        raise ValueError(f"Move {move} doesn't fit the archive's 16x16 limit")
+    return x1 | (y1 << 4) | (x2 << 8) | (y2 << 12)
+
+
+def decode_move(word: int) -> Move:
+    return (word & 15, (word >> 4) & 15), ((word >> 8) & 15, word >> 12)
+
+
+def encode_game(moves: Sequence[Move], result: str = "*", start_fen: Optional[str] = None) -> bytes:
+    """
+    Encode one game record.
+
+    :param moves: (start_pos, end_pos) pairs
+    :param result: '1-0', '0-1', '1/2-1/2' or '*'
+    :param start_fen: Position the game started from; None for the standard start
+    """
+    fen = b"" if start_fen is None or start_fen == START_FEN else start_fen.encode()
+    words = array("H", [encode_move(move) for move in moves])
+    if sys.byteorder != "little":
+        words.byteswap()
+    return GAME_HEADER.pack(len(words), RESULTS.index(result), len(fen)) + fen + words.tobytes()
+
+
+def _segment_paths(directory: str, segment: int) -> Tuple[str, str]:
+    base = os.path.join(directory, f"{segment:06d}")
+    return base + ".games", base + ".index"
+
+
+def _segment_count(directory: str) -> int:
+    segment = 0
+    while os.path.exists(_segment_paths(directory, segment)[1]):
+        segment += 1
+    return segment
+
+
+class ArchiveWriter:
+    def __init__(self, directory: str, segment_games: int = DEFAULT_SEGMENT_GAMES,
+                 batch_size: int = DEFAULT_BATCH_SIZE, sync: bool = True):
+        """
+        Open an archive for appending, creating it if needed.
+
+        :param segment_games: Games per segment for a new archive; an existing
+                              archive keeps the value it was created with
+        :param batch_size: Games buffered before they are written out
+        :param sync: fsync every batch; turn off for scratch archives
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.batch_size = batch_size
+        self.sync = sync
+        self.segment_games = segment_games
+
+        segments = _segment_count(directory)
+        if segments:
+            with open(_segment_paths(directory, 0)[1], "rb") as f:
+                magic, self.segment_games = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"{directory} is not a game archive")
+            self.segment = segments - 1
+        else:
+            self.segment = 0
+        self._open_segment()
+
+        # Encoded records and their offsets, waiting for the next flush
+        self._records = bytearray()
+        self._offsets: List[int] = []
+
+    def _open_segment(self) -> None:
+        """Open the current segment for appending, dropping records that were never indexed."""
+        data_path, index_path = _segment_paths(self.directory, self.segment)
+        if not os.path.exists(index_path):
+            with open(data_path, "wb") as data, open(index_path, "wb") as index:
+                data.write(DATA_MAGIC)
+                index.write(INDEX_HEADER.pack(INDEX_MAGIC, self.segment_games))
+                self._fsync(data, index)
+            self._fsync_directory()
+
+        self._data = open(data_path, "r+b")
+        self._index = open(index_path, "r+b")
+        index_size = os.fstat(self._index.fileno()).st_size
+        # A torn index write leaves a partial offset at the end
+        self.segment_count = (index_size - INDEX_HEADER.size) // OFFSET.size
+        self._index.truncate(INDEX_HEADER.size + self.segment_count * OFFSET.size)
+
+        if self.segment_count:
+            self._index.seek(-OFFSET.size, os.SEEK_END)
+            last = OFFSET.unpack(self._index.read(OFFSET.size))[0]
+            self._data.seek(last)
+            plies, _, fen_length = GAME_HEADER.unpack(self._data.read(GAME_HEADER.size))
+            end = last + GAME_HEADER.size + fen_length + 2 * plies
+        else:
+            end = len(DATA_MAGIC)
+        self._data.truncate(end)
+        self._data.seek(end)
+        self._index.seek(0, os.SEEK_END)
+        self._data_end = end
+
+    def __len__(self) -> int:
+        """Games in the archive, including buffered ones."""
+        return self.segment * self.segment_games + self.segment_count + len(self._offsets)
+
+    def append(self, moves: Sequence[Move], result: str = "*", start_fen: Optional[str] = None) -> int:
+        """
+        Add a game; see encode_game() for the arguments.
+
+        :return: The game's id, its position in the archive
+        """
+        if self.segment_count + len(self._offsets) == self.segment_games:
+            self.flush()
+            self._data.close()
+            self._index.close()
+            self.segment += 1
+            self._open_segment()
+        game_id = len(self)
+        self._offsets.append(self._data_end + len(self._records))
+        self._records += encode_game(moves, result, start_fen)
+        if len(self._offsets) >= self.batch_size:
+            self.flush()
+        return game_id
+
+    def append_game(self, game, result: str = "*") -> int:
+        """Add a Game with the moves on its move stack."""
+        start = game.fork()
+        for _ in game.move_stack:
+            start.unmake_move()
+        moves = [(start_pos, end_pos) for start_pos, end_pos, _ in game.move_stack]
+        return self.append(moves, result, start.to_fen())
+
+    def flush(self) -> None:
+        """Write buffered games: records first, then their index entries."""
+        if not self._offsets:
+            return
+        self._data.write(self._records)
+        self._fsync(self._data)
+        self._index.write(b"".join(OFFSET.pack(offset) for offset in self._offsets))
+        self._fsync(self._index)
+        self._data_end += len(self._records)
+        self.segment_count += len(self._offsets)
+        self._records = bytearray()
+        self._offsets = []
+
+    def _fsync(self, *files) -> None:
+        for f in files:
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+
+    def _fsync_directory(self) -> None:
+        # New segment files are only durable once their directory entry is
+        if self.sync and hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self) -> None:
+        self.flush()
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _Segment:
+    """Read-only mapping of one segment's files."""
+
+    def __init__(self, directory: str, segment: int):
+        data_path, index_path = _segment_paths(directory, segment)
+        # Index first: writers commit records before their index entries, so
+        # every offset in the mapped index points into the data mapped after it
+        with open(index_path, "rb") as index:
+            self.index = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(data_path, "rb") as data:
+            self.data = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = (len(self.index) - INDEX_HEADER.size) // OFFSET.size
+
+    def offset(self, slot: int) -> int:
+        return OFFSET.unpack_from(self.index, INDEX_HEADER.size + slot * OFFSET.size)[0]
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+
+class GameArchive:
+    """
+    Read access to an archive through mmap. Games appended after opening become
+    visible after refresh().
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        if not _segment_count(directory):
+            raise ValueError(f"{directory} is not a game archive")
+        with open(_segment_paths(directory, 0)[1], "rb") as f:
+            magic, self.segment_games = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC:
+            raise ValueError(f"{directory} is not a game archive")
+        self._segments: List[_Segment] = []
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Map segments and index entries written since the archive was opened."""
+        if self._segments:
+            # Only the last segment can have grown
+            self._segments.pop().close()
+        for segment in range(len(self._segments), _segment_count(self.directory)):
+            self._segments.append(_Segment(self.directory, segment))
+
+    def __len__(self) -> int:
+        if not self._segments:
+            return 0
+        return (len(self._segments) - 1) * self.segment_games + self._segments[-1].count
+
+    def _locate(self, game_id: int) -> Tuple[_Segment, int]:
+        if game_id < 0:
+            game_id += len(self)
+        if not 0 <= game_id < len(self):
+            raise IndexError(f"Game {game_id} is not in the archive")
+        segment = self._segments[game_id // self.segment_games]
+        return segment, segment.offset(game_id % self.segment_games)
+
+    @staticmethod
+    def _decode(data: mmap.mmap, offset: int) -> Tuple[dict, int]:
+        """Decode the record at offset; also return the offset of the next record."""
+        plies, result, fen_length = GAME_HEADER.unpack_from(data, offset)
+        offset += GAME_HEADER.size
+        start_fen = data[offset:offset + fen_length].decode() if fen_length else START_FEN
+        offset += fen_length
+        words = array("H", data[offset:offset + 2 * plies])
+        if sys.byteorder != "little":
+            words.byteswap()
+        record = {'moves': [decode_move(word) for word in words], 'result': RESULTS[result],
+                  'start_fen': start_fen}
+        return record, offset + 2 * plies
+
+    def __getitem__(self, game_id: int) -> dict:
+        """Return {'moves', 'result', 'start_fen'} for a game."""
+        segment, offset = self._locate(game_id)
+        return self._decode(segment.data, offset)[0]
+
+    def __iter__(self) -> Iterator[dict]:
+        """Yield every game in order, reading the record files sequentially."""
+        for segment in list(self._segments):
+            offset = len(DATA_MAGIC)
+            for _ in range(segment.count):
+                record, offset = self._decode(segment.data, offset)
+                yield record
+
+    def replay(self, game_id: int) -> Game:
+        """Return a Game with the archived moves played."""
+        record = self[game_id]
+        game = Game() if record['start_fen'] == START_FEN else Game.from_fen(record['start_fen'])
+        game.apply_moves(record['moves'], validate=False)
+        return game
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Write or read a game archive.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="append games from a PGN file, or one UCI move list per line")
+    add.add_argument("archive")
+    add.add_argument("source")
+    show = commands.add_parser("show", help="print one game in UCI notation")
+    show.add_argument("archive")
+    show.add_argument("game", type=int)
+    stats = commands.add_parser("stats", help="count games and time a full scan")
+    stats.add_argument("archive")
+    args = parser.parse_args()
+
+    from notation import move_from_uci, move_to_uci
+
+    if args.command == "add":
+        from opening_book import read_pgn_games, san_to_move
+
+        with open(args.source) as f:
+            text = f.read()
+        start = time.perf_counter()
+        added = skipped = 0
+        with ArchiveWriter(args.archive) as writer:
+            pgn = args.source.endswith(".pgn")
+            if pgn:
+                games = read_pgn_games(text)
+            else:
+                games = ((line.split(), "*") for line in text.splitlines() if line.strip())
+            for number, (tokens, result) in enumerate(games, 1):
+                game = Game()
+                try:
+                    for token in tokens:
+                        move = san_to_move(game, token) if pgn else move_from_uci(token)
+                        if game.apply_moves([move]) is not None:
+                            raise ValueError(f"Illegal move: {token}")
+                except ValueError as exc:
+                    # Archive only complete games, so replays can trust the moves
+                    print(f"Skipping game {number}: {exc}")
+                    skipped += 1
+                    continue
+                writer.append_game(game, result)
+                added += 1
+        print(f"Added {added} games, skipped {skipped}, in {time.perf_counter() - start:.2f}s")
+    else:
+        with GameArchive(args.archive) as archive:
+            if args.command == "show":
+                record = archive[args.game]
+                print(f"[FEN \"{record['start_fen']}\"] [Result \"{record['result']}\"]")
+                print(" ".join(move_to_uci(move) for move in record['moves']))
+            else:
+                start = time.perf_counter()
+                plies = sum(len(record['moves']) for record in archive)
+                elapsed = time.perf_counter() - start
+                print(f"{len(archive)} games, {plies} plies, scanned in {elapsed:.2f}s")
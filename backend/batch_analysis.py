@@ -0,0 +1,208 @@
+"""
+Batch analysis of many positions across processes without pickling games.
+
+Positions are packed into a multiprocessing.shared_memory block as fixed-size
+records: one byte per square plus one byte for the side to move. Workers map
+the block, decode the records in their index range and write each answer into
+a parallel shared result array, so a task sent to a worker is just a pair of
+indices and the names of the two blocks.
+"""
+
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from board import Board
+from game import Game, FEN_LETTERS
+from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+from search import Searcher
+
+# Square codes: 0 is empty, white pieces 1-6, black pieces 9-14
+PIECE_CODES = {Pawn: 1, Knight: 2, Bishop: 3, Rook: 4, Queen: 5, King: 6}
+CODE_PIECES = {code: cls for cls, code in PIECE_CODES.items()}
+BLACK_FLAG = 8
+
+# Result slot: score (int32) and best move as x1, y1, x2, y2 bytes (255 when there is none)
+RESULT = struct.Struct("<iBBBB")
+NO_SQUARE = 255
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def record_size(width: int = 8, height: int = 8) -> int:
+    """Return the number of bytes one encoded position takes."""
+    return width * height + 1
+
+
+def encode_position(game, buffer, offset: int) -> None:
+    """Write game's placement and side to move into buffer at offset."""
+    board = game.board
+    width = board.width
+    size = width * board.height
+    buffer[offset:offset + size] = bytes(size)
+    for piece in board.iter_pieces():
+        x, y = piece.position
+        code = PIECE_CODES[type(piece)]
+        if piece.color == "black":
+            code |= BLACK_FLAG
+        buffer[offset + y * width + x] = code
+    buffer[offset + size] = 1 if game.turn == "black" else 0
+
+
+def decode_position(buffer, offset: int, width: int = 8, height: int = 8) -> Game:
+    """Build a Game from the record at offset."""
+    board = Board(width, height)
+    counters: Dict[str, int] = {}
+    record = bytes(buffer[offset:offset + width * height + 1])
+    for index in range(width * height):
+        code = record[index]
+        if not code:
+            continue
+        piece_cls = CODE_PIECES[code & ~BLACK_FLAG]
+        color, direction = ("black", "DOWN") if code & BLACK_FLAG else ("white", "UP")
+        prefix = f"{color[0].upper()}{FEN_LETTERS[piece_cls].upper()}"
+        counters[prefix] = counters.get(prefix, 0) + 1
+        piece = piece_cls(f"{prefix}{counters[prefix]}", None, color, direction, (width, height))
+        board.place_piece(piece, (index % width, index // width))
+    game = Game(board)
+    if record[width * height]:
+        game.turn = "black"
+    return game
+
+
+def _evaluate(game, **params) -> Tuple[int, Optional[Move]]:
+    return game.evaluate(), None
+
+
+def _search(game, depth: int = 2, **params) -> Tuple[int, Optional[Move]]:
+    result = Searcher(game).iterative_deepening(depth)
+    return result['score'], result['move']
+
+
+def _in_check(game, **params) -> Tuple[int, Optional[Move]]:
+    return int(game.is_check(game.turn)), None
+
+
+# Operations a worker can run on each position: game -> (score, best move or None)
+OPERATIONS: Dict[str, Callable[..., Tuple[int, Optional[Move]]]] = {
+    "evaluate": _evaluate,
+    "search": _search,
+    "in_check": _in_check,
+}
+
+
+class PositionBatch:
+    """Encoded positions and their results, each in its own shared memory block."""
+
+    def __init__(self, count: int, width: int = 8, height: int = 8):
+        self.count = count
+        self.width = width
+        self.height = height
+        self.record_size = record_size(width, height)
+        self.positions = shared_memory.SharedMemory(create=True, size=max(1, count * self.record_size))
+        self.results = shared_memory.SharedMemory(create=True, size=max(1, count * RESULT.size))
+
+    @classmethod
+    def from_games(cls, games: Sequence['Game']) -> 'PositionBatch':
+        width, height = (games[0].board.width, games[0].board.height) if games else (8, 8)
+        batch = cls(len(games), width, height)
+        try:
+            for index, game in enumerate(games):
+                batch.set_position(index, game)
+        except ValueError:
+            batch.close()
+            raise
+        return batch
+
+    def set_position(self, index: int, game) -> None:
+        """:raises ValueError: If game's board size differs from the batch's"""
+        board = game.board
+        if (board.width, board.height) != (self.width, self.height):
+            raise ValueError(f"Position {index} is {board.width}x{board.height}, "
+                             f"but the batch holds {self.width}x{self.height} boards")
+        encode_position(game, self.positions.buf, index * self.record_size)
+
+    def get_position(self, index: int) -> Game:
+        return decode_position(self.positions.buf, index * self.record_size, self.width, self.height)
+
+    def get_result(self, index: int) -> Tuple[int, Optional[Move]]:
+        score, x1, y1, x2, y2 = RESULT.unpack_from(self.results.buf, index * RESULT.size)
+        move = None if x1 == NO_SQUARE else ((x1, y1), (x2, y2))
+        return score, move
+
+    def close(self) -> None:
+        """Release and unlink both blocks."""
+        for shm in (self.positions, self.results):
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def analyze_range(positions_name: str, results_name: str, width: int, height: int,
+                  start: int, stop: int, operation: str, params: dict) -> int:
+    """
+    Worker entry point: run operation on positions[start:stop] and write the
+    answers into the result block. Returns the number of positions processed.
+    """
+    positions = shared_memory.SharedMemory(name=positions_name)
+    results = shared_memory.SharedMemory(name=results_name)
+    try:
+        func = OPERATIONS[operation]
+        size = record_size(width, height)
+        for index in range(start, stop):
+            game = decode_position(positions.buf, index * size, width, height)
+            score, move = func(game, **params)
+            if move is None:
+                RESULT.pack_into(results.buf, index * RESULT.size, score,
+                                 NO_SQUARE, NO_SQUARE, NO_SQUARE, NO_SQUARE)
+            else:
+                (x1, y1), (x2, y2) = move
+                RESULT.pack_into(results.buf, index * RESULT.size, score, x1, y1, x2, y2)
+        return stop - start
+    finally:
+        positions.close()
+        results.close()
+
+
+def analyze_batch(games: Sequence['Game'], operation: str = "evaluate", workers: Optional[int] = None,
+                  chunk_size: Optional[int] = None, executor: Optional[ProcessPoolExecutor] = None,
+                  **params) -> List[Tuple[int, Optional[Move]]]:
+    """
+    Run operation on every game across a process pool.
+
+    :param games: Positions to analyse; all must share one board size
+    :param operation: Name in OPERATIONS: "evaluate", "search" (takes depth=) or "in_check"
+    :param workers: Number of processes, os.cpu_count() by default
+    :param chunk_size: Positions per task; defaults to about four tasks per worker
+    :param executor: Existing process pool to reuse across calls
+    :return: (score, best move or None) per game, in input order
+    """
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown operation: {operation}")
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, -(-len(games) // (workers * 4)))
+
+    with PositionBatch.from_games(games) as batch:
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [
+                executor.submit(analyze_range, batch.positions.name, batch.results.name,
+                                batch.width, batch.height, start, min(start + chunk_size, len(games)),
+                                operation, params)
+                for start in range(0, len(games), chunk_size)
+            ]
+            for future in futures:
+                future.result()
+        finally:
+            if own_executor:
+                executor.shutdown()
+        return [batch.get_result(index) for index in range(len(games))]
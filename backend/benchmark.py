@@ -0,0 +1,225 @@
+"""
+Micro and macro benchmarks for the game backend.
+
+Run from the backend directory:
+
+    python benchmark.py                 # run and compare against the saved baseline
+    python benchmark.py --save          # run and store the results as the new baseline
+    python benchmark.py --threshold 0.2 # only flag slowdowns above 20%
+
+Exits with status 1 when any benchmark regressed past the threshold.
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from game import Game
+from move_ordering import MoveOrderer, UnorderedMoves
+from search import Searcher
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Positions used by the play_turn and is_checkmate benchmarks, each with a legal move to play
+FIXTURES: Dict[str, Tuple[str, Tuple[Tuple[int, int], Tuple[int, int]]]] = {
+    # 1. e4 e5 2. Nf3 Nc6, white plays Bb5
+    "opening": ("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 0 1", ((5, 0), (1, 4))),
+    # Crowded middlegame, white plays Nxe5
+    "middlegame": ("r2q1rk1/pp2bppp/2n1bn2/2ppp3/4P3/2PP1NP1/PP1N1PBP/R1BQ1RK1 w - - 0 1", ((5, 2), (4, 4))),
+    # Rook endgame, white plays Ra7
+    "endgame": ("8/5pk1/6p1/8/1r6/6P1/R4PK1/8 w - - 0 1", ((0, 1), (0, 6))),
+}
+
+# 64x64 board with a handful of pieces, for the sparse board benchmark
+SPARSE_FEN = "k63/" + "64/" * 62 + "60QRBK w - - 0 1"
+
+# Fool's mate: every white move has to be tried before mate is confirmed
+CHECKMATE_FEN = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w - - 0 1"
+
+
+def measure(func: Callable[[], object], repeat: int, setup: Callable[[], object] = None) -> Dict[str, float]:
+    """
+    Time func repeat times and return per-call statistics in microseconds.
+
+    :param func: Zero-argument callable, or a one-argument callable taking setup()'s result
+    :param repeat: Number of timed calls
+    :param setup: Optional untimed callable run before every call
+    """
+    timings: List[float] = []
+    perf_counter = time.perf_counter
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if setup is None:
+                start = perf_counter()
+                func()
+            else:
+                arg = setup()
+                start = perf_counter()
+                func(arg)
+            timings.append((perf_counter() - start) * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return {
+        "median_us": statistics.median(timings),
+        "min_us": min(timings),
+        "runs": repeat
+    }
+
+
+def memory_per_game(count: int) -> Dict[str, float]:
+    """Return the average number of bytes allocated by one Game()."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [Game() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del games
+    return {"bytes": (after - before) / count}
+
+
+def search_nodes(fen: str, depth: int, orderer: MoveOrderer) -> Dict[str, float]:
+    """Run an iterative deepening search and report its node count and time."""
+    searcher = Searcher(Game.from_fen(fen), orderer)
+    start = time.perf_counter()
+    result = searcher.iterative_deepening(depth)
+    return {
+        "nodes": result["nodes"],
+        "median_us": (time.perf_counter() - start) * 1e6,
+        "depth": depth
+    }
+
+
+def search_time(fen: str, depth: int, packed_moves: bool, repeat: int) -> Dict[str, float]:
+    """Time a fixed-depth search from scratch, generating packed or tuple moves."""
+    return measure(lambda searcher: searcher.search(depth), repeat,
+                   setup=lambda: Searcher(Game.from_fen(fen), packed_moves=packed_moves))
+
+
+def run_benchmarks(repeat: int = 200) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark and return {name: metrics}."""
+    results = {}
+
+    results["game_construction"] = measure(Game, repeat)
+    root = Game()
+    results["game_fork"] = measure(root.fork, repeat)
+
+    for name, (fen, (start, end)) in FIXTURES.items():
+        results[f"play_turn_{name}"] = measure(
+            lambda game: game.play_turn(start, end),
+            repeat,
+            setup=lambda: Game.from_fen(fen)
+        )
+
+    mated = Game.from_fen(CHECKMATE_FEN)
+    assert mated.is_checkmate("white"), "checkmate fixture is not mate"
+    results["is_checkmate_worst_case"] = measure(lambda: mated.is_checkmate("white"), max(repeat // 10, 5))
+
+    game = Game.from_fen(FIXTURES["middlegame"][0])
+    results["get_board_state"] = measure(game.get_board_state, repeat)
+    results["evaluate"] = measure(game.evaluate, repeat)
+
+    sparse = Game.from_fen(SPARSE_FEN, sparse=True)
+    results["move_generation_sparse_64x64"] = measure(
+        lambda: [p.get_valid_moves(sparse.board) for p in sparse.board.iter_pieces()], repeat)
+
+    # Node counts are deterministic, so they are compared instead of time
+    for name, (fen, _) in FIXTURES.items():
+        results[f"search_nodes_{name}"] = search_nodes(fen, 3, MoveOrderer())
+    results["search_nodes_middlegame_unordered"] = search_nodes(FIXTURES["middlegame"][0], 3, UnorderedMoves())
+    # Same tree both ways: the packed path only saves converting moves to tuples
+    for label, packed_moves in (("packed", True), ("tuples", False)):
+        results[f"search_time_middlegame_{label}"] = search_time(
+            FIXTURES["middlegame"][0], 3, packed_moves, max(repeat // 20, 5))
+
+    results["memory_per_game"] = memory_per_game(max(repeat, 50))
+    return results
+
+
+def metric_of(result: Dict[str, float]) -> Tuple[str, float]:
+    """Return the (key, value) pair used to compare a benchmark run-over-run."""
+    if "bytes" in result:
+        return "bytes", result["bytes"]
+    if "nodes" in result:
+        return "nodes", result["nodes"]
+    return "median_us", result["median_us"]
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """
+    Print a comparison table and return the names of regressed benchmarks.
+
+    :param threshold: Allowed relative slowdown, e.g. 0.1 for 10%
+    """
+    regressions = []
+    print(f"{'benchmark':<36}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, result in current.items():
+        key, value = metric_of(result)
+        unit = {"bytes": "B", "nodes": "n"}.get(key, "us")
+        if name not in baseline:
+            print(f"{name:<36}{'-':>14}{value:>12.1f}{unit}{'new':>10}")
+            continue
+        base_value = metric_of(baseline[name])[1]
+        change = (value - base_value) / base_value if base_value else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36}{base_value:>12.1f}{unit}{value:>12.1f}{unit}{change:>+10.1%}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the chess backend.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="JSON file holding the baseline results")
+    parser.add_argument("--save", action="store_true",
+                        help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    parser.add_argument("--repeat", type=int, default=200,
+                        help="timed calls per benchmark (default 200)")
+    parser.add_argument("--output", metavar="FILE",
+                        help="also write this run's results to FILE")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+    else:
+        compare(results, {}, args.threshold)
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed more than {args.threshold:.0%}: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
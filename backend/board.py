@@ -1,5 +1,18 @@
-from typing import Tuple, Optional, List
+import copy
+from bisect import bisect_left, bisect_right, insort
+from typing import Tuple, Optional, List, Dict, Iterator, Collection, Set
 from chess_piece import Chess_Piece
+from pieces import King
+import evaluation
+import zobrist
+
+KNIGHT_OFFSETS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_OFFSETS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+ORTHOGONAL_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+DIAGONAL_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+# Piece classes that slide along each kind of line
+ORTHOGONAL_SLIDERS = ("Rook", "Queen")
+DIAGONAL_SLIDERS = ("Bishop", "Queen")
 
 class Board:
     def __init__(self, width: int = 8, height: int = 8):
@@ -7,6 +20,28 @@ class Board:
         self.height = height
         # Grid is a list of lists, where grid[y][x] holds the piece or None
         self.grid: List[List[Optional['Chess_Piece']]] = [[None for _ in range(width)] for _ in range(height)]
+        # Piece counts per color keyed by class name, e.g. material["white"]["Knight"] == 2
+        self.material: Dict[str, Dict[str, int]] = {"white": {}, "black": {}}
+        # King square per color, kept in sync so check detection doesn't have to search for it
+        self.king_positions: Dict[str, Tuple[int, int]] = {}
+        # Running evaluation sums (white minus black) and game phase, see evaluation.py
+        self.eval_mg = 0
+        self.eval_eg = 0
+        self.phase = 0
+        # Zobrist hash of the piece placement, see zobrist.py
+        self.hash = 0
+        # Copy-on-write state used by fork(). Rows and pieces may be shared with
+        # other boards and are only copied right before this board writes to them.
+        self._owned_rows: List[bool] = [True] * height
+        # Token stamped on pieces this board may mutate in place
+        self._owner = object()
+        # id(shared piece) -> (shared piece, private copy made by this board)
+        self._clones: Dict[int, Tuple['Chess_Piece', 'Chess_Piece']] = {}
+        # Optional attack maps, see enable_attack_maps(): per color, target square ->
+        # squares of that color's pieces attacking it; and occupied square -> the
+        # squares its piece attacks
+        self.attack_maps: Optional[Dict[str, Dict[Tuple[int, int], Set[Tuple[int, int]]]]] = None
+        self._attacks_from: Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]] = {}
 
     def is_valid_position(self, position: Tuple[int, int]) -> bool:
         x, y = position
@@ -18,25 +53,127 @@ class Board:
         x, y = position
         return self.grid[y][x]
 
+    def iter_pieces(self, color: Optional[str] = None) -> Iterator['Chess_Piece']:
+        """Yield every piece on the board, optionally only those of the given color."""
+        for row in self.grid:
+            for piece in row:
+                if piece and (color is None or piece.color == color):
+                    yield piece
+
+    def fork(self) -> 'Board':
+        """
+        Return a copy of the board that shares rows and pieces with this one.
+
+        Neither board copies anything up front; a row or piece is copied the first
+        time either board writes to it. Piece references fetched before the fork
+        should be looked up again afterwards.
+        """
+        clone = type(self).__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.grid = list(self.grid)
+        clone.material = {color: dict(counts) for color, counts in self.material.items()}
+        clone.king_positions = dict(self.king_positions)
+        self._fork_attack_maps(clone)
+        # Both sides now treat every existing row and piece as shared
+        for board in (self, clone):
+            board._owned_rows = [False] * self.height
+            board._owner = object()
+            board._clones = {}
+        return clone
+
+    def _fork_attack_maps(self, clone: 'Board'):
+        if self.attack_maps is not None:
+            clone.attack_maps = {color: {square: set(attackers) for square, attackers in targets.items()}
+                                 for color, targets in self.attack_maps.items()}
+            clone._attacks_from = dict(self._attacks_from)
+
+    def _set_square(self, x: int, y: int, piece: Optional['Chess_Piece']):
+        if not self._owned_rows[y]:
+            self.grid[y] = list(self.grid[y])
+            self._owned_rows[y] = True
+        old = self.grid[y][x]
+        self.grid[y][x] = piece
+        if self.attack_maps is not None:
+            self._update_attacks((x, y), old, piece)
+
+    def _writable(self, piece: 'Chess_Piece') -> 'Chess_Piece':
+        """Return the version of piece this board may mutate, copying it if it is shared."""
+        owner = getattr(piece, "_owner", None)
+        if owner is self._owner:
+            return piece
+        if owner is None:
+            # Fresh piece that no board has seen yet
+            piece._owner = self._owner
+            return piece
+
+        entry = self._clones.get(id(piece))
+        if entry is not None and entry[0] is piece:
+            return entry[1]
+
+        clone = copy.copy(piece)
+        clone._owner = self._owner
+        self._clones[id(piece)] = (piece, clone)
+        if piece.position and self.get_piece_at(piece.position) is piece:
+            self._set_square(piece.position[0], piece.position[1], clone)
+        return clone
+
+    def _toggle_piece(self, piece: 'Chess_Piece', position: Tuple[int, int], sign: int):
+        """Add (sign=1) or remove (sign=-1) the evaluation and hash terms of piece on position."""
+        mg, eg = evaluation.piece_square_score(piece, position, (self.width, self.height))
+        self.eval_mg += sign * mg
+        self.eval_eg += sign * eg
+        self.hash ^= zobrist.piece_key(piece, position)
+
+    def _add_material(self, piece: 'Chess_Piece'):
+        counts = self.material[piece.color]
+        name = piece.__class__.__name__
+        counts[name] = counts.get(name, 0) + 1
+        self.phase += evaluation.phase_weight(piece)
+
+    def _remove_material(self, piece: 'Chess_Piece'):
+        """Forget a piece leaving the board. Its position must still be its square."""
+        counts = self.material[piece.color]
+        name = piece.__class__.__name__
+        counts[name] -= 1
+        if not counts[name]:
+            del counts[name]
+        self.phase -= evaluation.phase_weight(piece)
+        self._toggle_piece(piece, piece.position, -1)
+        if isinstance(piece, King) and self.king_positions.get(piece.color) == piece.position:
+            del self.king_positions[piece.color]
+
     def place_piece(self, piece: 'Chess_Piece', position: Tuple[int, int]):
         if not self.is_valid_position(position):
             raise ValueError(f"Invalid position: {position}")
         
+        piece = self._writable(piece)
+
         # If piece is already on board, remove it from old position
-        if piece.position:
+        if piece.position and self.get_piece_at(piece.position) is piece:
             old_x, old_y = piece.position
-            self.grid[old_y][old_x] = None
+            self._toggle_piece(piece, piece.position, -1)
+            self._set_square(old_x, old_y, None)
+        else:
+            self._add_material(piece)
 
         x, y = position
         # If there's a piece at the new position, it's being captured (logic handled by Game/Piece, but Board just overwrites)
-        self.grid[y][x] = piece
+        captured = self.get_piece_at(position)
+        if captured and captured is not piece:
+            self._remove_material(captured)
+        self._set_square(x, y, piece)
         piece.place(position) # Update piece's internal state
+        self._toggle_piece(piece, position, 1)
+        if isinstance(piece, King):
+            self.king_positions[piece.color] = position
 
     def remove_piece(self, piece: 'Chess_Piece'):
         if piece.position:
+            piece = self._writable(piece)
             x, y = piece.position
-            if self.grid[y][x] == piece:
-                self.grid[y][x] = None
+            if self.get_piece_at((x, y)) is piece:
+                self._set_square(x, y, None)
+                self._remove_material(piece)
             piece.remove()
 
     def move_piece(self, piece: 'Chess_Piece', new_position: Tuple[int, int]):
@@ -45,12 +182,204 @@ class Board:
         
         self.place_piece(piece, new_position)
 
+    def slide_targets(self, position: Tuple[int, int], dx: int, dy: int, color: str) -> List[Tuple[int, int]]:
+        """
+        Return the squares a slider of the given color reaches from position along
+        (dx, dy): every empty square up to the first blocker, plus the blocker
+        itself if it belongs to the opponent.
+        """
+        targets = []
+        x, y = position
+        x += dx
+        y += dy
+        while 0 <= x < self.width and 0 <= y < self.height:
+            piece = self.grid[y][x]
+            if piece:
+                if piece.color != color:
+                    targets.append((x, y))
+                break
+            targets.append((x, y))
+            x += dx
+            y += dy
+        return targets
+
+    def first_piece_along(self, position: Tuple[int, int], dx: int, dy: int,
+                          ignore: Collection[Tuple[int, int]] = ()) -> Optional[Tuple[int, int]]:
+        """
+        Return the square of the first piece met walking from position along
+        (dx, dy), treating squares in ignore as empty, or None at the board edge.
+        """
+        x, y = position
+        x += dx
+        y += dy
+        while 0 <= x < self.width and 0 <= y < self.height:
+            if self.grid[y][x] and (x, y) not in ignore:
+                return (x, y)
+            x += dx
+            y += dy
+        return None
+
+    def enable_attack_maps(self):
+        """
+        Start maintaining, for every square, which pieces of each color attack it.
+        Every later change updates only the pieces on the changed squares and the
+        sliders whose lines cross them, and attackers_to/is_attacked become lookups.
+        """
+        self.attack_maps = {"white": {}, "black": {}}
+        self._attacks_from = {}
+        for piece in list(self.iter_pieces()):
+            self._add_attacks(piece.position, piece)
+
+    def disable_attack_maps(self):
+        self.attack_maps = None
+        self._attacks_from = {}
+
+    def attack_count(self, position: Tuple[int, int], color: str) -> int:
+        """Return how many pieces of color attack position."""
+        if self.attack_maps is not None:
+            return len(self.attack_maps[color].get(position, ()))
+        return len(self.attackers_to(position, color))
+
+    def _attacked_squares(self, position: Tuple[int, int], piece: 'Chess_Piece') -> List[Tuple[int, int]]:
+        """Return every square piece on position attacks, whatever stands there."""
+        x, y = position
+        name = piece.__class__.__name__
+        if name == "Pawn":
+            dy = 1 if piece.direction == "UP" else -1
+            squares = [(x - 1, y + dy), (x + 1, y + dy)]
+        elif name in ("Knight", "King"):
+            offsets = KNIGHT_OFFSETS if name == "Knight" else KING_OFFSETS
+            squares = [(x + dx, y + dy) for dx, dy in offsets]
+        else:
+            squares = []
+            for directions, sliders in ((ORTHOGONAL_DIRECTIONS, ORTHOGONAL_SLIDERS),
+                                        (DIAGONAL_DIRECTIONS, DIAGONAL_SLIDERS)):
+                if name not in sliders:
+                    continue
+                for dx, dy in directions:
+                    blocker = self.first_piece_along(position, dx, dy)
+                    if blocker is not None:
+                        distance = max(abs(blocker[0] - x), abs(blocker[1] - y))
+                    else:
+                        # Distance to the edge of the board along the ray
+                        limits = []
+                        if dx:
+                            limits.append(self.width - 1 - x if dx > 0 else x)
+                        if dy:
+                            limits.append(self.height - 1 - y if dy > 0 else y)
+                        distance = min(limits)
+                    squares.extend((x + dx * i, y + dy * i) for i in range(1, distance + 1))
+            return squares
+        return [square for square in squares if self.is_valid_position(square)]
+
+    def _add_attacks(self, position: Tuple[int, int], piece: 'Chess_Piece'):
+        targets = self.attack_maps[piece.color]
+        squares = tuple(self._attacked_squares(position, piece))
+        self._attacks_from[position] = squares
+        for square in squares:
+            attackers = targets.get(square)
+            if attackers is None:
+                targets[square] = {position}
+            else:
+                attackers.add(position)
+
+    def _remove_attacks(self, position: Tuple[int, int], color: str):
+        targets = self.attack_maps[color]
+        for square in self._attacks_from.pop(position, ()):
+            attackers = targets[square]
+            attackers.discard(position)
+            if not attackers:
+                del targets[square]
+
+    def _update_attacks(self, position: Tuple[int, int], old: Optional['Chess_Piece'],
+                        new: Optional['Chess_Piece']):
+        """Bring the attack maps up to date after the piece on position changed from old to new."""
+        if old is not None and new is not None and type(old) is type(new) and old.color == new.color:
+            # Same kind of piece, e.g. a copy-on-write clone: nothing moved
+            return
+        if old is not None:
+            self._remove_attacks(position, old.color)
+        # Sliders reaching this square now stop earlier or see further
+        for color, targets in self.attack_maps.items():
+            for square in list(targets.get(position, ())):
+                slider = self.get_piece_at(square)
+                if slider.__class__.__name__ in ORTHOGONAL_SLIDERS + DIAGONAL_SLIDERS:
+                    self._remove_attacks(square, color)
+                    self._add_attacks(square, slider)
+        if new is not None:
+            self._add_attacks(position, new)
+
+    def _iter_attackers(self, position: Tuple[int, int], color: str,
+                        ignore: Collection[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+        x, y = position
+
+        def piece_on(square):
+            if square in ignore or not self.is_valid_position(square):
+                return None
+            piece = self.get_piece_at(square)
+            return piece if piece and piece.color == color else None
+
+        # Pawns capture one step forward diagonally, so look one step backwards
+        for dx in (-1, 1):
+            for dy, direction in ((-1, "UP"), (1, "DOWN")):
+                square = (x + dx, y + dy)
+                piece = piece_on(square)
+                if piece and piece.__class__.__name__ == "Pawn" and piece.direction == direction:
+                    yield square
+        for offsets, name in ((KNIGHT_OFFSETS, "Knight"), (KING_OFFSETS, "King")):
+            for dx, dy in offsets:
+                square = (x + dx, y + dy)
+                piece = piece_on(square)
+                if piece and piece.__class__.__name__ == name:
+                    yield square
+        for directions, sliders in ((ORTHOGONAL_DIRECTIONS, ORTHOGONAL_SLIDERS),
+                                    (DIAGONAL_DIRECTIONS, DIAGONAL_SLIDERS)):
+            for dx, dy in directions:
+                square = self.first_piece_along(position, dx, dy, ignore)
+                if square:
+                    piece = piece_on(square)
+                    if piece and piece.__class__.__name__ in sliders:
+                        yield square
+
+    def attackers_to(self, position: Tuple[int, int], color: str,
+                     ignore: Collection[Tuple[int, int]] = ()) -> List[Tuple[int, int]]:
+        """
+        Return the squares of all pieces of color that attack position.
+        Works outwards from the target square instead of generating every move.
+
+        :param ignore: Squares to treat as empty, e.g. pieces already traded off in an exchange
+        """
+        if self.attack_maps is None:
+            return list(self._iter_attackers(position, color, ignore))
+        attackers = [square for square in self.attack_maps[color].get(position, ()) if square not in ignore]
+        x, y = position
+        for ix, iy in ignore:
+            # Sliders lined up behind an ignored piece now see through it
+            dx, dy = ix - x, iy - y
+            if (dx, dy) == (0, 0) or (dx and dy and abs(dx) != abs(dy)):
+                continue
+            step = ((dx > 0) - (dx < 0), (dy > 0) - (dy < 0))
+            square = self.first_piece_along(position, step[0], step[1], ignore)
+            if square is None or square in attackers:
+                continue
+            piece = self.get_piece_at(square)
+            sliders = ORTHOGONAL_SLIDERS if 0 in step else DIAGONAL_SLIDERS
+            if piece.color == color and piece.__class__.__name__ in sliders:
+                attackers.append(square)
+        return attackers
+
+    def is_attacked(self, position: Tuple[int, int], color: str) -> bool:
+        """Return True if any piece of color attacks position."""
+        if self.attack_maps is not None:
+            return bool(self.attack_maps[color].get(position))
+        return next(self._iter_attackers(position, color, ()), None) is not None
+
     def __str__(self):
         board_str = ""
         for y in range(self.height - 1, -1, -1):
             row_str = f"{y} "
             for x in range(self.width):
-                piece = self.grid[y][x]
+                piece = self.get_piece_at((x, y))
                 if piece:
                     # Simple representation: First letter of class name + color (W/B)
                     # e.g., PW (Pawn White), KB (King Black)
@@ -64,3 +393,137 @@ class Board:
             board_str += row_str + "\n"
         board_str += "   " + " ".join([f" {x}  " for x in range(self.width)])
         return board_str
+
+
+
+class SparseBoard(Board):
+    """
+    Board that stores only occupied squares, for large custom board sizes.
+
+    Pieces live in a dict keyed by position. Every rank, file and diagonal keeps
+    a sorted list of its occupied coordinates, so sliders find their nearest
+    blocker with a binary search and memory scales with the number of pieces
+    rather than the board area.
+    """
+
+    def __init__(self, width: int = 8, height: int = 8):
+        # Initialise the shared bookkeeping without allocating a dense grid
+        super().__init__(0, 0)
+        self.width = width
+        self.height = height
+        self.grid = None
+        self.squares: Dict[Tuple[int, int], 'Chess_Piece'] = {}
+        # Occupied x per rank, y per file, and x per diagonal (x - y) / anti-diagonal (x + y)
+        self.rows: Dict[int, List[int]] = {}
+        self.cols: Dict[int, List[int]] = {}
+        self.diagonals: Dict[int, List[int]] = {}
+        self.anti_diagonals: Dict[int, List[int]] = {}
+
+    def get_piece_at(self, position: Tuple[int, int]) -> Optional['Chess_Piece']:
+        x, y = position
+        return self.squares.get((x, y))
+
+    def iter_pieces(self, color: Optional[str] = None) -> Iterator['Chess_Piece']:
+        for piece in list(self.squares.values()):
+            if color is None or piece.color == color:
+                yield piece
+
+    def fork(self) -> 'SparseBoard':
+        """Return a copy sharing the pieces copy-on-write; the occupancy index is copied."""
+        clone = type(self).__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.squares = dict(self.squares)
+        for name in ("rows", "cols", "diagonals", "anti_diagonals"):
+            setattr(clone, name, {key: list(line) for key, line in getattr(self, name).items()})
+        clone.material = {color: dict(counts) for color, counts in self.material.items()}
+        clone.king_positions = dict(self.king_positions)
+        self._fork_attack_maps(clone)
+        for board in (self, clone):
+            board._owner = object()
+            board._clones = {}
+        return clone
+
+    def _lines(self, x: int, y: int):
+        return (
+            (self.rows, y, x),
+            (self.cols, x, y),
+            (self.diagonals, x - y, x),
+            (self.anti_diagonals, x + y, x),
+        )
+
+    def _set_square(self, x: int, y: int, piece: Optional['Chess_Piece']):
+        old = self.squares.get((x, y))
+        if piece is None:
+            if old is not None:
+                del self.squares[(x, y)]
+                for index, key, coord in self._lines(x, y):
+                    line = index[key]
+                    del line[bisect_left(line, coord)]
+                    if not line:
+                        del index[key]
+        else:
+            self.squares[(x, y)] = piece
+            if old is None:
+                for index, key, coord in self._lines(x, y):
+                    insort(index.setdefault(key, []), coord)
+        if self.attack_maps is not None:
+            self._update_attacks((x, y), old, piece)
+
+    def _line(self, x: int, y: int, dx: int, dy: int):
+        """Return the occupancy list of the line through (x, y) along (dx, dy), the
+        coordinate of (x, y) in it and the step direction along it."""
+        if dy == 0:
+            return self.rows.get(y), x, dx
+        if dx == 0:
+            return self.cols.get(x), y, dy
+        if dx == dy:
+            return self.diagonals.get(x - y), x, dx
+        return self.anti_diagonals.get(x + y), x, dx
+
+    def first_piece_along(self, position: Tuple[int, int], dx: int, dy: int,
+                          ignore: Collection[Tuple[int, int]] = ()) -> Optional[Tuple[int, int]]:
+        x, y = position
+        line, coord, step = self._line(x, y, dx, dy)
+        if not line:
+            return None
+        i = bisect_right(line, coord) if step > 0 else bisect_left(line, coord) - 1
+        while 0 <= i < len(line):
+            distance = abs(line[i] - coord)
+            square = (x + dx * distance, y + dy * distance)
+            if square not in ignore:
+                return square
+            i += step
+        return None
+
+    def slide_targets(self, position: Tuple[int, int], dx: int, dy: int, color: str) -> List[Tuple[int, int]]:
+        x, y = position
+        line, coord, step = self._line(x, y, dx, dy)
+
+        # Distance to the edge of the board along the ray
+        limits = []
+        if dx:
+            limits.append(self.width - 1 - x if dx > 0 else x)
+        if dy:
+            limits.append(self.height - 1 - y if dy > 0 else y)
+        distance = min(limits)
+
+        # Nearest occupied coordinate in the direction of travel
+        blocker = None
+        if line:
+            if step > 0:
+                i = bisect_right(line, coord)
+                if i < len(line):
+                    blocker = line[i]
+            else:
+                i = bisect_left(line, coord) - 1
+                if i >= 0:
+                    blocker = line[i]
+
+        if blocker is not None:
+            distance = abs(blocker - coord)
+            end = (x + dx * distance, y + dy * distance)
+            targets = [(x + dx * i, y + dy * i) for i in range(1, distance)]
+            if self.squares[end].color != color:
+                targets.append(end)
+            return targets
+        return [(x + dx * i, y + dy * i) for i in range(1, distance + 1)]
@@ -0,0 +1,251 @@
+"""
+Static evaluation: material plus piece-square tables, tapered between a
+middlegame and an endgame score by game phase.
+
+Board keeps the running middlegame/endgame sums and the phase up to date in
+place_piece/remove_piece/move_piece, so evaluate() never scans the board.
+"""
+
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Material values in centipawns, (middlegame, endgame)
+PIECE_VALUES: Dict[str, Tuple[int, int]] = {
+    "Pawn": (82, 94),
+    "Knight": (337, 281),
+    "Bishop": (365, 297),
+    "Rook": (477, 512),
+    "Queen": (1025, 936),
+    "King": (0, 0),
+}
+
+# Contribution of each piece to the game phase; the start position sums to MAX_PHASE
+PHASE_WEIGHTS: Dict[str, int] = {"Pawn": 0, "Knight": 1, "Bishop": 1, "Rook": 2, "Queen": 4, "King": 0}
+MAX_PHASE = 24
+
+# Piece-square tables for an 8x8 board, from the owner's point of view.
+# The first row is the far rank (rank 8 for white), the last row the home rank.
+_MG_TABLES: Dict[str, List[int]] = {
+    "Pawn": [
+          0,   0,   0,   0,   0,   0,   0,   0,
+         98, 134,  61,  95,  68, 126,  34, -11,
+         -6,   7,  26,  31,  65,  56,  25, -20,
+        -14,  13,   6,  21,  23,  12,  17, -23,
+        -27,  -2,  -5,  12,  17,   6,  10, -25,
+        -26,  -4,  -4, -10,   3,   3,  33, -12,
+        -35,  -1, -20, -23, -15,  24,  38, -22,
+          0,   0,   0,   0,   0,   0,   0,   0,
+    ],
+    "Knight": [
+        -167, -89, -34, -49,  61, -97, -15, -107,
+         -73, -41,  72,  36,  23,  62,   7,  -17,
+         -47,  60,  37,  65,  84, 129,  73,   44,
+          -9,  17,  19,  53,  37,  69,  18,   22,
+         -13,   4,  16,  13,  28,  19,  21,   -8,
+         -23,  -9,  12,  10,  19,  17,  25,  -16,
+         -29, -53, -12,  -3,  -1,  18, -14,  -19,
+        -105, -21, -58, -33, -17, -28, -19,  -23,
+    ],
+    "Bishop": [
+        -29,   4, -82, -37, -25, -42,   7,  -8,
+        -26,  16, -18, -13,  30,  59,  18, -47,
+        -16,  37,  43,  40,  35,  50,  37,  -2,
+         -4,   5,  19,  50,  37,  37,   7,  -2,
+         -6,  13,  13,  26,  34,  12,  10,   4,
+          0,  15,  15,  15,  14,  27,  18,  10,
+          4,  15,  16,   0,   7,  21,  33,   1,
+        -33,  -3, -14, -21, -13, -12, -39, -21,
+    ],
+    "Rook": [
+         32,  42,  32,  51,  63,   9,  31,  43,
+         27,  32,  58,  62,  80,  67,  26,  44,
+         -5,  19,  26,  36,  17,  45,  61,  16,
+        -24, -11,   7,  26,  24,  35,  -8, -20,
+        -36, -26, -12,  -1,   9,  -7,   6, -23,
+        -45, -25, -16, -17,   3,   0,  -5, -33,
+        -44, -16, -20,  -9,  -1,  11,  -6, -71,
+        -19, -13,   1,  17,  16,   7, -37, -26,
+    ],
+    "Queen": [
+        -28,   0,  29,  12,  59,  44,  43,  45,
+        -24, -39,  -5,   1, -16,  57,  28,  54,
+        -13, -17,   7,   8,  29,  56,  47,  57,
+        -27, -27, -16, -16,  -1,  17,  -2,   1,
+         -9, -26,  -9, -10,  -2,  -4,   3,  -3,
+        -14,   2, -11,  -2,  -5,   2,  14,   5,
+        -35,  -8,  11,   2,   8,  15,  -3,   1,
+         -1, -18,  -9,  10, -15, -25, -31, -50,
+    ],
+    "King": [
+        -65,  23,  16, -15, -56, -34,   2,  13,
+         29,  -1, -20,  -7,  -8,  -4, -38, -29,
+         -9,  24,   2, -16, -20,   6,  22, -22,
+        -17, -20, -12, -27, -30, -25, -14, -36,
+        -49,  -1, -27, -39, -46, -44, -33, -51,
+        -14, -14, -22, -46, -44, -30, -15, -27,
+          1,   7,  -8, -64, -43, -16,   9,   8,
+        -15,  36,  12, -54,   8, -28,  24,  14,
+    ],
+}
+
+_EG_TABLES: Dict[str, List[int]] = {
+    "Pawn": [
+          0,   0,   0,   0,   0,   0,   0,   0,
+        178, 173, 158, 134, 147, 132, 165, 187,
+         94, 100,  85,  67,  56,  53,  82,  84,
+         32,  24,  13,   5,  -2,   4,  17,  17,
+         13,   9,  -3,  -7,  -7,  -8,   3,  -1,
+          4,   7,  -6,   1,   0,  -5,  -1,  -8,
+         13,   8,   8,  10,  13,   0,   2,  -7,
+          0,   0,   0,   0,   0,   0,   0,   0,
+    ],
+    "Knight": [
+        -58, -38, -13, -28, -31, -27, -63, -99,
+        -25,  -8, -25,  -2,  -9, -25, -24, -52,
+        -24, -20,  10,   9,  -1,  -9, -19, -41,
+        -17,   3,  22,  22,  22,  11,   8, -18,
+        -18,  -6,  16,  25,  16,  17,   4, -18,
+        -23,  -3,  -1,  15,  10,  -3, -20, -22,
+        -42, -20, -10,  -5,  -2, -20, -23, -44,
+        -29, -51, -23, -15, -22, -18, -50, -64,
+    ],
+    "Bishop": [
+        -14, -21, -11,  -8,  -7,  -9, -17, -24,
+         -8,  -4,   7, -12,  -3, -13,  -4, -14,
+          2,  -8,   0,  -1,  -2,   6,   0,   4,
+         -3,   9,  12,   9,  14,  10,   3,   2,
+         -6,   3,  13,  19,   7,  10,  -3,  -9,
+        -12,  -3,   8,  10,  13,   3,  -7, -15,
+        -14, -18,  -7,  -1,   4,  -9, -15, -27,
+        -23,  -9, -23,  -5,  -9, -16,  -5, -17,
+    ],
+    "Rook": [
+         13,  10,  18,  15,  12,  12,   8,   5,
+         11,  13,  13,  11,  -3,   3,   8,   3,
+          7,   7,   7,   5,   4,  -3,  -5,  -3,
+          4,   3,  13,   1,   2,   1,  -1,   2,
+          3,   5,   8,   4,  -5,  -6,  -8, -11,
+         -4,   0,  -5,  -1,  -7, -12,  -8, -16,
+         -6,  -6,   0,   2,  -9,  -9, -11,  -3,
+         -9,   2,   3,  -1,  -5, -13,   4, -20,
+    ],
+    "Queen": [
+         -9,  22,  22,  27,  27,  19,  10,  20,
+        -17,  20,  32,  41,  58,  25,  30,   0,
+        -20,   6,   9,  49,  47,  35,  19,   9,
+          3,  22,  24,  45,  57,  40,  57,  36,
+        -18,  28,  19,  47,  31,  34,  39,  23,
+        -16, -27,  15,   6,   9,  17,  10,   5,
+        -22, -23, -30, -16, -16, -23, -36, -32,
+        -33, -28, -22, -43,  -5, -32, -20, -41,
+    ],
+    "King": [
+        -74, -35, -18, -18, -11,  15,   4, -17,
+        -12,  17,  14,  17,  17,  38,  23,  11,
+         10,  17,  23,  15,  20,  45,  44,  13,
+         -8,  22,  24,  27,  26,  33,  26,   3,
+        -18,  -4,  21,  24,  27,  23,   9, -11,
+        -19,  -3,  11,  21,  23,  16,   7,  -9,
+        -27, -11,   4,  13,  14,   4,  -5, -17,
+        -53, -34, -21, -11, -28, -14, -24, -43,
+    ],
+}
+
+
+def piece_square_score(piece, position: Tuple[int, int], board_size: Tuple[int, int]) -> Tuple[int, int]:
+    """
+    Return the (middlegame, endgame) contribution of piece standing on position,
+    positive for white and negative for black. Piece-square tables only apply to
+    8x8 boards; other sizes are scored on material alone.
+    """
+    name = piece.__class__.__name__
+    mg, eg = PIECE_VALUES.get(name, (0, 0))
+    if board_size == (8, 8) and name in _MG_TABLES:
+        x, y = position
+        # Rank counted from the piece's own side, so both colors share the tables
+        rank = y if piece.direction == "UP" else 7 - y
+        index = (7 - rank) * 8 + x
+        mg += _MG_TABLES[name][index]
+        eg += _EG_TABLES[name][index]
+    if piece.color == "white":
+        return mg, eg
+    return -mg, -eg
+
+
+def phase_weight(piece) -> int:
+    """Return how much the piece counts towards the middlegame phase."""
+    return PHASE_WEIGHTS.get(piece.__class__.__name__, 0)
+
+
+def tapered(mg: int, eg: int, phase: int) -> int:
+    """Blend middlegame and endgame scores by phase (MAX_PHASE = pure middlegame)."""
+    phase = min(phase, MAX_PHASE)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+def evaluate(board, color: str, terms: Iterable[Callable[['Board', str], int]] = ()) -> int:
+    """
+    Return the score in centipawns from color's point of view, read from the
+    sums Board maintains incrementally.
+
+    :param terms: Optional extra evaluation functions taking (board, color)
+                  and returning centipawns from color's point of view
+    """
+    score = tapered(board.eval_mg, board.eval_eg, board.phase)
+    if color != "white":
+        score = -score
+    for term in terms:
+        score += term(board, color)
+    return score
+
+
+def evaluate_from_scratch(board, color: str) -> int:
+    """Recompute evaluate() by scanning every piece. Used to check the incremental sums."""
+    mg = eg = phase = 0
+    size = (board.width, board.height)
+    for piece in board.iter_pieces():
+        piece_mg, piece_eg = piece_square_score(piece, piece.position, size)
+        mg += piece_mg
+        eg += piece_eg
+        phase += phase_weight(piece)
+    score = tapered(mg, eg, phase)
+    return score if color == "white" else -score
+
+
+# Piece values used when resolving exchanges; the king can only ever be the last capturer
+SEE_VALUES: Dict[str, int] = {"Pawn": 100, "Knight": 320, "Bishop": 330, "Rook": 500, "Queen": 900, "King": 20000}
+
+
+def static_exchange(board, start: Tuple[int, int], end: Tuple[int, int]) -> int:
+    """
+    Return the material balance in centipawns, for the side making the capture,
+    of the best exchange sequence on end starting with start -> end.
+    Both sides recapture with their least valuable attacker and may stop at any
+    point; x-ray attackers behind traded pieces join in as the line opens.
+    """
+    target = board.get_piece_at(end)
+    attacker = board.get_piece_at(start)
+    gains = [SEE_VALUES.get(target.__class__.__name__, 0) if target else 0]
+    traded = {start}
+    piece_value = SEE_VALUES.get(attacker.__class__.__name__, 0)
+    side = "black" if attacker.color == "white" else "white"
+
+    while True:
+        # The piece now standing on end is what the next capture wins
+        gains.append(piece_value - gains[-1])
+        if max(-gains[-2], gains[-1]) < 0:
+            # Neither side can come out ahead by continuing
+            break
+        attackers = board.attackers_to(end, side, ignore=traded)
+        if not attackers:
+            break
+        square = min(attackers, key=lambda sq: SEE_VALUES.get(board.get_piece_at(sq).__class__.__name__, 0))
+        traded.add(square)
+        piece_value = SEE_VALUES.get(board.get_piece_at(square).__class__.__name__, 0)
+        side = "black" if side == "white" else "white"
+
+    # The last entry is a capture nobody was able to make
+    gains.pop()
+    # Unwind: each side only recaptures when that does not lose material
+    for i in range(len(gains) - 1, 0, -1):
+        gains[i - 1] = -max(-gains[i - 1], gains[i])
+    return gains[0]
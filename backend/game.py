@@ -1,12 +1,58 @@
-from typing import Tuple, Optional
-from board import Board
+import re
+from typing import Tuple, Optional, List, Dict
+from board import Board, SparseBoard
 from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+import profiling
+import evaluation
+import zobrist
+
+# FEN letters for each piece class; white pieces use upper case
+FEN_LETTERS = {Pawn: "p", Rook: "r", Knight: "n", Bishop: "b", Queen: "q", King: "k"}
+FEN_PIECES = {letter: cls for cls, letter in FEN_LETTERS.items()}
 
 class Game:
-    def __init__(self):
-        self.board = Board()
+    def __init__(self, board: Optional[Board] = None, cache=None):
+        """
+        :param board: Board to play on as-is. When omitted, a standard 8x8 board
+                      with the starting position is created.
+        :param cache: position_cache.PositionCache for check and legal move
+                      results, possibly shared with other games
+        """
         self.turn = "white"
-        self.setup_board()
+        # (start_pos, end_pos, captured piece) for every move made, so it can be unmade
+        self.move_stack = []
+        # Legal targets per square for the position with key _legal_cache_key, see legal_targets()
+        self._legal_cache: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        self._legal_cache_key: Optional[Tuple[int, int, int]] = None
+        self.cache = cache
+        if board is None:
+            self.board = self._start_board()
+        else:
+            self.board = board
+
+    # Board holding the starting position, built once; new games fork it
+    _prototype_board: Optional[Board] = None
+
+    @classmethod
+    def _start_board(cls) -> Board:
+        """
+        Return a board with the starting position. It shares its rows and pieces
+        copy-on-write with a prototype, so no pieces are allocated or placed.
+        """
+        if Game._prototype_board is None:
+            prototype = Game.__new__(Game)
+            prototype.board = Board()
+            prototype.setup_board()
+            Game._prototype_board = prototype.board
+        return Game._prototype_board.fork()
+
+    def reset(self):
+        """Restore the starting position in place, so the Game object can be reused."""
+        self.board = self._start_board()
+        self.turn = "white"
+        self.move_stack.clear()
+        self._legal_cache = {}
+        self._legal_cache_key = None
 
     def setup_board(self):
         # Setup White Pieces
@@ -33,63 +79,297 @@ class Game:
         for i in range(8):
             self.board.place_piece(Pawn(f"BP{i+1}", (i, 6), "black", "DOWN"), (i, 6))
 
-    def is_check(self, color: str) -> bool:
-        king_pos = None
-        # Find King
-        for y in range(self.board.height):
+    def fork(self) -> 'Game':
+        """
+        Return an independent copy of the game for analysis or what-if branches.
+        The board is shared copy-on-write, so forking costs a few small allocations
+        and many forks of the same position share their unchanged rows and pieces.
+        """
+        clone = Game.__new__(Game)
+        clone.__dict__.update(self.__dict__)
+        clone.board = self.board.fork()
+        clone.move_stack = list(self.move_stack)
+        return clone
+
+    @classmethod
+    def from_fen(cls, fen: str, sparse: bool = False) -> 'Game':
+        """
+        Create a game from a FEN string. Only piece placement and side to move
+        are used; the board size follows the number and length of the ranks.
+
+        :param sparse: Use a SparseBoard, for large boards with few pieces
+        """
+        fields = fen.split()
+        # Tokenize so empty runs wider than 9 squares work on larger boards
+        ranks = [re.findall(r"\d+|\D", rank) for rank in fields[0].split("/")]
+        height = len(ranks)
+        width = sum(int(c) if c.isdigit() else 1 for c in ranks[0])
+        board = SparseBoard(width, height) if sparse else Board(width, height)
+
+        counters = {}
+        for rank_index, rank in enumerate(ranks):
+            y = height - 1 - rank_index
+            x = 0
+            for c in rank:
+                if c.isdigit():
+                    x += int(c)
+                    continue
+                piece_cls = FEN_PIECES.get(c.lower())
+                if piece_cls is None:
+                    raise ValueError(f"Invalid FEN piece: {c}")
+                color, direction = ("white", "UP") if c.isupper() else ("black", "DOWN")
+                prefix = f"{color[0].upper()}{c.upper()}"
+                counters[prefix] = counters.get(prefix, 0) + 1
+                piece = piece_cls(f"{prefix}{counters[prefix]}", None, color, direction, (width, height))
+                board.place_piece(piece, (x, y))
+                x += 1
+
+        game = cls(board)
+        if len(fields) > 1 and fields[1] == "b":
+            game.turn = "black"
+        return game
+
+    def to_fen(self) -> str:
+        """Return the position as FEN. Castling and en passant are not tracked."""
+        ranks = []
+        for y in range(self.board.height - 1, -1, -1):
+            rank = ""
+            empty = 0
             for x in range(self.board.width):
-                p = self.board.get_piece_at((x, y))
-                if p and p.color == color and isinstance(p, King):
-                    king_pos = (x, y)
-                    break
-            if king_pos: break
-        
+                piece = self.board.get_piece_at((x, y))
+                if piece is None:
+                    empty += 1
+                    continue
+                if empty:
+                    rank += str(empty)
+                    empty = 0
+                letter = FEN_LETTERS[type(piece)]
+                rank += letter.upper() if piece.color == "white" else letter
+            if empty:
+                rank += str(empty)
+            ranks.append(rank)
+        return f"{'/'.join(ranks)} {self.turn[0]} - - 0 1"
+
+    def is_check(self, color: str) -> bool:
+        cache = self.cache
+        if cache is None:
+            return self.king_attacked(color)
+        key = self._cache_key()
+        in_check = cache.get_check(key, color)
+        if in_check is None:
+            in_check = self.king_attacked(color)
+            cache.put_check(key, color, in_check)
+        return in_check
+
+    def king_attacked(self, color: str) -> bool:
+        """
+        Like is_check(), but never reads or fills the position cache. For callers
+        such as search that visit many positions once each.
+        """
+        king_pos = self.board.king_positions.get(color)
         if not king_pos: return False
 
         opponent_color = "black" if color == "white" else "white"
         
-        # Check if any opponent piece attacks King
-        for y in range(self.board.height):
-            for x in range(self.board.width):
-                p = self.board.get_piece_at((x, y))
-                if p and p.color == opponent_color:
-                    if king_pos in p.get_valid_moves(self.board):
-                        return True
+        # Check if any opponent piece attacks King, looking outwards from the king's square
+        return self.board.is_attacked(king_pos, opponent_color)
+
+    def is_legal_move(self, piece, end_pos: Tuple[int, int]) -> bool:
+        """
+        Check whether moving piece to end_pos leaves its own king safe.
+        The move must already be one of the piece's valid moves.
+        """
+        start_pos = piece.position
+
+        # Simulate move
+        captured_piece = self.board.get_piece_at(end_pos)
+        self.board.move_piece(piece, end_pos)
+
+        # Not cached: the simulated positions are rarely looked up again
+        in_check = self.king_attacked(piece.color)
+
+        # Undo move
+        self.board.move_piece(piece, start_pos)
+        if captured_piece:
+            self.board.place_piece(captured_piece, end_pos)
+
+        return not in_check
+
+    def make_move(self, start_pos: Tuple[int, int], end_pos: Tuple[int, int]):
+        """
+        Play a move without any validation and switch the turn. Used by search
+        and by play_turn once a move has been checked. Undo with unmake_move().
+        """
+        piece = self.board.get_piece_at(start_pos)
+        captured_piece = self.board.get_piece_at(end_pos)
+        self.board.move_piece(piece, end_pos)
+        self.move_stack.append((start_pos, end_pos, captured_piece))
+        self.turn = "black" if self.turn == "white" else "white"
+
+    def apply_moves(self, moves, validate: bool = True) -> Optional[int]:
+        """
+        Play a sequence of (start, end) moves without building play_turn responses.
+
+        :param moves: Moves in order, alternating sides from the side to move
+        :param validate: Check that each move is legal and stop at the first one
+                         that isn't. With False the moves are trusted and played
+                         as fast as make_move() allows.
+        :return: None if every move was played, otherwise the index of the first
+                 illegal move; the moves before it stay played.
+        """
+        board = self.board
+        make_move = self.make_move
+        if not validate:
+            for start_pos, end_pos in moves:
+                make_move(tuple(start_pos), tuple(end_pos))
+            return None
+
+        for index, (start_pos, end_pos) in enumerate(moves):
+            start_pos = tuple(start_pos)
+            end_pos = tuple(end_pos)
+            piece = board.get_piece_at(start_pos)
+            if (piece is None or piece.color != self.turn
+                    or end_pos not in piece.get_valid_moves(board)
+                    or not self.is_legal_move(piece, end_pos)):
+                return index
+            make_move(start_pos, end_pos)
+        return None
+
+    def unmake_move(self):
+        """Take back the last move made with make_move() or play_turn()."""
+        start_pos, end_pos, captured_piece = self.move_stack.pop()
+        self.board.move_piece(self.board.get_piece_at(end_pos), start_pos)
+        if captured_piece:
+            self.board.place_piece(captured_piece, end_pos)
+        self.turn = "black" if self.turn == "white" else "white"
+
+    def evaluate(self) -> int:
+        """Return the static evaluation in centipawns for the side to move."""
+        return evaluation.evaluate(self.board, self.turn)
+
+    def position_hash(self) -> int:
+        """Return the 64-bit Zobrist hash of the placement and side to move."""
+        if self.turn == "black":
+            return self.board.hash ^ zobrist.BLACK_TO_MOVE
+        return self.board.hash
+
+    def _cache_key(self) -> Tuple[int, int, int]:
+        """Key of the current position in a PositionCache. The Zobrist hash doesn't encode the board size."""
+        board = self.board
+        return self.position_hash(), board.width, board.height
+
+    def book_move(self, book, rng=None) -> Optional[Tuple[Tuple[int, int], Tuple[int, int]]]:
+        """
+        Return a move from an opening book for the current position, or None when
+        the position is out of book. Book moves are checked for legality, so a hash
+        collision can't produce an illegal move.
+
+        :param book: An opening_book.OpeningBook
+        :param rng: random.Random to pick moves in proportion to how often they were
+                    played; the most played move is returned when omitted
+        """
+        moves = []
+        weights = []
+        for move, weight in book.probe(self.position_hash()):
+            if move is None:
+                continue
+            start, end = move
+            piece = self.board.get_piece_at(start)
+            if (piece and piece.color == self.turn and end in piece.get_valid_moves(self.board)
+                    and self.is_legal_move(piece, end)):
+                moves.append(move)
+                weights.append(weight)
+        if not moves:
+            return None
+        if rng is None:
+            return moves[0]
+        return rng.choices(moves, weights)[0]
+
+    def legal_targets(self, square: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """
+        Return the squares the piece on square can legally move to. Empty for an
+        empty square or a piece of the side not to move.
+
+        All legal moves of the position are generated on the first call and cached
+        until the position changes, so highlighting a selection and then playing it
+        with play_turn share a single generation.
+        """
+        return self._legal_move_map().get(tuple(square), [])
+
+    def _legal_move_map(self) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+        # Keyed by the position hash, so any move or board edit invalidates it
+        key = self._cache_key()
+        if self._legal_cache_key != key:
+            cache = self.cache
+            moves = cache.get_legal_moves(key) if cache is not None else None
+            if moves is None:
+                board = self.board
+                moves = {}
+                # Copy the piece list up front because the simulated moves mutate the board
+                for piece in list(board.iter_pieces(self.turn)):
+                    targets = [end for end in piece.get_valid_moves(board) if self.is_legal_move(piece, end)]
+                    if targets:
+                        moves[piece.position] = targets
+                if cache is not None:
+                    cache.put_legal_moves(key, moves)
+            self._legal_cache = moves
+            self._legal_cache_key = key
+        return self._legal_cache
+
+    def invalidate_cache(self):
+        """
+        Forget cached results for the current position. Only needed after changing
+        the board other than through Board's methods, which keep the hash current.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self._cache_key())
+        self._legal_cache = {}
+        self._legal_cache_key = None
+
+    def has_legal_move(self, color: str) -> bool:
+        """Return True as soon as any legal move is found for color."""
+        if self.cache is not None and color == self.turn:
+            # With a cache, generating every move once pays off on later lookups
+            return bool(self._legal_move_map())
+        # Copy the piece list up front because the simulated moves mutate the board
+        for p in list(self.board.iter_pieces(color)):
+            for move in p.get_valid_moves(self.board):
+                if self.is_legal_move(p, move):
+                    return True
         return False
 
     def is_checkmate(self, color: str) -> bool:
-        if not self.is_check(color):
-            return False
-        
-        # Try all possible moves for 'color'
-        pieces = []
-        for y in range(self.board.height):
-            for x in range(self.board.width):
-                p = self.board.get_piece_at((x, y))
-                if p and p.color == color:
-                    pieces.append(p)
-        
-        for p in pieces:
-            start_pos = p.get_position()
-            valid_moves = p.get_valid_moves(self.board)
-            for move in valid_moves:
-                # Simulate move
-                captured_piece = self.board.get_piece_at(move)
-                
-                # Move
-                self.board.move_piece(p, move)
-                
-                still_in_check = self.is_check(color)
-                
-                # Undo move
-                self.board.move_piece(p, start_pos)
-                if captured_piece:
-                    self.board.place_piece(captured_piece, move)
-                
-                if not still_in_check:
+        return self.is_check(color) and not self.has_legal_move(color)
+
+    def is_stalemate(self, color: str) -> bool:
+        return not self.is_check(color) and not self.has_legal_move(color)
+
+    def is_insufficient_material(self) -> bool:
+        """
+        Return True if neither side has enough material to deliver mate:
+        K vs K, K+minor vs K, or kings with bishops all on the same square color.
+        """
+        minors = {"Knight": 0, "Bishop": 0}
+        for counts in self.board.material.values():
+            for name, count in counts.items():
+                if name == "King":
+                    continue
+                if name not in minors:
                     return False
-        
-        return True
+                minors[name] += count
+
+        if minors["Knight"] + minors["Bishop"] <= 1:
+            return True
+        if minors["Knight"]:
+            return False
+
+        # Only bishops left: dead if they all travel on the same square color
+        square_colors = {
+            (p.position[0] + p.position[1]) % 2
+            for p in self.board.iter_pieces()
+            if p.__class__.__name__ == "Bishop"
+        }
+        return len(square_colors) == 1
 
     def play_turn(self, start_pos: Tuple[int, int], end_pos: Tuple[int, int]) -> dict:
         start_pos = tuple(start_pos)
@@ -102,6 +382,8 @@ class Game:
             'captured': None,
             'is_check': False,
             'is_checkmate': False,
+            'is_stalemate': False,
+            'is_draw': False,
             'winner': None
         }
 
@@ -113,23 +395,17 @@ class Game:
             response['message'] = f"It's {self.turn}'s turn. You cannot move {piece.color} pieces."
             return response
         
-        valid_moves = piece.get_valid_moves(self.board)
-        if end_pos not in valid_moves:
-            response['message'] = f"Invalid move for {piece.__class__.__name__} at {start_pos} to {end_pos}."
+        if end_pos not in self.legal_targets(start_pos):
+            # Only a rejected move pays for telling the two failure reasons apart
+            if end_pos in piece.get_valid_moves(self.board):
+                # The move would put or leave the own king in check
+                response['message'] = "Illegal move: You are in check!"
+            else:
+                response['message'] = f"Invalid move for {piece.__class__.__name__} at {start_pos} to {end_pos}."
             return response
-        
-        # Check if move puts own king in check (illegal move in chess)
-        # Simulate move
+
         captured_piece = self.board.get_piece_at(end_pos)
-        self.board.move_piece(piece, end_pos)
-        
-        if self.is_check(self.turn):
-            # Undo move
-            self.board.move_piece(piece, start_pos)
-            if captured_piece:
-                self.board.place_piece(captured_piece, end_pos)
-            response['message'] = "Illegal move: You are in check!"
-            return response
+        self.make_move(start_pos, end_pos)
 
         response['moved_piece'] = {
             'type': piece.__class__.__name__,
@@ -142,19 +418,24 @@ class Game:
                 'color': captured_piece.color
             }
 
-        # Switch turn
-        opponent_color = "black" if self.turn == "white" else "white"
-        self.turn = opponent_color
-        
-        # Check for check/checkmate against opponent
-        if self.is_check(self.turn):
-            response['is_check'] = True
-            if self.is_checkmate(self.turn):
+        # Check for check/checkmate/stalemate against opponent. Generating the reply
+        # moves also fills the cache the next selection and move will read.
+        in_check = self.is_check(self.turn)
+        response['is_check'] = in_check
+        if not self._legal_move_map():
+            if in_check:
                 response['is_checkmate'] = True
                 response['winner'] = "White" if self.turn == "black" else "Black"
                 response['message'] = f"Checkmate! {response['winner']} wins!"
             else:
-                response['message'] = "Check!"
+                response['is_stalemate'] = True
+                response['is_draw'] = True
+                response['message'] = "Stalemate! The game is a draw."
+        elif self.is_insufficient_material():
+            response['is_draw'] = True
+            response['message'] = "Draw by insufficient material."
+        elif in_check:
+            response['message'] = "Check!"
         else:
             response['message'] = "Move successful"
 
@@ -182,6 +463,31 @@ class Game:
             state.append(row)
         return state
 
+    @staticmethod
+    def stats() -> dict:
+        """
+        Return call counts and wall time collected by the profiling hooks.
+        Empty unless profiling.enable() or profiling.profile() has been used.
+        """
+        return profiling.get_stats()
+
+    def get_pieces_state(self):
+        """
+        Return only the occupied squares as a list of
+        {'x': 0, 'y': 1, 'type': 'Pawn', 'color': 'white', 'id': 'WP1'}.
+        Cheaper than get_board_state on large, mostly empty boards.
+        """
+        return [
+            {
+                'x': piece.position[0],
+                'y': piece.position[1],
+                'type': piece.__class__.__name__,
+                'color': piece.color,
+                'id': piece.ID
+            }
+            for piece in self.board.iter_pieces()
+        ]
+
     def start_cli(self):
         while True:
             print(self.board)
@@ -199,7 +505,7 @@ class Game:
                 print(result['message'])
                 if result['captured']:
                     print(f"Captured {result['captured']}")
-                if result['is_checkmate']:
+                if result['is_checkmate'] or result['is_draw']:
                     print("Game Over")
                     break
 
@@ -208,6 +514,61 @@ class Game:
             except Exception as e:
                 print(f"An error occurred: {e}")
 
-if __name__ == "__main__":
+class GamePool:
+    """
+    Bounded pool of finished games to recycle, so servers that start and end
+    many sessions don't allocate a new Game for each one.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self._free: List[Game] = []
+
+    def acquire(self) -> Game:
+        """Return a game in the starting position, recycled when one is available."""
+        if self._free:
+            game = self._free.pop()
+            game.reset()
+            return game
+        return Game()
+
+    def release(self, game: Game):
+        """Hand a game back once it is finished. Games beyond max_size are dropped."""
+        if len(self._free) < self.max_size:
+            self._free.append(game)
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play chess in the terminal.")
+    parser.add_argument("--stats", action="store_true",
+                        help="count calls and time spent in the hot paths and print them on exit")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="run under cProfile and dump the stats to FILE "
+                             "(view with snakeviz, or render a flame graph with flameprof)")
+    args = parser.parse_args(argv)
+
+    if args.stats:
+        profiling.enable()
+
     game = Game()
-    game.start_cli()
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.runcall(game.start_cli)
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    else:
+        game.start_cli()
+
+    if args.stats:
+        profiling.print_stats(Game.stats())
+
+
+if __name__ == "__main__":
+    # Go through the importable module so the profiling hooks patch the same Game class
+    import game
+    game.main()
@@ -0,0 +1,236 @@
+"""
+Forced-mate solver based on depth-limited proof-number search.
+
+The side to move is the attacker. Its moves form OR nodes (one mating move is
+enough) and the defender's replies form AND nodes (every reply must lose).
+Each node keeps a proof number and a disproof number: the fewest leaves still
+to be solved to prove or refute it. The search always expands the most
+proving leaf, so it follows forcing lines first. New attacker moves start
+with the defender's number of legal replies as their proof number, and quiet
+moves are penalised, which searches checks and king hunts before anything
+else. A root disproof within the move limit is a proof that no mate exists.
+
+Solve one position or many across processes, from the backend directory:
+
+    python mate_solver.py 3 "r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w - - 0 1"
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+from game import Game
+from search import legal_moves
+
+INFINITY = 1 << 40
+# Added to the proof number of attacker moves that don't give check
+QUIET_MOVE_PENALTY = 8
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+class _Node:
+    __slots__ = ("move", "parent", "children", "attacker_to_move", "moves_left", "proof", "disproof")
+
+    def __init__(self, move: Optional[Move], parent: Optional['_Node'], attacker_to_move: bool, moves_left: int):
+        self.move = move
+        self.parent = parent
+        self.children: Optional[List['_Node']] = None
+        self.attacker_to_move = attacker_to_move
+        # Attacker moves still allowed below this node
+        self.moves_left = moves_left
+        self.proof = 1
+        self.disproof = 1
+
+    def set_proven(self) -> None:
+        self.proof, self.disproof = 0, INFINITY
+
+    def set_disproven(self) -> None:
+        self.proof, self.disproof = INFINITY, 0
+
+    def update(self) -> None:
+        """Recompute the numbers from the children."""
+        children = self.children
+        if self.attacker_to_move:
+            self.proof = min(child.proof for child in children)
+            self.disproof = min(INFINITY, sum(child.disproof for child in children))
+        else:
+            self.proof = min(INFINITY, sum(child.proof for child in children))
+            self.disproof = min(child.disproof for child in children)
+
+
+class MateSolver:
+    def __init__(self, game, node_budget: int = 200_000):
+        """
+        :param game: Position to solve; the side to move attacks. Moves are made
+                     and unmade on it in place.
+        :param node_budget: Nodes to create before giving up, per solve() call
+        """
+        self.game = game
+        self.node_budget = node_budget
+        self.nodes = 0
+
+    def solve(self, max_moves: int) -> dict:
+        """
+        Look for the shortest forced mate in at most max_moves attacker moves.
+
+        :return: {'result': 'mate', 'no_mate' or 'unknown' (budget exhausted),
+                  'mate_in': attacker moves, 'line': the mating line against the
+                  longest defence, 'nodes': nodes created}
+        """
+        self.nodes = 0
+        for moves in range(1, max_moves + 1):
+            root = self._search(moves)
+            if root.proof == 0:
+                return {'result': 'mate', 'mate_in': moves, 'line': self._line(root), 'nodes': self.nodes}
+            if root.disproof != 0:
+                return {'result': 'unknown', 'mate_in': None, 'line': [], 'nodes': self.nodes}
+        return {'result': 'no_mate', 'mate_in': None, 'line': [], 'nodes': self.nodes}
+
+    def _search(self, moves: int) -> _Node:
+        """Run proof-number search for a mate in moves until solved or out of budget."""
+        game = self.game
+        root = _Node(None, None, True, moves)
+        while root.proof and root.disproof and self.nodes < self.node_budget:
+            # Walk down to the most proving leaf
+            node = root
+            while node.children is not None:
+                if node.attacker_to_move:
+                    node = min(node.children, key=lambda child: child.proof)
+                else:
+                    node = min(node.children, key=lambda child: child.disproof)
+                game.make_move(*node.move)
+
+            self._expand(node)
+
+            # Back up the new numbers, unmaking moves on the way to the root
+            while node is not root:
+                node = node.parent
+                node.update()
+                game.unmake_move()
+        return root
+
+    def _expand(self, node: _Node) -> None:
+        """Create and evaluate the children of a leaf; the game is at node's position."""
+        game = self.game
+        color = game.turn
+        moves = legal_moves(game, color)
+        if not moves:
+            # Mate proves the node if the defender is the one stuck, stalemate never does
+            if not node.attacker_to_move and game.is_check(color):
+                node.set_proven()
+            else:
+                node.set_disproven()
+            return
+
+        children = []
+        if node.attacker_to_move:
+            moves_left = node.moves_left - 1
+            for move in moves:
+                child = _Node(move, node, False, moves_left)
+                game.make_move(*move)
+                self._evaluate_defender(child)
+                game.unmake_move()
+                children.append(child)
+                if child.proof == 0:
+                    break
+        else:
+            for move in moves:
+                children.append(_Node(move, node, True, node.moves_left))
+        self.nodes += len(children)
+        node.children = children
+        node.update()
+
+    def _evaluate_defender(self, node: _Node) -> None:
+        """Set the initial numbers of a position with the defender to move."""
+        game = self.game
+        color = game.turn
+        replies = len(legal_moves(game, color))
+        in_check = game.is_check(color)
+        if not replies:
+            if in_check:
+                node.set_proven()
+            else:
+                node.set_disproven()
+        elif not node.moves_left:
+            node.set_disproven()
+        else:
+            node.proof = replies if in_check else replies + QUIET_MOVE_PENALTY
+            node.disproof = 1
+
+    def _line(self, node: _Node) -> List[Move]:
+        """Follow a proof tree from node, picking the defence that lasts longest."""
+        line = []
+        while node.children:
+            proven = [child for child in node.children if child.proof == 0]
+            if node.attacker_to_move:
+                node = min(proven, key=_proof_depth)
+            else:
+                node = max(proven, key=_proof_depth)
+            line.append(node.move)
+        return line
+
+
+def _proof_depth(node: _Node) -> int:
+    """Plies below node in its proof tree."""
+    if not node.children:
+        return 0
+    proven = [child for child in node.children if child.proof == 0]
+    depths = [_proof_depth(child) for child in proven]
+    return 1 + (min(depths) if node.attacker_to_move else max(depths))
+
+
+def solve_mate(game, max_moves: int, node_budget: int = 200_000) -> dict:
+    """Look for a forced mate in at most max_moves; see MateSolver.solve()."""
+    return MateSolver(game, node_budget).solve(max_moves)
+
+
+def _solve_fen(fen: str, max_moves: int, node_budget: int) -> dict:
+    return solve_mate(Game.from_fen(fen), max_moves, node_budget)
+
+
+def solve_batch(positions: Sequence, max_moves: int, node_budget: int = 200_000,
+                workers: Optional[int] = None, executor: Optional[ProcessPoolExecutor] = None) -> List[dict]:
+    """
+    Solve many puzzles across a process pool.
+
+    :param positions: Games or FEN strings
+    :param workers: Number of processes, os.cpu_count() by default
+    :param executor: Existing process pool to reuse across calls
+    :return: One solve() result per position, in input order
+    """
+    fens = [position if isinstance(position, str) else position.to_fen() for position in positions]
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+    try:
+        return list(executor.map(_solve_fen, fens, [max_moves] * len(fens), [node_budget] * len(fens)))
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    from notation import move_to_uci
+
+    parser = argparse.ArgumentParser(description="Find forced mates.")
+    parser.add_argument("moves", type=int, help="longest mate to look for, in attacker moves")
+    parser.add_argument("fens", nargs="*", help="positions to solve; read one per line from stdin if omitted")
+    parser.add_argument("--nodes", type=int, default=200_000, help="node budget per position")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    fens = args.fens or [line.strip() for line in sys.stdin if line.strip()]
+    start = time.perf_counter()
+    results = solve_batch(fens, args.moves, args.nodes, args.workers)
+    for fen, result in zip(fens, results):
+        if result['result'] == 'mate':
+            line = " ".join(move_to_uci(move) for move in result['line'])
+            print(f"{fen}: mate in {result['mate_in']}: {line} ({result['nodes']} nodes)")
+        else:
+            print(f"{fen}: {result['result'].replace('_', ' ')} ({result['nodes']} nodes)")
+    print(f"{len(fens)} positions in {time.perf_counter() - start:.2f}s")
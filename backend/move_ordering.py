@@ -0,0 +1,167 @@
+"""
+Move ordering for alpha-beta search.
+
+Captures are scored most-valuable-victim / least-valuable-attacker, quiet moves
+that caused a beta cutoff at the same ply (killer moves) come next, and the
+remaining quiet moves are ranked by a history table indexed by piece and
+target square. Moves are yielded lazily, so a cutoff after the first few moves
+never pays for sorting the rest.
+
+ordered() takes (start, end) tuples; ordered_packed() takes a moves.py buffer
+and yields packed moves, scoring them straight from the board grid so the
+search never converts a move it doesn't keep.
+"""
+
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from moves import CAPTURE, SQUARES, pack
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+# Ranks used by MVV-LVA: victims are weighed ten times more than attackers
+MVV_LVA_RANKS: Dict[str, int] = {"Pawn": 1, "Knight": 2, "Bishop": 3, "Rook": 4, "Queen": 5, "King": 6}
+
+HASH_MOVE_SCORE = 1_000_000
+CAPTURE_SCORE = 100_000
+KILLER_SCORES = (90_000, 80_000)
+# History scores are kept below the killer scores
+HISTORY_LIMIT = 50_000
+# Origin and target bits of a packed move, without its flags
+_SQUARES_MASK = 0xFFF
+
+
+class MoveOrderer:
+    def __init__(self, max_ply: int = 64):
+        """
+        :param max_ply: Number of plies that get killer move slots
+        """
+        self.max_ply = max_ply
+        self.killers: List[List[Optional[Move]]] = [[None, None] for _ in range(max_ply)]
+        # (color, piece class name, target square) -> accumulated cutoff bonus
+        self.history: Dict[Tuple[str, str, Tuple[int, int]], int] = {}
+
+    def clear(self) -> None:
+        """Forget killers and age the history table before a new search."""
+        self.killers = [[None, None] for _ in range(self.max_ply)]
+        for key in list(self.history):
+            self.history[key] //= 2
+            if not self.history[key]:
+                del self.history[key]
+
+    def score_move(self, board, move: Move, ply: int) -> int:
+        """Return the ordering score of a move; higher is searched first."""
+        start, end = move
+        victim = board.get_piece_at(end)
+        attacker = board.get_piece_at(start)
+        if victim:
+            return (CAPTURE_SCORE
+                    + 10 * MVV_LVA_RANKS.get(victim.__class__.__name__, 0)
+                    - MVV_LVA_RANKS.get(attacker.__class__.__name__, 0))
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move == killers[0]:
+                return KILLER_SCORES[0]
+            if move == killers[1]:
+                return KILLER_SCORES[1]
+        return self.history.get((attacker.color, attacker.__class__.__name__, end), 0)
+
+    def ordered(self, board, moves: List[Move], ply: int, hash_move: Optional[Move] = None) -> Iterator[Move]:
+        """
+        Yield moves best-first. Each step picks the highest remaining score, so
+        only the moves actually searched are ever ranked against each other.
+
+        :param hash_move: Move to try first, e.g. from a transposition table
+        """
+        scores = [HASH_MOVE_SCORE if move == hash_move else self.score_move(board, move, ply)
+                  for move in moves]
+        moves = list(moves)
+        while moves:
+            best = max(range(len(scores)), key=scores.__getitem__)
+            # Swap-remove keeps each pick O(n) without shifting the lists
+            move = moves[best]
+            moves[best] = moves[-1]
+            scores[best] = scores[-1]
+            moves.pop()
+            scores.pop()
+            yield move
+
+    def ordered_packed(self, board, buffer, count: int, ply: int, hash_move: Optional[Move] = None,
+                       captures_only: bool = False) -> Iterator[int]:
+        """
+        ordered() for the first count packed moves of a moves.py buffer, with the
+        same scores and so the same order. The board must pass moves.supports().
+
+        :param captures_only: Skip moves without the CAPTURE flag
+        """
+        grid = board.grid
+        capture = CAPTURE << 12
+        hash_packed = pack(hash_move) if hash_move is not None else -1
+        killer0 = killer1 = -1
+        if ply < self.max_ply:
+            first, second = self.killers[ply]
+            if first is not None:
+                killer0 = pack(first)
+            if second is not None:
+                killer1 = pack(second)
+        history = self.history
+        moves = []
+        scores = []
+        for index in range(count):
+            packed = buffer[index]
+            if captures_only and not packed & capture:
+                continue
+            move = packed & _SQUARES_MASK
+            if move == hash_packed:
+                score = HASH_MOVE_SCORE
+            else:
+                attacker = grid[(packed >> 3) & 7][packed & 7]
+                if packed & capture:
+                    victim = grid[(packed >> 9) & 7][(packed >> 6) & 7]
+                    score = (CAPTURE_SCORE
+                             + 10 * MVV_LVA_RANKS.get(victim.__class__.__name__, 0)
+                             - MVV_LVA_RANKS.get(attacker.__class__.__name__, 0))
+                elif move == killer0:
+                    score = KILLER_SCORES[0]
+                elif move == killer1:
+                    score = KILLER_SCORES[1]
+                else:
+                    score = history.get((attacker.color, attacker.__class__.__name__, SQUARES[move >> 6]), 0)
+            moves.append(packed)
+            scores.append(score)
+        while moves:
+            best = max(range(len(scores)), key=scores.__getitem__)
+            packed = moves[best]
+            moves[best] = moves[-1]
+            scores[best] = scores[-1]
+            moves.pop()
+            scores.pop()
+            yield packed
+
+    def record_cutoff(self, board, move: Move, ply: int, depth: int) -> None:
+        """Remember a quiet move that caused a beta cutoff."""
+        start, end = move
+        if board.get_piece_at(end):
+            return
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        piece = board.get_piece_at(start)
+        key = (piece.color, piece.__class__.__name__, end)
+        self.history[key] = min(self.history.get(key, 0) + depth * depth, HISTORY_LIMIT)
+
+
+class UnorderedMoves(MoveOrderer):
+    """Drop-in orderer that keeps generation order, for comparing node counts."""
+
+    def ordered(self, board, moves: List[Move], ply: int, hash_move: Optional[Move] = None) -> Iterator[Move]:
+        return iter(moves)
+
+    def ordered_packed(self, board, buffer, count: int, ply: int, hash_move: Optional[Move] = None,
+                       captures_only: bool = False) -> Iterator[int]:
+        capture = CAPTURE << 12
+        return iter([packed for packed in buffer[:count] if not captures_only or packed & capture])
+
+    def record_cutoff(self, board, move: Move, ply: int, depth: int) -> None:
+        pass
@@ -0,0 +1,219 @@
+"""
+Packed 16-bit moves and allocation-free move generation.
+
+A packed move holds the origin square in bits 0-5, the target square in bits
+6-11 and flags in bits 12-15, with squares numbered x + 8 * y. That covers
+boards up to 8x8; larger boards keep using the (start, end) tuple API.
+
+generate_moves() writes the pseudo-legal moves of one side into a
+preallocated array('H') and returns how many it wrote. It walks precomputed
+per-square target tables over the board grid instead of calling
+get_valid_moves(), so it creates no tuples or lists. Moves come out in the
+same order as the piece classes produce them, which keeps searches built on
+either generator identical. MoveBuffers hands out one buffer per ply so a
+recursive search reuses the same arrays at every node.
+
+Convert to and from the tuple API with unpack() / pack(), or to_tuples() for a
+whole buffer. The searcher doesn't convert: MoveOrderer.ordered_packed()
+scores and orders the packed moves, and each move is played by passing its two
+shared SQUARES entries to Game.make_move, so only the moves a node keeps (best
+move, PV, killer, transposition table entry) become (start, end) tuples.
+
+A node's time goes mostly to make_move/unmake_move and the check test, so this
+saves a few percent of search time, not more; benchmark.py times the search
+both ways (search_time_middlegame_packed and _tuples).
+"""
+
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+CAPTURE = 1
+DOUBLE_PUSH = 2
+# Flag bits 2-3 are free for promotions, which this game doesn't have
+
+# More than the 218 legal moves any 8x8 chess position can have
+MAX_MOVES = 256
+MAX_SIZE = 8
+
+_ORTHOGONAL = ((0, 1), (0, -1), (1, 0), (-1, 0))
+_DIAGONAL = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+_KNIGHT = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+_KING = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# Square number -> (x, y), shared so unpacking allocates only the move tuple
+SQUARES = tuple((square & 7, square >> 3) for square in range(64))
+
+
+def pack(move: Move, flags: int = 0) -> int:
+    (x1, y1), (x2, y2) = move
+    return x1 | (y1 << 3) | (x2 << 6) | (y2 << 9) | (flags << 12)
+
+
+def unpack(packed: int) -> Move:
+    return SQUARES[packed & 63], SQUARES[(packed >> 6) & 63]
+
+
+def move_flags(packed: int) -> int:
+    return packed >> 12
+
+
+def to_tuples(buffer: Sequence[int], count: Optional[int] = None, flags: int = 0) -> List[Move]:
+    """
+    Convert the first count packed moves of buffer to (start, end) tuples.
+
+    :param flags: Only convert moves with all of these flags set, e.g. CAPTURE
+    """
+    if count is None:
+        count = len(buffer)
+    if flags:
+        flags <<= 12
+        return [(SQUARES[packed & 63], SQUARES[(packed >> 6) & 63])
+                for packed in buffer[:count] if packed & flags == flags]
+    return [(SQUARES[packed & 63], SQUARES[(packed >> 6) & 63]) for packed in buffer[:count]]
+
+
+def from_tuples(moves: Sequence[Move]) -> array:
+    return array("H", [pack(move) for move in moves])
+
+
+def new_buffer() -> array:
+    return array("H", bytes(2 * MAX_MOVES))
+
+
+class MoveBuffers:
+    """Preallocated move buffers, one per ply, reused for the whole search."""
+
+    def __init__(self, max_ply: int = 64):
+        self._buffers = [new_buffer() for _ in range(max_ply)]
+
+    def __getitem__(self, ply: int) -> array:
+        if ply >= len(self._buffers):
+            self._buffers.extend(new_buffer() for _ in range(ply + 1 - len(self._buffers)))
+        return self._buffers[ply]
+
+
+def supports(board) -> bool:
+    """Return True if generate_moves() can handle board."""
+    return (board.width <= MAX_SIZE and board.height <= MAX_SIZE
+            and isinstance(getattr(board, "grid", None), list))
+
+
+# (width, height) -> per-square target tables
+_tables: Dict[Tuple[int, int], dict] = {}
+
+
+def _rays(width: int, height: int, square: int, directions) -> Tuple[Tuple[int, ...], ...]:
+    x, y = SQUARES[square]
+    rays = []
+    for dx, dy in directions:
+        ray = []
+        tx, ty = x + dx, y + dy
+        while 0 <= tx < width and 0 <= ty < height:
+            ray.append(tx | (ty << 3))
+            tx += dx
+            ty += dy
+        rays.append(tuple(ray))
+    return tuple(rays)
+
+
+def _steps(width: int, height: int, square: int, offsets) -> Tuple[int, ...]:
+    x, y = SQUARES[square]
+    return tuple((x + dx) | ((y + dy) << 3) for dx, dy in offsets
+                 if 0 <= x + dx < width and 0 <= y + dy < height)
+
+
+def _tables_for(width: int, height: int) -> dict:
+    tables = _tables.get((width, height))
+    if tables is None:
+        squares = range(64)
+        tables = {
+            "Rook": [_rays(width, height, sq, _ORTHOGONAL) for sq in squares],
+            "Bishop": [_rays(width, height, sq, _DIAGONAL) for sq in squares],
+            "Queen": [_rays(width, height, sq, _ORTHOGONAL + _DIAGONAL) for sq in squares],
+            "Knight": [_steps(width, height, sq, _KNIGHT) for sq in squares],
+            "King": [_steps(width, height, sq, _KING) for sq in squares],
+        }
+        _tables[(width, height)] = tables
+    return tables
+
+
+def generate_moves(board, color: str, out: array) -> int:
+    """
+    Write the pseudo-legal moves of color into out and return their number.
+    The board must pass supports() and out must hold MAX_MOVES entries.
+    """
+    grid = board.grid
+    height = board.height
+    tables = _tables_for(board.width, height)
+    sliders = (tables["Rook"], tables["Bishop"], tables["Queen"])
+    rook_rays, bishop_rays, queen_rays = sliders
+    knight_steps, king_steps = tables["Knight"], tables["King"]
+    capture = CAPTURE << 12
+    count = 0
+    for y in range(height):
+        row = grid[y]
+        for x, piece in enumerate(row):
+            if piece is None or piece.color != color:
+                continue
+            name = piece.__class__.__name__
+            origin = x | (y << 3)
+
+            if name == "Pawn":
+                step = 1 if piece.direction == "UP" else -1
+                ahead = y + step
+                if 0 <= ahead < height:
+                    ahead_row = grid[ahead]
+                    if ahead_row[x] is None:
+                        out[count] = origin | ((x | (ahead << 3)) << 6)
+                        count += 1
+                        if y == (1 if step == 1 else height - 2):
+                            double = ahead + step
+                            if 0 <= double < height and grid[double][x] is None:
+                                out[count] = origin | ((x | (double << 3)) << 6) | (DOUBLE_PUSH << 12)
+                                count += 1
+                    for target_x in (x - 1, x + 1):
+                        if 0 <= target_x < len(ahead_row):
+                            target = ahead_row[target_x]
+                            if target is not None and target.color != color:
+                                out[count] = origin | ((target_x | (ahead << 3)) << 6) | capture
+                                count += 1
+                continue
+
+            if name == "Knight" or name == "King":
+                for square in (knight_steps if name == "Knight" else king_steps)[origin]:
+                    target = grid[square >> 3][square & 7]
+                    if target is None:
+                        out[count] = origin | (square << 6)
+                        count += 1
+                    elif target.color != color:
+                        out[count] = origin | (square << 6) | capture
+                        count += 1
+                continue
+
+            if name == "Rook":
+                rays = rook_rays[origin]
+            elif name == "Bishop":
+                rays = bishop_rays[origin]
+            elif name == "Queen":
+                rays = queen_rays[origin]
+            else:
+                # A piece class without a table: ask it for its moves
+                for end in piece.get_valid_moves(board):
+                    target = grid[end[1]][end[0]]
+                    out[count] = pack(((x, y), end), CAPTURE if target is not None else 0)
+                    count += 1
+                continue
+            for ray in rays:
+                for square in ray:
+                    target = grid[square >> 3][square & 7]
+                    if target is None:
+                        out[count] = origin | (square << 6)
+                        count += 1
+                    else:
+                        if target.color != color:
+                            out[count] = origin | (square << 6) | capture
+                            count += 1
+                        break
+    return count
@@ -0,0 +1,40 @@
+"""
+Square and move names in UCI notation, shared by the UCI front end and the
+tools that read or print moves (opening book, archive, tablebases).
+
+Squares use algebraic names with file a at x = 0 and rank 1 at y = 0; ranks
+may have several digits on boards taller than 9.
+"""
+
+import re
+from typing import Tuple
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+_UCI_MOVE = re.compile(r"^([a-z]\d+)([a-z]\d+)[qrbn]?$")
+
+
+def square_name(position: Tuple[int, int]) -> str:
+    x, y = position
+    return f"{chr(ord('a') + x)}{y + 1}"
+
+
+def parse_square(name: str) -> Tuple[int, int]:
+    return ord(name[0]) - ord('a'), int(name[1:]) - 1
+
+
+def move_to_uci(move: Move) -> str:
+    return square_name(move[0]) + square_name(move[1])
+
+
+def move_from_uci(text: str) -> Move:
+    """
+    Parse 'e2e4'. Ranks may have several digits on boards taller than 9. A
+    promotion suffix as in 'a7a8q' is ignored, since the game has no promotion.
+
+    :raises ValueError: If text isn't a move in UCI notation
+    """
+    match = _UCI_MOVE.match(text)
+    if not match:
+        raise ValueError(f"Invalid UCI move: {text}")
+    return parse_square(match.group(1)), parse_square(match.group(2))
@@ -0,0 +1,215 @@
+"""
+Opening book stored as a sorted file of fixed-size records.
+
+Each record is 16 bytes: the position hash the move is played from, the move
+packed as in the transposition table, and how often it was played. Records
+are sorted by hash, so a reader maps the file and binary-searches it in place;
+opening a book costs nothing however large it is, and a lookup touches only
+the few pages on the search path.
+
+Build a book from PGN (standard algebraic notation) or from move lists in UCI
+notation, then query it, from the backend directory:
+
+    python opening_book.py build games.pgn book.bin --plies 16
+    python opening_book.py probe book.bin
+"""
+
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from game import Game, FEN_PIECES
+from notation import move_from_uci, move_to_uci
+from search import legal_moves
+from transposition import pack_move, unpack_move, NO_MOVE
+
+MAGIC = b"PCBOOK1\0"
+RECORD = struct.Struct("<QII")
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+_SAN = re.compile(r"^([NBRQK])?([a-z])?(\d+)?x?([a-z])(\d+)(=[NBRQ])?[+#!?]*$")
+_RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+
+def read_pgn_games(text: str) -> Iterator[Tuple[List[str], str]]:
+    """Yield (SAN move tokens, result) for every game in a PGN text; the result is '*' if missing."""
+    # Tag pairs, comments and NAGs carry no moves
+    text = re.sub(r"\[[^\]]*\]|\{[^}]*\}|;[^\n]*|\$\d+", " ", text)
+    # Drop variations, innermost first
+    while True:
+        stripped = re.sub(r"\([^()]*\)", " ", text)
+        if stripped == text:
+            break
+        text = stripped
+
+    moves: List[str] = []
+    for token in text.split():
+        if token in _RESULTS:
+            yield moves, token
+            moves = []
+            continue
+        token = re.sub(r"^\d+\.+", "", token)
+        if token:
+            moves.append(token)
+    if moves:
+        yield moves, "*"
+
+
+def san_to_move(game, san: str) -> Move:
+    """
+    Resolve a SAN move such as 'Nf3', 'exd5' or 'R1a3' against the game's legal moves.
+
+    :raises ValueError: If the move is malformed, illegal, ambiguous, or uses a rule
+                        this game doesn't have (castling, promotion)
+    """
+    match = _SAN.match(san)
+    if not match or match.group(6):
+        raise ValueError(f"Unsupported move: {san}")
+    letter, from_file, from_rank, to_file, to_rank = match.groups()[:5]
+    piece_cls = FEN_PIECES[(letter or "p").lower()]
+    end = (ord(to_file) - ord('a'), int(to_rank) - 1)
+
+    board = game.board
+    candidates = [
+        (start, target) for start, target in legal_moves(game, game.turn)
+        if target == end
+        and type(board.get_piece_at(start)) is piece_cls
+        and (from_file is None or start[0] == ord(from_file) - ord('a'))
+        and (from_rank is None or start[1] == int(from_rank) - 1)
+    ]
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move: {san}")
+    return candidates[0]
+
+
+def build_book(games: Iterable[Sequence], path: str, plies: int = 20, min_count: int = 1,
+               start_fen: Optional[str] = None) -> int:
+    """
+    Compile games into a book file.
+
+    :param games: Move sequences, each move a SAN string, a UCI string such as 'e2e4'
+                  or a ((x1, y1), (x2, y2)) tuple. A game stops contributing at its
+                  first move that can't be resolved.
+    :param path: File to write
+    :param plies: Only the first plies moves of each game are added
+    :param min_count: Leave out moves played fewer times than this
+    :param start_fen: Position every game starts from; the standard start by default
+    :return: The number of records written
+    """
+    counts: Dict[Tuple[int, int], int] = {}
+    for moves in games:
+        game = Game.from_fen(start_fen) if start_fen else Game()
+        for token in list(moves)[:plies]:
+            try:
+                if isinstance(token, str):
+                    move = (move_from_uci(token) if re.match(r"^[a-z]\d+[a-z]\d+$", token)
+                            else san_to_move(game, token))
+                else:
+                    move = token
+            except ValueError:
+                break
+            packed = pack_move(move)
+            if packed == NO_MOVE:
+                break
+            key = (game.position_hash(), packed)
+            # UCI and tuple moves aren't checked by parsing; an illegal one ends the game here
+            if game.apply_moves([move]) is not None:
+                break
+            counts[key] = counts.get(key, 0) + 1
+
+    records = sorted((key, packed, count) for (key, packed), count in counts.items() if count >= min_count)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        buffer = bytearray(RECORD.size * len(records))
+        for index, record in enumerate(records):
+            RECORD.pack_into(buffer, index * RECORD.size, *record)
+        f.write(buffer)
+    return len(records)
+
+
+class OpeningBook:
+    """Read-only view of a book file through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(MAGIC):
+            self._file.close()
+            raise ValueError(f"{path} is not an opening book")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not an opening book")
+        self.count = (size - len(MAGIC)) // RECORD.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key_at(self, index: int) -> int:
+        return struct.unpack_from("<Q", self._map, len(MAGIC) + index * RECORD.size)[0]
+
+    def probe(self, key: int) -> List[Tuple[Move, int]]:
+        """Return the (move, weight) pairs stored for a position hash, most played first."""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        entries = []
+        offset = len(MAGIC) + low * RECORD.size
+        while low < self.count:
+            record_key, packed, weight = RECORD.unpack_from(self._map, offset)
+            if record_key != key:
+                break
+            entries.append((unpack_move(packed), weight))
+            low += 1
+            offset += RECORD.size
+        entries.sort(key=lambda entry: -entry[1])
+        return entries
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or query an opening book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a PGN file, or one UCI move list per line, into a book")
+    build.add_argument("source")
+    build.add_argument("book")
+    build.add_argument("--plies", type=int, default=20)
+    build.add_argument("--min-count", type=int, default=1)
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("book")
+    probe.add_argument("fen", nargs="?", default=None, help="position to look up (default: start)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.source) as f:
+            text = f.read()
+        if args.source.endswith(".pgn"):
+            games = (moves for moves, _ in read_pgn_games(text))
+        else:
+            games = (line.split() for line in text.splitlines())
+        written = build_book(games, args.book, args.plies, args.min_count)
+        print(f"Wrote {written} records to {args.book}")
+    else:
+        game = Game.from_fen(args.fen) if args.fen else Game()
+        with OpeningBook(args.book) as book:
+            for move, weight in book.probe(game.position_hash()):
+                print(f"{move_to_uci(move)} {weight}")
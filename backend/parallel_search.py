@@ -0,0 +1,92 @@
+"""
+Lazy SMP: search one position with several processes at once.
+
+Threads can't run a pure-Python search in parallel because of the GIL, so
+each worker is a separate process. All workers search the same root position
+with staggered depths and share a single transposition table placed in
+multiprocessing.shared_memory; entries one worker stores cut off whole
+subtrees for the others. The deepest completed result wins.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+from game import Game
+from search import Searcher
+from transposition import TranspositionTable, ENTRY_SIZE
+
+
+def _search_worker(shm_name: str, entries: int, fen: str, depth: int) -> dict:
+    """Search fen to depth against the shared transposition table."""
+    # Pool workers report to the parent's resource tracker, which unlinks the block once
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tt = TranspositionTable(entries, shm.buf)
+    try:
+        return Searcher(Game.from_fen(fen), tt=tt).iterative_deepening(depth)
+    finally:
+        # Release the table's view first, the block can't close while it is exported
+        tt.buffer.release()
+        shm.close()
+
+
+def parallel_search(game, depth: int, workers: Optional[int] = None, hash_mb: float = 16,
+                    executor: Optional[ProcessPoolExecutor] = None) -> dict:
+    """
+    Search the side to move with several processes sharing a transposition table.
+
+    Worker i searches to depth + i % 2, so half the workers run one ply deeper
+    and fill the table ahead of the others.
+
+    :param game: Game to analyse; it is not modified
+    :param depth: Depth every worker searches to at least
+    :param workers: Number of processes, os.cpu_count() by default
+    :param hash_mb: Size of the shared transposition table in megabytes
+    :param executor: Existing process pool to reuse across calls
+    :return: The deepest result as returned by Searcher.search(), with 'nodes'
+             summed over all workers and 'workers' set to the worker count
+    """
+    workers = workers or os.cpu_count() or 1
+    entries = TranspositionTable.size_for(hash_mb)
+    fen = game.to_fen()
+
+    shm = shared_memory.SharedMemory(create=True, size=entries * ENTRY_SIZE)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # New shared memory is zero-filled, which reads as an empty table
+        futures = [executor.submit(_search_worker, shm.name, entries, fen, depth + i % 2)
+                   for i in range(workers)]
+        results = [future.result() for future in futures]
+    finally:
+        if own_executor:
+            executor.shutdown()
+        shm.close()
+        shm.unlink()
+
+    best = max(results, key=lambda result: result['depth'])
+    combined = dict(best)
+    combined['nodes'] = sum(result['nodes'] for result in results)
+    combined['workers'] = workers
+    return combined
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Search a position with several processes.")
+    parser.add_argument("fen", nargs="?", default=Game().to_fen(), help="position to search (default: start)")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--hash", type=float, default=16, help="shared table size in MB")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = parallel_search(Game.from_fen(args.fen), args.depth, args.workers, args.hash)
+    elapsed = time.perf_counter() - start
+    print(f"best move {result['move']} score {result['score']} depth {result['depth']}")
+    print(f"{result['nodes']} nodes with {result['workers']} workers in {elapsed:.2f}s "
+          f"({result['nodes'] / elapsed:.0f} nps)")
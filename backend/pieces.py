@@ -163,19 +163,17 @@ class Rook(Chess_Piece):
         
         directions = [(0, 1), (0, -1), (1, 0), (-1, 0)]
 
+        if board:
+            # The board finds the nearest blocker along each ray
+            for dx, dy in directions:
+                valid_moves.extend(board.slide_targets((x, y), dx, dy, self.color))
+            return valid_moves
+
         for dx, dy in directions:
             for i in range(1, max(self.board_size)):
                 new_x, new_y = x + dx * i, y + dy * i
                 if not self._is_valid_position((new_x, new_y), self.board_size):
                     break
-                
-                if board:
-                    piece_at_target = board.get_piece_at((new_x, new_y))
-                    if piece_at_target:
-                        if piece_at_target.color != self.color:
-                            valid_moves.append((new_x, new_y))
-                        break # Blocked by piece (friend or foe)
-                
                 valid_moves.append((new_x, new_y))
 
         return valid_moves
@@ -224,19 +222,17 @@ class Queen(Rook):
             (1, 1), (1, -1), (-1, 1), (-1, -1) # Diagonal
         ]
 
+        if board:
+            # The board finds the nearest blocker along each ray
+            for dx, dy in directions:
+                valid_moves.extend(board.slide_targets((x, y), dx, dy, self.color))
+            return valid_moves
+
         for dx, dy in directions:
             for i in range(1, max(self.board_size)):
                 new_x, new_y = x + dx * i, y + dy * i
                 if not self._is_valid_position((new_x, new_y), self.board_size):
                     break
-                
-                if board:
-                    piece_at_target = board.get_piece_at((new_x, new_y))
-                    if piece_at_target:
-                        if piece_at_target.color != self.color:
-                            valid_moves.append((new_x, new_y))
-                        break # Blocked
-                
                 valid_moves.append((new_x, new_y))
 
         return valid_moves
@@ -389,19 +385,17 @@ class Bishop(Chess_Piece):
         
         directions = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
 
+        if board:
+            # The board finds the nearest blocker along each ray
+            for dx, dy in directions:
+                valid_moves.extend(board.slide_targets((x, y), dx, dy, self.color))
+            return valid_moves
+
         for dx, dy in directions:
             for i in range(1, max(self.board_size)):
                 new_x, new_y = x + dx * i, y + dy * i
                 if not self._is_valid_position((new_x, new_y), self.board_size):
                     break
-                
-                if board:
-                    piece_at_target = board.get_piece_at((new_x, new_y))
-                    if piece_at_target:
-                        if piece_at_target.color != self.color:
-                            valid_moves.append((new_x, new_y))
-                        break # Blocked
-                
                 valid_moves.append((new_x, new_y))
 
         return valid_moves
@@ -0,0 +1,126 @@
+"""
+Bounded LRU cache of per-position results: check status and legal moves.
+
+Entries are keyed by Game.position_hash() together with the board size, which
+the Zobrist hash doesn't encode: a placement shared by an 8x8 and a 12x12 game
+has different moves on each. Board updates the Zobrist hash on every mutation,
+so making a move, unmaking it or editing the board moves lookups to another
+key and an entry can never describe a different position than the one it was
+computed for. Only edits that bypass Board's methods (such
+as mutating a piece in place) need Game.invalidate_cache(), which drops the
+current position's entry.
+
+One cache can be shared by many games, e.g. every session on a server, so
+positions that recur across games (openings, transpositions, repeated UI
+queries) are computed once:
+
+    cache = PositionCache(max_bytes=64 << 20)
+    game = Game(cache=cache)
+    ...
+    print(cache.stats())
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Approximate memory of an entry without moves, and of each cached legal move
+# (its target tuple and list slot). Used to keep the cache under max_bytes.
+ENTRY_BYTES = 320
+MOVE_BYTES = 72
+DEFAULT_MAX_BYTES = 16 << 20
+
+# Slots of an entry list
+_WHITE_CHECK, _BLACK_CHECK, _LEGAL, _COST = range(4)
+_CHECK_SLOTS = {"white": _WHITE_CHECK, "black": _BLACK_CHECK}
+
+LegalMoveMap = Dict[Tuple[int, int], List[Tuple[int, int]]]
+# (position hash, board width, board height), see Game._cache_key()
+Key = Tuple[int, int, int]
+
+
+class PositionCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        :param max_bytes: Approximate memory the cache may use; least recently
+                          used positions are evicted beyond it
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> [white in check, black in check, legal move map, cost], None when unknown
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: Key, slot: int):
+        entry = self._entries.get(key)
+        if entry is None or entry[slot] is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[slot]
+
+    def _store(self, key: Key, slot: int, value, cost: int) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = [None, None, None, ENTRY_BYTES]
+            self._entries[key] = entry
+            self.bytes += ENTRY_BYTES
+        else:
+            self._entries.move_to_end(key)
+            if entry[slot] is not None:
+                # Results of a position never change, so the cached one stands
+                return
+        entry[slot] = value
+        entry[_COST] += cost
+        self.bytes += cost
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted[_COST]
+            self.evictions += 1
+
+    def get_check(self, key: Key, color: str) -> Optional[bool]:
+        """Return whether color is in check in the position, or None if unknown."""
+        return self._lookup(key, _CHECK_SLOTS[color])
+
+    def put_check(self, key: Key, color: str, in_check: bool) -> None:
+        self._store(key, _CHECK_SLOTS[color], in_check, 0)
+
+    def get_legal_moves(self, key: Key) -> Optional[LegalMoveMap]:
+        """Return the side to move's legal targets per square, or None if unknown."""
+        return self._lookup(key, _LEGAL)
+
+    def put_legal_moves(self, key: Key, moves: LegalMoveMap) -> None:
+        cost = MOVE_BYTES * sum(len(targets) for targets in moves.values())
+        self._store(key, _LEGAL, moves, cost)
+
+    def invalidate(self, key: Key) -> bool:
+        """Drop everything cached for a position. Returns True if it was cached."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[_COST]
+        self.invalidations += 1
+        return True
+
+    def clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
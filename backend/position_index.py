@@ -0,0 +1,278 @@
+"""
+Position index over a game archive, for opening-explorer queries.
+
+Building replays every archived game once and emits a posting (position hash,
+game id, ply, move played next) for every position a game reaches. Postings
+are collected in memory up to run_size, sorted and spilled to a run file; the
+runs are then merged into one immutable index file with three tables:
+
+    positions  one row per position hash, sorted: where its postings start, how
+               many games reached it, white wins/draws/black wins among them,
+               and where its next-move rows start
+    moves      one row per (position, next move): games that continued with the
+               move and how they scored
+    postings   (game id, ply) of every game reaching each position, grouped by
+               position
+
+A query binary-searches the mapped positions table and reads one row plus its
+next-move rows, so it takes microseconds however large the archive is. A
+position repeated within a game is counted for that game once, at its first
+occurrence.
+
+Build an index from an archive and query it, from the backend directory:
+
+    python position_index.py build games/ games.pidx
+    python position_index.py query games.pidx e2e4 e7e5
+"""
+
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from typing import Iterator, List, Optional, Tuple
+
+from archive import GameArchive, RESULTS, START_FEN, decode_move, encode_move
+from game import Game
+
+MAGIC = b"PCPIDX1\0"
+# Magic, then position, next-move and posting counts
+HEADER = struct.Struct("<8sQQQ")
+# Key, first posting, games, white wins, draws, black wins, first move row, move rows
+POSITION = struct.Struct("<QQIIIIQI")
+# Move, games, white wins, draws, black wins
+MOVE = struct.Struct("<HIIII")
+# Game id, ply
+POSTING = struct.Struct("<IH")
+# Run files: key, game id, ply, next move, result code
+RUN_RECORD = struct.Struct("<QIHHB")
+
+# Next move of a game's final position
+NO_MOVE = 0xFFFF
+DEFAULT_RUN_SIZE = 1 << 20
+_RUN_CHUNK = 4096
+_WHITE_WIN, _BLACK_WIN, _DRAW = RESULTS.index("1-0"), RESULTS.index("0-1"), RESULTS.index("1/2-1/2")
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def _write_run(postings: List[tuple], directory: str, number: int) -> str:
+    postings.sort()
+    path = os.path.join(directory, f"run{number:05d}")
+    with open(path, "wb") as f:
+        for start in range(0, len(postings), _RUN_CHUNK):
+            f.write(b"".join(RUN_RECORD.pack(*posting) for posting in postings[start:start + _RUN_CHUNK]))
+    return path
+
+
+def _read_run(path: str) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(RUN_RECORD.size * _RUN_CHUNK)
+            if not chunk:
+                return
+            yield from RUN_RECORD.iter_unpack(chunk)
+
+
+def build_index(archive: GameArchive, path: str, plies: Optional[int] = None,
+                run_size: int = DEFAULT_RUN_SIZE) -> dict:
+    """
+    Index the positions of every game in an archive.
+
+    :param archive: Open GameArchive to replay
+    :param path: Index file to write
+    :param plies: Only index the first plies positions of each game
+    :param run_size: Postings held in memory before a run is spilled to disk
+    :return: {'games', 'positions', 'postings'} counts
+    """
+    work = tempfile.mkdtemp(prefix="pidx-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        runs = []
+        postings: List[tuple] = []
+        games = 0
+        for game_id, record in enumerate(archive):
+            start_fen = record['start_fen']
+            game = Game() if start_fen == START_FEN else Game.from_fen(start_fen)
+            result = RESULTS.index(record['result'])
+            moves = record['moves'][:plies] if plies is not None else record['moves']
+            seen = set()
+            for ply in range(len(moves) + 1):
+                key = game.position_hash()
+                if key not in seen:
+                    seen.add(key)
+                    next_move = encode_move(moves[ply]) if ply < len(moves) else NO_MOVE
+                    postings.append((key, game_id, ply, next_move, result))
+                if ply < len(moves):
+                    game.make_move(*moves[ply])
+            games += 1
+            if len(postings) >= run_size:
+                runs.append(_write_run(postings, work, len(runs)))
+                postings = []
+        if postings or not runs:
+            runs.append(_write_run(postings, work, len(runs)))
+        del postings
+
+        counts = _merge_runs(runs, path, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    counts['games'] = games
+    return counts
+
+
+def _merge_runs(runs: List[str], path: str, work: str) -> dict:
+    """Merge sorted runs into the final index, streaming each table to its own file."""
+    position_path, move_path, posting_path = (os.path.join(work, name) for name in ("positions", "moves", "postings"))
+    position_rows = move_rows = posting_rows = 0
+    with open(position_path, "wb") as positions, open(move_path, "wb") as moves, \
+            open(posting_path, "wb") as postings:
+        current = None
+        for key, game_id, ply, next_move, result in heapq.merge(*(_read_run(run) for run in runs)):
+            if current is None or key != current[0]:
+                if current:
+                    move_rows += _write_position(current, positions, moves, move_rows)
+                    position_rows += 1
+                # [key, first posting, games, white, draws, black, {move: [games, white, draws, black]}]
+                current = [key, posting_rows, 0, 0, 0, 0, {}]
+            postings.write(POSTING.pack(game_id, ply))
+            posting_rows += 1
+            outcome = (3 if result == _WHITE_WIN else 4 if result == _DRAW
+                       else 5 if result == _BLACK_WIN else None)
+            current[2] += 1
+            if outcome:
+                current[outcome] += 1
+            if next_move != NO_MOVE:
+                stats = current[6].setdefault(next_move, [0, 0, 0, 0])
+                stats[0] += 1
+                if outcome:
+                    stats[outcome - 2] += 1
+        if current:
+            move_rows += _write_position(current, positions, moves, move_rows)
+            position_rows += 1
+
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, position_rows, move_rows, posting_rows))
+        for table in (position_path, move_path, posting_path):
+            with open(table, "rb") as source:
+                shutil.copyfileobj(source, f)
+    return {'positions': position_rows, 'postings': posting_rows}
+
+
+def _write_position(current: list, positions, moves, first_move: int) -> int:
+    key, first_posting, games, white, draws, black, next_moves = current
+    positions.write(POSITION.pack(key, first_posting, games, white, draws, black, first_move, len(next_moves)))
+    for move, stats in sorted(next_moves.items(), key=lambda item: -item[1][0]):
+        moves.write(MOVE.pack(move, *stats))
+    return len(next_moves)
+
+
+class PositionIndex:
+    """Read-only view of an index file through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        if os.fstat(self._file.fileno()).st_size < HEADER.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a position index")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.positions, self.move_rows, self.postings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a position index")
+        self._moves_at = HEADER.size + self.positions * POSITION.size
+        self._postings_at = self._moves_at + self.move_rows * MOVE.size
+
+    def __len__(self) -> int:
+        return self.positions
+
+    def _find(self, key: int) -> Optional[tuple]:
+        low, high = 0, self.positions
+        while low < high:
+            mid = (low + high) // 2
+            row = POSITION.unpack_from(self._map, HEADER.size + mid * POSITION.size)
+            if row[0] == key:
+                return row
+            if row[0] < key:
+                low = mid + 1
+            else:
+                high = mid
+        return None
+
+    def lookup(self, key: int) -> Optional[dict]:
+        """
+        Return the explorer statistics of a position hash, or None if no game reached it.
+
+        :return: {'games', 'white', 'draws', 'black', 'moves': [{'move', 'games',
+                  'white', 'draws', 'black'}, ...] most played first}
+        """
+        row = self._find(key)
+        if row is None:
+            return None
+        _, _, games, white, draws, black, first_move, move_count = row
+        moves = []
+        for index in range(first_move, first_move + move_count):
+            move, move_games, move_white, move_draws, move_black = MOVE.unpack_from(
+                self._map, self._moves_at + index * MOVE.size)
+            moves.append({'move': decode_move(move), 'games': move_games,
+                          'white': move_white, 'draws': move_draws, 'black': move_black})
+        return {'games': games, 'white': white, 'draws': draws, 'black': black, 'moves': moves}
+
+    def games(self, key: int, limit: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Return (game id, ply) of the games that reached a position, in game id order."""
+        row = self._find(key)
+        if row is None:
+            return []
+        first, count = row[1], row[2] if limit is None else min(row[2], limit)
+        start = self._postings_at + first * POSTING.size
+        return list(POSTING.iter_unpack(self._map[start:start + count * POSTING.size]))
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query a position index.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index every position of an archive")
+    build.add_argument("archive")
+    build.add_argument("index")
+    build.add_argument("--plies", type=int, default=None, help="index only the first plies positions of each game")
+    build.add_argument("--run-size", type=int, default=DEFAULT_RUN_SIZE)
+    query = commands.add_parser("query", help="show the statistics of the position after some UCI moves")
+    query.add_argument("index")
+    query.add_argument("moves", nargs="*")
+    query.add_argument("--fen", default=None, help="position the moves start from (default: start)")
+    args = parser.parse_args()
+
+    from notation import move_from_uci, move_to_uci
+
+    start = time.perf_counter()
+    if args.command == "build":
+        with GameArchive(args.archive) as archive:
+            counts = build_index(archive, args.index, args.plies, args.run_size)
+        print(f"Indexed {counts['games']} games: {counts['positions']} positions, "
+              f"{counts['postings']} postings in {time.perf_counter() - start:.2f}s")
+    else:
+        game = Game.from_fen(args.fen) if args.fen else Game()
+        game.apply_moves([move_from_uci(move) for move in args.moves], validate=False)
+        with PositionIndex(args.index) as index:
+            stats = index.lookup(game.position_hash())
+            if stats is None:
+                print("No games reached this position")
+            else:
+                print(f"{stats['games']} games: +{stats['white']} ={stats['draws']} -{stats['black']}")
+                for move in stats['moves']:
+                    print(f"  {move_to_uci(move['move'])}: {move['games']} games, "
+                          f"+{move['white']} ={move['draws']} -{move['black']}")
+                print(f"Game ids: {[game_id for game_id, _ in index.games(game.position_hash(), 10)]}")
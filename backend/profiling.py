@@ -0,0 +1,140 @@
+"""
+Opt-in instrumentation for the hot paths of Game, Board and the pieces.
+
+Nothing is wrapped until enable() is called, so a disabled profiler costs
+nothing: the original methods stay in place on their classes.
+"""
+
+import functools
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Callable, Iterator
+
+# label -> [call count, accumulated wall time in seconds]
+_counters: Dict[str, List[float]] = {}
+# (class, attribute) -> original function, only populated while enabled
+_originals: Dict[Tuple[type, str], Callable] = {}
+
+
+def _targets() -> List[Tuple[type, str, str]]:
+    """Return (class, attribute, label) for every instrumented method."""
+    # Imported lazily because game.py imports this module
+    from board import Board, SparseBoard
+    from game import Game
+    from pieces import Pawn, Rook, Knight, Bishop, Queen, King
+
+    targets = [
+        (Game, "play_turn", "Game.play_turn"),
+        (Game, "is_check", "Game.is_check"),
+        (Game, "is_checkmate", "Game.is_checkmate"),
+        (Board, "get_piece_at", "Board.get_piece_at"),
+        (SparseBoard, "get_piece_at", "SparseBoard.get_piece_at"),
+    ]
+    for cls in (Pawn, Rook, Knight, Bishop, Queen, King):
+        # Only wrap methods a class defines itself, so Queen isn't counted as Rook
+        if "get_valid_moves" in cls.__dict__:
+            targets.append((cls, "get_valid_moves", f"{cls.__name__}.get_valid_moves"))
+    return targets
+
+
+def _instrument(label: str, func: Callable) -> Callable:
+    record = _counters.setdefault(label, [0, 0.0])
+    perf_counter = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record[0] += 1
+            record[1] += perf_counter() - start
+
+    return wrapper
+
+
+def is_enabled() -> bool:
+    """Return True if the hot paths are currently instrumented."""
+    return bool(_originals)
+
+
+def enable() -> None:
+    """Wrap the instrumented methods with call counters and timers."""
+    if _originals:
+        return
+    for cls, attr, label in _targets():
+        original = cls.__dict__[attr]
+        _originals[(cls, attr)] = original
+        setattr(cls, attr, _instrument(label, original))
+
+
+def disable() -> None:
+    """Restore the original methods. Collected counters are kept."""
+    for (cls, attr), original in _originals.items():
+        setattr(cls, attr, original)
+    _originals.clear()
+
+
+def reset() -> None:
+    """Zero all counters in place (wrappers hold references to them)."""
+    for record in _counters.values():
+        record[0] = 0
+        record[1] = 0.0
+
+
+def get_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Return the collected counters.
+
+    :return: {label: {'calls': n, 'total_time': seconds, 'avg_time': seconds}}
+             Times are inclusive, e.g. is_checkmate includes its is_check calls.
+    """
+    stats = {}
+    for label, (calls, total) in sorted(_counters.items()):
+        if calls:
+            stats[label] = {
+                'calls': int(calls),
+                'total_time': total,
+                'avg_time': total / calls
+            }
+    return stats
+
+
+@contextmanager
+def profile() -> Iterator[Dict[str, Dict[str, float]]]:
+    """
+    Collect counters only for the enclosed block.
+
+    The yielded dict is filled with the block's stats when it exits:
+
+        with profile() as stats:
+            game.play_turn((4, 1), (4, 3))
+        print(stats['Game.play_turn']['calls'])
+    """
+    was_enabled = is_enabled()
+    before = {label: list(record) for label, record in _counters.items()}
+    enable()
+    result: Dict[str, Dict[str, float]] = {}
+    try:
+        yield result
+    finally:
+        for label, (calls, total) in _counters.items():
+            prev_calls, prev_total = before.get(label, (0, 0.0))
+            calls -= prev_calls
+            if calls:
+                total -= prev_total
+                result[label] = {
+                    'calls': int(calls),
+                    'total_time': total,
+                    'avg_time': total / calls
+                }
+        if not was_enabled:
+            disable()
+
+
+def print_stats(stats: Dict[str, Dict[str, float]]) -> None:
+    """Print stats as a table sorted by total time."""
+    print(f"{'function':<28}{'calls':>10}{'total ms':>12}{'avg us':>10}")
+    for label, row in sorted(stats.items(), key=lambda item: -item[1]['total_time']):
+        print(f"{label:<28}{row['calls']:>10}"
+              f"{row['total_time'] * 1e3:>12.2f}{row['avg_time'] * 1e6:>10.1f}")
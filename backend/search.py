@@ -0,0 +1,339 @@
+"""
+Alpha-beta search over Game positions.
+
+The searcher plays moves with Game.make_move/unmake_move and scores leaves with
+the incrementally maintained evaluation, so a node costs one move generation
+plus a check test for legality. The check test bypasses Game's position
+cache: search nodes are rarely queried again and would only evict the
+positions a UI or server keeps asking about. Leaves are extended with a
+captures-only quiescence search that skips captures the static exchange
+evaluator says lose material.
+
+A search can be cut short from another thread through a threading.Event, or
+by a time limit; iterative deepening then returns the deepest completed result.
+"""
+
+import time
+from typing import Callable, List, Optional
+
+from evaluation import static_exchange
+from move_ordering import MoveOrderer, Move
+from moves import CAPTURE, SQUARES, MoveBuffers, generate_moves, new_buffer, supports, to_tuples
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+MATE_SCORE = 100_000
+INFINITY = 1_000_000
+# Scores beyond this are mates, stored relative to the node in the transposition table
+MATE_THRESHOLD = MATE_SCORE - 1000
+# Deepest iteration when searching without a depth limit
+MAX_DEPTH = 64
+# Nodes between checks of the stop flag and the clock
+_STOP_CHECK_INTERVAL = 1024
+
+
+class SearchStopped(Exception):
+    """Raised inside the search when it is asked to stop."""
+
+
+def pseudo_legal_moves(game, color: str, buffer=None) -> List[Move]:
+    """
+    Return every (start, end) pair the pieces of color can play, ignoring king safety.
+
+    :param buffer: Move buffer from moves.py to generate into on boards up to
+                   8x8. The moves are returned as tuples; Searcher works on the
+                   packed buffer directly instead.
+    """
+    board = game.board
+    if supports(board):
+        if buffer is None:
+            buffer = new_buffer()
+        return to_tuples(buffer, generate_moves(board, color, buffer))
+    return [(piece.position, end)
+            for piece in list(board.iter_pieces(color))
+            for end in piece.get_valid_moves(board)]
+
+
+def legal_moves(game, color: str) -> List[Move]:
+    """Return every legal (start, end) pair for color."""
+    board = game.board
+    return [(piece.position, end)
+            for piece in list(board.iter_pieces(color))
+            for end in piece.get_valid_moves(board)
+            if game.is_legal_move(piece, end)]
+
+
+def capture_moves(game, color: str, buffer=None) -> List[Move]:
+    """Return the pseudo-legal moves of color that capture a piece."""
+    board = game.board
+    if supports(board):
+        if buffer is None:
+            buffer = new_buffer()
+        # Quiet moves stay packed and are never converted
+        return to_tuples(buffer, generate_moves(board, color, buffer), CAPTURE)
+    return [(start, end) for start, end in pseudo_legal_moves(game, color) if board.get_piece_at(end)]
+
+
+class Searcher:
+    def __init__(self, game, orderer: Optional[MoveOrderer] = None, quiescence: bool = True,
+                 tt: Optional[TranspositionTable] = None, stop=None, tablebases=None,
+                 packed_moves: bool = True):
+        """
+        :param game: Game to search. Moves are made and unmade on it in place.
+        :param orderer: Move ordering to use, a fresh MoveOrderer by default
+        :param quiescence: Resolve captures at the leaves instead of evaluating directly
+        :param tt: Transposition table to read and fill, possibly shared with other searchers
+        :param stop: threading.Event that aborts the search when set
+        :param tablebases: tablebase.Tablebases giving exact scores for the endings they cover
+        :param packed_moves: Generate, order and play packed moves on boards moves.py
+                             supports; False uses (start, end) tuples throughout,
+                             e.g. to benchmark the two against each other
+        """
+        self.game = game
+        self.orderer = orderer if orderer is not None else MoveOrderer()
+        self.quiescence = quiescence
+        self.tt = tt
+        self.stop = stop
+        self.tablebases = tablebases
+        self.packed_moves = packed_moves
+        # perf_counter() value after which the search aborts, if any
+        self.deadline: Optional[float] = None
+        # Deadline another thread may set while the search runs, e.g. on a UCI
+        # ponderhit; iterative_deepening() never resets it
+        self.ponder_deadline: Optional[float] = None
+        self.nodes = 0
+        self.pv: List[Move] = []
+        # Packed move buffer per ply, reused at every node
+        self.buffers = MoveBuffers()
+        # Triangular principal variation table, one line per ply
+        self._pv_table: List[List[Move]] = []
+
+    def search(self, depth: int) -> dict:
+        """
+        Search the side to move to a fixed depth.
+
+        :return: {'move': best move or None, 'score': centipawns for the side to move,
+                  'depth': depth, 'nodes': nodes visited, 'pv': principal variation}
+        :raises SearchStopped: If stopped before finishing; the game is restored first
+        """
+        self.nodes = 0
+        self._pv_table = [[] for _ in range(depth + 1)]
+        game = self.game
+        stack_size = len(game.move_stack)
+        try:
+            score = self._negamax(depth, -INFINITY, INFINITY, 0)
+        except SearchStopped:
+            while len(game.move_stack) > stack_size:
+                game.unmake_move()
+            raise
+        self.pv = self._pv_table[0]
+        return {
+            'move': self.pv[0] if self.pv else None,
+            'score': score,
+            'depth': depth,
+            'nodes': self.nodes,
+            'pv': list(self.pv)
+        }
+
+    def iterative_deepening(self, max_depth: int = MAX_DEPTH, time_limit: Optional[float] = None,
+                            on_iteration: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Search depth 1, 2, ... max_depth and return the deepest result.
+
+        :param time_limit: Seconds after which to stop and keep the last completed depth
+        :param on_iteration: Called with each completed depth's result, e.g. to report progress
+        :return: As search(). If stopped before depth 1 completes, the first
+                 legal move is returned at depth 0, as is the tablebase move in
+                 positions a tablebase covers.
+        """
+        self.orderer.clear()
+        if self.tablebases is not None:
+            move = self.tablebases.best_move(self.game)
+            if move is not None:
+                return {'move': move, 'score': self.tablebases.score(self.game, 0), 'depth': 0,
+                        'nodes': 0, 'pv': [move]}
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        result = None
+        try:
+            for depth in range(1, max_depth + 1):
+                result = self.search(depth)
+                if on_iteration:
+                    on_iteration(result)
+                if abs(result['score']) >= MATE_SCORE - max_depth:
+                    break
+        except SearchStopped:
+            if result is None:
+                moves = legal_moves(self.game, self.game.turn)
+                result = {'move': moves[0] if moves else None, 'score': 0, 'depth': 0,
+                          'nodes': self.nodes, 'pv': moves[:1]}
+        finally:
+            self.deadline = None
+        return result
+
+    def _check_stop(self) -> None:
+        if self.stop is not None and self.stop.is_set():
+            raise SearchStopped()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchStopped()
+        if self.ponder_deadline is not None and time.perf_counter() >= self.ponder_deadline:
+            raise SearchStopped()
+
+    def _negamax(self, depth: int, alpha: int, beta: int, ply: int) -> int:
+        game = self.game
+        if depth == 0:
+            if self.quiescence:
+                return self._quiesce(alpha, beta, ply)
+            self.nodes += 1
+            return game.evaluate()
+        self.nodes += 1
+        if not self.nodes % _STOP_CHECK_INTERVAL:
+            self._check_stop()
+
+        self._pv_table[ply] = []
+        if ply and self.tablebases is not None:
+            score = self.tablebases.score(game, ply)
+            if score is not None:
+                return score
+        tt = self.tt
+        hash_move = None
+        if tt is not None:
+            key = game.position_hash()
+            entry = tt.probe(key)
+            if entry is not None:
+                hash_move, score, entry_depth, flag = entry
+                # The root always searches so it can report a best move and PV
+                if ply and entry_depth >= depth:
+                    score = _score_from_tt(score, ply)
+                    if flag == EXACT:
+                        # Bounds never reach the PV, but an exact score can, so
+                        # keep the line (and the ponder move after it) going
+                        self._pv_table[ply] = self._tt_line(entry_depth)
+                        return score
+                    if (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+                        return score
+
+        color = game.turn
+        orderer = self.orderer
+        board = game.board
+        original_alpha = alpha
+        best_move = None
+        legal_count = 0
+        packed = self.packed_moves and supports(board)
+        if packed:
+            buffer = self.buffers[ply]
+            moves = orderer.ordered_packed(board, buffer, generate_moves(board, color, buffer), ply, hash_move)
+        else:
+            moves = orderer.ordered(board, pseudo_legal_moves(game, color), ply, hash_move)
+        for move in moves:
+            # Packed moves map to the shared square tuples; only kept moves become (start, end)
+            if packed:
+                start, end = SQUARES[move & 63], SQUARES[(move >> 6) & 63]
+            else:
+                start, end = move
+            game.make_move(start, end)
+            if game.king_attacked(color):
+                game.unmake_move()
+                continue
+            legal_count += 1
+            if best_move is None:
+                best_move = (start, end)
+            score = -self._negamax(depth - 1, -beta, -alpha, ply + 1)
+            game.unmake_move()
+
+            if score >= beta:
+                move = (start, end)
+                orderer.record_cutoff(board, move, ply, depth)
+                if tt is not None:
+                    tt.store(key, move, _score_to_tt(score, ply), depth, LOWER)
+                return score
+            if score > alpha:
+                alpha = score
+                best_move = (start, end)
+                self._pv_table[ply] = [best_move] + self._pv_table[ply + 1]
+
+        if not legal_count:
+            # Checkmated (prefer the shortest mate) or stalemated
+            return -MATE_SCORE + ply if game.king_attacked(color) else 0
+        if tt is not None:
+            flag = EXACT if alpha > original_alpha else UPPER
+            tt.store(key, best_move, _score_to_tt(alpha, ply), depth, flag)
+        return alpha
+
+    def _tt_line(self, length: int) -> List[Move]:
+        """Follow hash moves from the current position for up to length plies, stopping at an illegal one."""
+        game = self.game
+        line = []
+        for _ in range(length):
+            entry = self.tt.probe(game.position_hash())
+            move = entry[0] if entry is not None else None
+            if move is None:
+                break
+            piece = game.board.get_piece_at(move[0])
+            # Hash collisions can hand back a move from another position
+            if (piece is None or piece.color != game.turn
+                    or move[1] not in piece.get_valid_moves(game.board)
+                    or not game.is_legal_move(piece, move[1])):
+                break
+            game.make_move(*move)
+            line.append(move)
+        for _ in line:
+            game.unmake_move()
+        return line
+
+    def _quiesce(self, alpha: int, beta: int, ply: int) -> int:
+        """Search captures only until the position is quiet."""
+        self.nodes += 1
+        if not self.nodes % _STOP_CHECK_INTERVAL:
+            self._check_stop()
+        game = self.game
+        stand_pat = game.evaluate()
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        color = game.turn
+        board = game.board
+        packed = self.packed_moves and supports(board)
+        if packed:
+            buffer = self.buffers[ply]
+            moves = self.orderer.ordered_packed(board, buffer, generate_moves(board, color, buffer), ply,
+                                                captures_only=True)
+        else:
+            moves = self.orderer.ordered(board, capture_moves(game, color), ply)
+        for move in moves:
+            if packed:
+                start, end = SQUARES[move & 63], SQUARES[(move >> 6) & 63]
+            else:
+                start, end = move
+            # Captures that lose material in the exchange can't raise alpha
+            if static_exchange(board, start, end) < 0:
+                continue
+            game.make_move(start, end)
+            if game.king_attacked(color):
+                game.unmake_move()
+                continue
+            score = -self._quiesce(-beta, -alpha, ply + 1)
+            game.unmake_move()
+
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+        return alpha
+
+
+def _score_to_tt(score: int, ply: int) -> int:
+    """Make mate scores relative to the node so they stay valid at any ply."""
+    if score > MATE_THRESHOLD:
+        return score + ply
+    if score < -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_tt(score: int, ply: int) -> int:
+    if score > MATE_THRESHOLD:
+        return score - ply
+    if score < -MATE_THRESHOLD:
+        return score + ply
+    return score
@@ -0,0 +1,500 @@
+"""
+Endgame tablebases generated locally by retrograde analysis.
+
+A table covers one material class where a lone king defends against a king
+and up to a few pieces, such as KQK, KRK or KBNK, on the standard 8x8 board.
+Every position stores its distance to mate in plies for the side to move, or
+zero for a draw. Generation starts from all checkmates and walks backwards:
+a position with the strong side to move is won as soon as one move reaches a
+lost position, and a defender position is lost once all of its moves reach
+won ones. Piece movement is taken from the project's own piece classes.
+
+Positions are stored with the strong side as white and its king folded into
+the a1-d1-d4 triangle by the board's symmetries, then bit-packed with just
+enough bits for the longest mate. Probing maps the file and reads a single
+entry, so a lookup costs the same however many tables are loaded.
+
+Classes with two or more pieces beside the king depend on the smaller classes
+the defender reaches by capturing, which are generated first. Pawns aren't
+supported.
+
+Generate tables, then probe a position, from the backend directory:
+
+    python tablebase.py generate KQK KRK KBNK --dir tablebases
+    python tablebase.py probe tablebases "8/8/8/4k3/8/8/8/4K2R w - - 0 1"
+
+KQK and KRK take seconds; KBNK has about 5 million positions and takes minutes.
+"""
+
+import mmap
+import os
+import struct
+from math import gcd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from board import Board
+from game import FEN_PIECES
+from pieces import King
+from search import legal_moves, MATE_SCORE
+
+MAGIC = b"PCTB1\0\0\0"
+# Magic, material name, bits per entry, number of entries
+HEADER = struct.Struct("<8s8sQQ")
+
+SIZE = 8
+SQUARES = SIZE * SIZE
+
+# Squares the strong king is folded into: a1-d1-d4
+TRIANGLE = [y * SIZE + x for y in range(4) for x in range(y, 4)]
+TRIANGLE_INDEX = {square: index for index, square in enumerate(TRIANGLE)}
+
+# Upper-case letter of each piece type, as used in material class names
+PIECE_LETTERS = {cls.__name__: letter.upper() for letter, cls in FEN_PIECES.items()}
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def _symmetries() -> List[List[int]]:
+    """The 8 symmetries of the square board as square maps, identity first."""
+    maps = []
+    for transpose in (False, True):
+        for flip_y in (False, True):
+            for flip_x in (False, True):
+                mapping = []
+                for square in range(SQUARES):
+                    x, y = square % SIZE, square // SIZE
+                    if flip_x:
+                        x = SIZE - 1 - x
+                    if flip_y:
+                        y = SIZE - 1 - y
+                    if transpose:
+                        x, y = y, x
+                    mapping.append(y * SIZE + x)
+                maps.append(mapping)
+    return maps
+
+
+SYMMETRIES = _symmetries()
+# For each strong king square, the symmetries that bring it into the triangle.
+# Kings on the diagonal have two, the identity and the transpose.
+KING_SYMMETRIES = [[mapping for mapping in SYMMETRIES if mapping[square] in TRIANGLE_INDEX]
+                   for square in range(SQUARES)]
+
+
+def _rays(piece_cls) -> List[List[List[int]]]:
+    """
+    Return, for every square, the piece's moves on an empty board grouped into
+    rays ordered outwards. Leapers get one single-square ray per move.
+    """
+    rays = []
+    for square in range(SQUARES):
+        x, y = square % SIZE, square // SIZE
+        board = Board(SIZE, SIZE)
+        piece = piece_cls("TB", None, "white", "UP", (SIZE, SIZE))
+        board.place_piece(piece, (x, y))
+        groups: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        for mx, my in piece.get_valid_moves(board):
+            dx, dy = mx - x, my - y
+            step = gcd(abs(dx), abs(dy))
+            groups.setdefault((dx // step, dy // step), []).append((step, my * SIZE + mx))
+        rays.append([[target for _, target in sorted(group)] for group in groups.values()])
+    return rays
+
+
+_geometry_cache: Dict[str, Tuple[List[List[List[int]]], List[Dict[int, Tuple[int, ...]]]]] = {}
+
+
+def _geometry(piece_cls):
+    """Return (rays, lines) for a piece class; lines[from][to] lists the squares in between."""
+    name = piece_cls.__name__
+    if name not in _geometry_cache:
+        rays = _rays(piece_cls)
+        lines = [{target: tuple(ray[:i]) for ray in square_rays for i, target in enumerate(ray)}
+                 for square_rays in rays]
+        _geometry_cache[name] = (rays, lines)
+    return _geometry_cache[name]
+
+
+class _Material:
+    """Indexing and move geometry for one material class."""
+
+    def __init__(self, name: str):
+        if len(name) < 3 or name[0] != "K" or name[-1] != "K" or "K" in name[1:-1]:
+            raise ValueError(f"Unsupported material class: {name}")
+        # Pawn geometry depends on direction, rank and captures, which the rays don't model
+        if "P" in name or any(letter.lower() not in FEN_PIECES for letter in name[1:-1]):
+            raise ValueError(f"Unsupported material class: {name}")
+        self.name = name
+        self.piece_classes = [FEN_PIECES[letter.lower()] for letter in name[1:-1]]
+        self.piece_types = [cls.__name__ for cls in self.piece_classes]
+        self.pieces = len(self.piece_classes)
+        # Positions per side to move: strong king in the triangle, the other pieces anywhere
+        self.size = len(TRIANGLE) * SQUARES ** (self.pieces + 1)
+        self.king_rays, self.king_lines = _geometry(King)
+        self.rays = [_geometry(cls)[0] for cls in self.piece_classes]
+        self.lines = [_geometry(cls)[1] for cls in self.piece_classes]
+
+    def index(self, squares: Sequence[int]) -> int:
+        """Index of canonical (strong king, pieces..., lone king) squares."""
+        index = TRIANGLE_INDEX[squares[0]]
+        for square in squares[1:]:
+            index = index * SQUARES + square
+        return index
+
+    def decode(self, index: int) -> List[int]:
+        squares = []
+        for _ in range(self.pieces + 1):
+            squares.append(index % SQUARES)
+            index //= SQUARES
+        squares.append(TRIANGLE[index])
+        squares.reverse()
+        return squares
+
+    def canonical(self, squares: Sequence[int]) -> List[int]:
+        """Fold squares by symmetry so the strong king lands in the triangle."""
+        candidates = [[mapping[square] for square in squares] for mapping in KING_SYMMETRIES[squares[0]]]
+        return min(candidates)
+
+    def attacked(self, target: int, squares: Sequence[int], occupied) -> bool:
+        """Is target attacked by the strong side? A piece standing on target is being captured."""
+        if target in self.king_lines[squares[0]]:
+            return True
+        for lines, square in zip(self.lines, squares[1:-1]):
+            if square == target:
+                continue
+            between = lines[square].get(target)
+            if between is not None and not any(b in occupied for b in between):
+                return True
+        return False
+
+    def legal_layout(self, squares: Sequence[int]) -> bool:
+        return (len(set(squares)) == len(squares)
+                and squares[-1] not in self.king_lines[squares[0]])
+
+
+def insufficient(letters: str) -> bool:
+    """Can a king with these pieces never force mate? Only true for nothing or a single minor."""
+    return letters in ("", "B", "N")
+
+
+def generate(name: str, path: Optional[str] = None, subtables: Optional[Dict[str, bytearray]] = None) -> bytearray:
+    """
+    Build the distance-to-mate table for a material class by retrograde analysis.
+
+    Positions where the defender can capture a piece depend on the smaller
+    class left behind, so those tables are generated first.
+
+    :param name: Material class such as "KQK", strong side first
+    :param path: File to write the packed table to, if given
+    :param subtables: Tables already generated, by name; this table and those
+                      generated along the way are added to it, so one dict can
+                      serve several calls
+    :return: One byte per position, plies to mate + 1, or 0 for draws and
+             illegal positions. White-to-move positions come first.
+    """
+    material = _Material(name)
+    if subtables is None:
+        subtables = {}
+    # Smaller classes reached by capturing each piece, None when they can't win
+    captures = []
+    for piece in range(material.pieces):
+        rest = name[:piece + 1] + name[piece + 2:]
+        if insufficient(rest[1:-1]):
+            captures.append(None)
+            continue
+        if rest not in subtables:
+            generate(rest, subtables=subtables)
+        captures.append((_Material(rest), subtables[rest]))
+
+    size = material.size
+    values = bytearray(2 * size)
+    # Defender-to-move positions: moves not yet known to lose
+    remaining = bytearray(size)
+    lost: List[int] = []
+    # plies -> defender positions with a capture into a position the strong side
+    # wins in plies + 1, counted down when generation reaches that depth
+    capture_wins: Dict[int, List[int]] = {}
+
+    for index in range(size):
+        squares = material.decode(index)
+        if not material.legal_layout(squares) or material.canonical(squares) != squares:
+            continue
+        king = squares[-1]
+        occupied = set(squares)
+        occupied.discard(king)
+        successors = set()
+        for (target,) in material.king_rays[king]:
+            if target in occupied:
+                if target == squares[0] or material.attacked(target, squares, occupied - {target}):
+                    continue
+                # Captures are told apart from quiet moves by negative successors
+                successors.add(-1 - target)
+                piece = squares.index(target, 1) - 1
+                if captures[piece] is None:
+                    # Too little material left to mate: the position is never lost
+                    continue
+                rest_material, rest_values = captures[piece]
+                rest = squares[:piece + 1] + squares[piece + 2:-1] + [target]
+                value = rest_values[rest_material.index(rest_material.canonical(rest))]
+                if value:
+                    capture_wins.setdefault(value - 2, []).append(index)
+            elif not material.attacked(target, squares, occupied):
+                moved = squares[:-1] + [target]
+                successors.add(material.index(material.canonical(moved)))
+        if successors:
+            remaining[index] = len(successors)
+        elif material.attacked(king, squares, occupied):
+            values[size + index] = 1
+            lost.append(index)
+
+    plies = 0
+    last_capture = max(capture_wins, default=-1)
+    while lost or plies <= last_capture:
+        won = []
+        for index in lost:
+            squares = material.decode(index)
+            king = squares[-1]
+            occupied = set(squares)
+            for piece in range(material.pieces + 1):
+                rays = material.king_rays if piece == 0 else material.rays[piece - 1]
+                for ray in rays[squares[piece]]:
+                    for origin in ray:
+                        if origin in occupied:
+                            break
+                        before = list(squares)
+                        before[piece] = origin
+                        if not material.legal_layout(before):
+                            continue
+                        # The defender can't be in check with the strong side to move
+                        if material.attacked(king, before, set(before)):
+                            continue
+                        previous = material.index(material.canonical(before))
+                        if not values[previous]:
+                            values[previous] = plies + 2
+                            won.append(previous)
+
+        lost = []
+        for index in won:
+            squares = material.decode(index)
+            occupied = set(squares)
+            predecessors = set()
+            for (origin,) in material.king_rays[squares[-1]]:
+                before = squares[:-1] + [origin]
+                if origin in occupied or not material.legal_layout(before):
+                    continue
+                predecessors.add(material.index(material.canonical(before)))
+            for previous in predecessors:
+                if remaining[previous]:
+                    remaining[previous] -= 1
+                    if not remaining[previous]:
+                        values[size + previous] = plies + 3
+                        lost.append(previous)
+        # Captures into smaller classes won at this depth count down the same way
+        for previous in capture_wins.pop(plies, ()):
+            remaining[previous] -= 1
+            if not remaining[previous]:
+                values[size + previous] = plies + 3
+                lost.append(previous)
+        plies += 2
+
+    subtables[name] = values
+    if path is not None:
+        write_table(name, values, path)
+    return values
+
+
+def write_table(name: str, values: bytearray, path: str) -> None:
+    """Bit-pack a generated table into path."""
+    bits = max(1, max(values).bit_length())
+    # One spare byte so a reader can always load two bytes at once
+    packed = bytearray((len(values) * bits + 7) // 8 + 1)
+    for index, value in enumerate(values):
+        if not value:
+            continue
+        offset = index * bits
+        byte, shift = offset >> 3, offset & 7
+        packed[byte] |= (value << shift) & 0xFF
+        if shift + bits > 8:
+            packed[byte + 1] |= value >> (8 - shift)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, name.encode(), bits, len(values)))
+        f.write(packed)
+
+
+class Tablebase:
+    """One table file, probed in place through mmap."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, name, self.bits, self.entries = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a tablebase")
+        self.name = name.rstrip(b"\0").decode()
+        self.material = _Material(self.name)
+        self._mask = (1 << self.bits) - 1
+
+    def value(self, index: int) -> int:
+        offset = index * self.bits
+        byte = HEADER.size + (offset >> 3)
+        word = self._map[byte] | (self._map[byte + 1] << 8)
+        return (word >> (offset & 7)) & self._mask
+
+    def probe_squares(self, squares: Sequence[int], strong_to_move: bool) -> int:
+        """Return the stored value for (strong king, pieces..., lone king) squares."""
+        material = self.material
+        index = material.index(material.canonical(squares))
+        return self.value(index if strong_to_move else material.size + index)
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+def material_name(board) -> Optional[Tuple[str, str]]:
+    """
+    Return (strong color, letters of its pieces besides the king) when the other
+    side has a lone king, e.g. ("white", "BN"), or None otherwise.
+    """
+    names = {}
+    for color, counts in board.material.items():
+        names[color] = "".join(PIECE_LETTERS[name] * count for name, count in counts.items() if name != "King")
+    strong = [color for color, letters in names.items() if letters]
+    if len(strong) != 1:
+        return None
+    return strong[0], names[strong[0]]
+
+
+class Tablebases:
+    """
+    All tables in a directory, looked up by material.
+
+    probe() and best_move() answer for the side to move of a Game, or return
+    None when no loaded table covers the position.
+    """
+
+    def __init__(self, directory: str):
+        self.tables: Dict[str, Tablebase] = {}
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith(".tb"):
+                table = Tablebase(os.path.join(directory, filename))
+                self.tables[table.name] = table
+        self.max_pieces = max((len(name) for name in self.tables), default=0)
+
+    def _lookup(self, game) -> Optional[Tuple[Tablebase, List[int], bool]]:
+        board = game.board
+        if board.width != SIZE or board.height != SIZE:
+            return None
+        if sum(sum(counts.values()) for counts in board.material.values()) > self.max_pieces:
+            return None
+        found = material_name(board)
+        if found is None:
+            return None
+        strong, letters = found
+        table = None
+        for name, candidate in self.tables.items():
+            if sorted(name[1:-1]) == sorted(letters):
+                table = candidate
+                break
+        if table is None:
+            return None
+
+        # Tables have the strong side as white; mirror ranks when it is black
+        def square(position):
+            x, y = position
+            return (y if strong == "white" else SIZE - 1 - y) * SIZE + x
+
+        weak = "black" if strong == "white" else "white"
+        pieces = {}
+        for piece in board.iter_pieces(strong):
+            pieces.setdefault(piece.__class__.__name__, []).append(square(piece.position))
+        squares = [square(board.king_positions[strong])]
+        for name in table.material.piece_types:
+            squares.append(pieces[name].pop())
+        squares.append(square(board.king_positions[weak]))
+        return table, squares, game.turn == strong
+
+    def probe(self, game) -> Optional[dict]:
+        """
+        :return: {'result': 'win', 'loss' or 'draw' for the side to move,
+                  'dtm': plies to mate, None for draws}, or None if no table applies
+        """
+        found = self._lookup(game)
+        if found is None:
+            return None
+        table, squares, strong_to_move = found
+        value = table.probe_squares(squares, strong_to_move)
+        if not value:
+            return {'result': 'draw', 'dtm': None}
+        return {'result': 'win' if strong_to_move else 'loss', 'dtm': value - 1}
+
+    def score(self, game, ply: int) -> Optional[int]:
+        """
+        Return the position's value as a search score at ply, mates nearer the
+        root scoring higher, or None if no table applies.
+        """
+        entry = self.probe(game)
+        if entry is None or entry['result'] == 'draw':
+            return None if entry is None else 0
+        if entry['result'] == 'win':
+            return MATE_SCORE - ply - entry['dtm']
+        return -MATE_SCORE + ply + entry['dtm']
+
+    def best_move(self, game) -> Optional[Move]:
+        """
+        Return the move that mates fastest when winning, resists longest when
+        losing, and keeps the draw otherwise; None if no table applies.
+        """
+        if self.probe(game) is None:
+            return None
+        best = None
+        best_score = None
+        for move in legal_moves(game, game.turn):
+            game.make_move(*move)
+            score = -(self.score(game, 0) or 0)
+            game.unmake_move()
+            if best_score is None or score > best_score:
+                best, best_score = move, score
+        return best
+
+    def close(self) -> None:
+        for table in self.tables.values():
+            table.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="build tables by retrograde analysis")
+    build.add_argument("names", nargs="+", help="material classes, e.g. KQK KRK KBNK")
+    build.add_argument("--dir", default="tablebases")
+    lookup = commands.add_parser("probe", help="look up a position")
+    lookup.add_argument("dir")
+    lookup.add_argument("fen")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        os.makedirs(args.dir, exist_ok=True)
+        generated: Dict[str, bytearray] = {}
+        for name in args.names:
+            start = time.perf_counter()
+            values = generate(name, os.path.join(args.dir, f"{name}.tb"), generated)
+            print(f"{name}: longest mate {max(values) - 1} plies, "
+                  f"{time.perf_counter() - start:.1f}s")
+    else:
+        from game import Game
+        from notation import move_to_uci
+
+        game = Game.from_fen(args.fen)
+        tables = Tablebases(args.dir)
+        entry = tables.probe(game)
+        if entry is None:
+            print("No table covers this position")
+        else:
+            move = tables.best_move(game)
+            print(f"{entry['result']}, dtm {entry['dtm']}, best move {move_to_uci(move) if move else '-'}")
@@ -0,0 +1,314 @@
+"""
+Self-play tournaments between engine variants, with Elo and SPRT statistics.
+
+Each opening is played twice with colors swapped. The engines are
+deterministic, so a start and color assignment always give the same game: once
+the opening suite runs out, further pairs start from an opening followed by a
+few seeded random plies, and no start is played twice (a replayed game would
+count as a new sample and narrow the error bars for nothing).
+
+Games run across a process pool and are adjudicated from the play_turn result
+flags (checkmate, stalemate, insufficient material), threefold repetition, or
+a ply limit. A sequential probability ratio test stops the match as soon as
+the result is statistically clear.
+
+Example, from the backend directory:
+
+    python tournament.py --engine name=new,depth=3 --engine name=old,depth=2 --games 200
+"""
+
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from game import Game
+from move_ordering import MoveOrderer, UnorderedMoves
+from search import Searcher, legal_moves
+from transposition import TranspositionTable
+
+# Balanced starting positions after a few well known opening moves
+DEFAULT_OPENINGS = [
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 1",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 1",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w - - 0 1",
+    "rnbqkb1r/pppppppp/5n2/8/2P5/8/PP1PPPPP/RNBQKBNR w - - 0 1",
+    "rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 1",
+    "rnbqkbnr/pp1ppppp/2p5/8/4P3/8/PPPP1PPP/RNBQKBNR w - - 0 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 0 1",
+    "rnbqkbnr/ppp1pppp/8/3p4/2PP4/8/PP2PPPP/RNBQKBNR b - - 0 1",
+]
+
+DEFAULT_ENGINE = {"depth": 2, "quiescence": True, "ordering": True, "hash_mb": 1}
+DEFAULT_RANDOM_PLIES = 2
+# Draws of random plies per extra pair before giving up on finding a new start
+_VARIATION_ATTEMPTS = 100
+
+
+def choose_move(game, engine: dict, tt: Optional[TranspositionTable]):
+    """Return the move the engine variant plays in game."""
+    orderer = MoveOrderer() if engine.get("ordering", True) else UnorderedMoves()
+    searcher = Searcher(game, orderer, quiescence=engine.get("quiescence", True), tt=tt)
+    return searcher.iterative_deepening(engine["depth"])['move']
+
+
+def play_game(white: dict, black: dict, fen: str, max_plies: int = 200) -> Tuple[float, str]:
+    """
+    Play one game between two engine variants.
+
+    :return: (white's score: 1, 0.5 or 0, reason the game ended)
+    """
+    game = Game.from_fen(fen)
+    engines = {"white": white, "black": black}
+    tables = {color: TranspositionTable(TranspositionTable.size_for(engine.get("hash_mb", 1)))
+              for color, engine in engines.items()}
+    seen: Dict[int, int] = {game.position_hash(): 1}
+
+    for _ in range(max_plies):
+        color = game.turn
+        move = choose_move(game, engines[color], tables[color])
+        if move is None:
+            # Only reachable if the opening itself is already finished
+            return (0.5, "no legal moves") if not game.is_check(color) else (
+                (0.0, "checkmate") if color == "white" else (1.0, "checkmate"))
+        result = game.play_turn(*move)
+        if not result['success']:
+            raise RuntimeError(f"Engine played an illegal move {move}: {result['message']}")
+        if result['is_checkmate']:
+            return (1.0 if result['winner'] == "White" else 0.0), "checkmate"
+        if result['is_stalemate']:
+            return 0.5, "stalemate"
+        if result['is_draw']:
+            return 0.5, "insufficient material"
+
+        key = game.position_hash()
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] >= 3:
+            return 0.5, "threefold repetition"
+    return 0.5, "ply limit"
+
+
+def opening_schedule(games: int, openings: Sequence[str] = DEFAULT_OPENINGS,
+                     random_plies: int = DEFAULT_RANDOM_PLIES, seed: int = 0) -> List[Tuple[str, bool]]:
+    """
+    Return (start FEN, first engine plays white) for each game of a match,
+    rounded up to whole color-swapped pairs.
+
+    The first pairs use the openings as given. Further pairs play random_plies
+    seeded random legal moves from an opening, skipping starts already used.
+
+    :raises ValueError: If no new start can be found, e.g. more than
+                        2 * len(openings) games with random_plies=0
+    """
+    rng = random.Random(seed)
+    used = set()
+    schedule = []
+    pair = 0
+    while len(schedule) < games:
+        opening = openings[pair % len(openings)]
+        if pair < len(openings):
+            fen = opening
+        else:
+            for _ in range(_VARIATION_ATTEMPTS if random_plies else 0):
+                game = Game.from_fen(opening)
+                for _ in range(random_plies):
+                    moves = legal_moves(game, game.turn)
+                    if not moves:
+                        break
+                    game.make_move(*rng.choice(moves))
+                fen = game.to_fen()
+                if fen not in used and legal_moves(game, game.turn):
+                    break
+            else:
+                raise ValueError(f"Only {2 * len(used)} distinct games can be scheduled from "
+                                 f"{len(openings)} openings with random_plies={random_plies}; "
+                                 f"{games} were requested")
+        used.add(fen)
+        schedule.append((fen, True))
+        schedule.append((fen, False))
+        pair += 1
+    return schedule
+
+
+def _play_pair_game(first: dict, second: dict, fen: str, first_is_white: bool, max_plies: int) -> float:
+    """Play one game and return the first engine's score."""
+    if first_is_white:
+        return play_game(first, second, fen, max_plies)[0]
+    return 1.0 - play_game(second, first, fen, max_plies)[0]
+
+
+def expected_score(elo: float) -> float:
+    """Return the expected score for an Elo difference."""
+    return 1.0 / (1.0 + 10 ** (-elo / 400.0))
+
+
+def elo_from_score(score: float) -> float:
+    """Return the Elo difference implied by a score fraction."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def elo_estimate(wins: int, draws: int, losses: int) -> Tuple[float, float]:
+    """
+    Return (Elo difference, half-width of its 95% confidence interval)
+    from the first engine's point of view.
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0, float("inf")
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        # All results identical: no spread to estimate an error from yet
+        return elo_from_score(score), float("inf")
+    margin = 1.96 * math.sqrt(variance / games)
+    low = elo_from_score(score - margin)
+    high = elo_from_score(score + margin)
+    return elo_from_score(score), (high - low) / 2
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    Return the log-likelihood ratio of H1 (Elo difference elo1) against H0 (elo0),
+    using the normal approximation to the trinomial game outcomes.
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance <= 0:
+        return 0.0
+    s0 = expected_score(elo0)
+    s1 = expected_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) / (2 * variance / games)
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """Return the (lower, upper) LLR bounds for the given error rates."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def run_match(first: dict, second: dict, games: int = 100, openings: Sequence[str] = DEFAULT_OPENINGS,
+              workers: Optional[int] = None, max_plies: int = 200, elo0: float = 0.0, elo1: float = 10.0,
+              alpha: float = 0.05, beta: float = 0.05, progress=None,
+              random_plies: int = DEFAULT_RANDOM_PLIES, seed: int = 0) -> dict:
+    """
+    Play up to games games between two engine variants and stop early once the
+    SPRT accepts either hypothesis.
+
+    :param first: Engine variant under test, e.g. {"name": "new", "depth": 3}
+    :param second: Baseline variant
+    :param games: Maximum number of games; rounded up to a whole number of color-swapped pairs
+    :param openings: Starting FENs, each played with both colors; see opening_schedule()
+                     for how more than 2 * len(openings) games are scheduled
+    :param elo0: Elo difference of H0 (no improvement)
+    :param elo1: Elo difference of H1 (the improvement we hope to detect)
+    :param progress: Optional callback called with the running report after every game
+    :param random_plies: Random plies appended to an opening once the suite is used up;
+                         with 0, at most 2 * len(openings) games can be played
+    :param seed: Seed of the random plies, so a match can be repeated exactly
+    :return: Report dict with wins/draws/losses from first's point of view, 'elo',
+             'elo_error' (95% half-width), 'llr', 'bounds' and 'sprt' ('H0', 'H1' or None)
+    """
+    first = dict(DEFAULT_ENGINE, **first)
+    second = dict(DEFAULT_ENGINE, **second)
+    workers = workers or os.cpu_count() or 1
+    lower, upper = sprt_bounds(alpha, beta)
+
+    schedule = opening_schedule(games, openings, random_plies, seed)
+
+    report = {
+        "first": first.get("name", "first"),
+        "second": second.get("name", "second"),
+        "games": 0, "wins": 0, "draws": 0, "losses": 0,
+        "elo": 0.0, "elo_error": float("inf"),
+        "llr": 0.0, "bounds": (lower, upper), "sprt": None
+    }
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_play_pair_game, first, second, fen, first_is_white, max_plies)
+                   for fen, first_is_white in schedule]
+        try:
+            for future in as_completed(futures):
+                score = future.result()
+                report["games"] += 1
+                if score == 1.0:
+                    report["wins"] += 1
+                elif score == 0.0:
+                    report["losses"] += 1
+                else:
+                    report["draws"] += 1
+                wdl = (report["wins"], report["draws"], report["losses"])
+                report["elo"], report["elo_error"] = elo_estimate(*wdl)
+                report["llr"] = sprt_llr(*wdl, elo0, elo1)
+                if progress:
+                    progress(report)
+                if report["llr"] >= upper:
+                    report["sprt"] = "H1"
+                elif report["llr"] <= lower:
+                    report["sprt"] = "H0"
+                if report["sprt"]:
+                    break
+        finally:
+            # Don't spend CPU on games whose result can no longer matter
+            for future in futures:
+                future.cancel()
+    return report
+
+
+def _parse_engine(spec: str) -> dict:
+    """Parse 'name=new,depth=3,quiescence=0' into an engine dict."""
+    engine = {}
+    for item in spec.split(","):
+        key, _, value = item.partition("=")
+        if key == "name":
+            engine[key] = value
+        elif key in ("quiescence", "ordering"):
+            engine[key] = value.lower() not in ("0", "false", "no")
+        elif key == "hash_mb":
+            engine[key] = float(value)
+        else:
+            engine[key] = int(value)
+    return engine
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Play a match between two engine variants.")
+    parser.add_argument("--engine", action="append", required=True,
+                        help="engine variant as name=...,depth=N[,quiescence=0][,ordering=0][,hash_mb=N]; give twice")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--openings", help="file with one starting FEN per line")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-plies", type=int, default=200)
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=10.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--random-plies", type=int, default=DEFAULT_RANDOM_PLIES,
+                        help="random plies after the opening once every opening was played")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if len(args.engine) != 2:
+        parser.error("exactly two --engine options are required")
+    openings = DEFAULT_OPENINGS
+    if args.openings:
+        with open(args.openings) as f:
+            openings = [line.strip() for line in f if line.strip()]
+
+    def show(report):
+        print(f"{report['games']:>5} games  +{report['wins']} ={report['draws']} -{report['losses']}  "
+              f"elo {report['elo']:+.1f} +/- {report['elo_error']:.1f}  llr {report['llr']:+.2f}")
+
+    first, second = (_parse_engine(spec) for spec in args.engine)
+    report = run_match(first, second, args.games, openings, args.workers, args.max_plies,
+                       args.elo0, args.elo1, args.alpha, args.beta, progress=show,
+                       random_plies=args.random_plies, seed=args.seed)
+    lower, upper = report["bounds"]
+    verdict = {"H1": "H1 accepted (improvement)", "H0": "H0 accepted (no improvement)"}.get(
+        report["sprt"], "inconclusive")
+    print(f"{report['first']} vs {report['second']}: SPRT [{args.elo0}, {args.elo1}] "
+          f"bounds ({lower:.2f}, {upper:.2f}) -> {verdict}")
@@ -0,0 +1,329 @@
+"""
+Export training positions to NumPy .npy shards, without needing NumPy.
+
+Every position becomes one record of a structured array:
+
+    planes  uint8 (12, height, width): one plane per piece type and color, in
+            the order P N B R Q K for white then black; planes[p, y, x] is 1
+            when that piece stands on (x, y), so row 0 is white's home rank
+    stm     uint8: side to move, 0 white, 1 black
+    result  int8: game result from white's point of view, 1, 0 or -1
+    score   int32: search score in centipawns for the side to move
+
+Positions come from engine self-play or from replaying a game archive. Games
+are processed in batches across a process pool; workers return encoded
+records and the parent appends them to fixed-size shards through one
+preallocated buffer, so memory stays flat however many positions are
+exported. Each shard's header is written by hand and patched with the final
+record count when the shard is closed; load a shard with numpy.load().
+
+From the backend directory:
+
+    python training_export.py selfplay data/ --games 1000 --depth 2
+    python training_export.py archive games/ data/ --score-depth 1
+"""
+
+import os
+import random
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from game import Game, FEN_LETTERS
+from search import Searcher, legal_moves
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+# Header length field of a version 1.0 .npy file
+NPY_HEADER_LENGTH = struct.Struct("<H")
+PIECE_ORDER = "pnbrqk"
+PLANES = 2 * len(PIECE_ORDER)
+# stm, result, score
+RECORD_TAIL = struct.Struct("<Bbi")
+
+DEFAULT_SHARD_SIZE = 1 << 16
+# Records buffered before each write
+DEFAULT_FLUSH_RECORDS = 4096
+DEFAULT_BATCH_GAMES = 8
+RESULT_VALUES = {"1-0": 1, "0-1": -1, "1/2-1/2": 0}
+# Keeps mate scores inside int32 with room to spare
+SCORE_LIMIT = 1_000_000
+
+
+def record_size(width: int = 8, height: int = 8) -> int:
+    return PLANES * width * height + RECORD_TAIL.size
+
+
+def npy_descr(width: int = 8, height: int = 8) -> str:
+    return f"[('planes', '|u1', ({PLANES}, {height}, {width})), ('stm', '|u1'), ('result', '|i1'), ('score', '<i4')]"
+
+
+def npy_header(descr: str, count: int, length: Optional[int] = None) -> bytes:
+    """
+    Build a version 1.0 .npy header for count records.
+
+    :param length: Pad to exactly this many bytes, so a header written for a
+                   larger count can be overwritten in place
+    """
+    text = f"{{'descr': {descr}, 'fortran_order': False, 'shape': ({count},), }}"
+    prefix = len(NPY_MAGIC) + NPY_HEADER_LENGTH.size
+    if length is None:
+        # Text plus the closing newline, padded so the data starts 64-byte aligned
+        length = -(-(prefix + len(text) + 1) // 64) * 64
+    padding = length - prefix - len(text) - 1
+    if padding < 0:
+        raise ValueError("Header doesn't fit the reserved length")
+    return NPY_MAGIC + NPY_HEADER_LENGTH.pack(length - prefix) + text.encode("latin1") + b" " * padding + b"\n"
+
+
+def encode_position(game, result: int, score: int) -> bytes:
+    """Encode the game's current position as one record."""
+    board = game.board
+    width, height = board.width, board.height
+    area = width * height
+    planes = bytearray(PLANES * area)
+    for piece in board.iter_pieces():
+        plane = PIECE_ORDER.index(FEN_LETTERS[type(piece)]) + (0 if piece.color == "white" else len(PIECE_ORDER))
+        x, y = piece.position
+        planes[plane * area + y * width + x] = 1
+    score = max(-SCORE_LIMIT, min(SCORE_LIMIT, score))
+    return bytes(planes) + RECORD_TAIL.pack(0 if game.turn == "white" else 1, result, score)
+
+
+class ShardWriter:
+    """Append records to numbered .npy shards of at most shard_size records each."""
+
+    def __init__(self, directory: str, width: int = 8, height: int = 8, shard_size: int = DEFAULT_SHARD_SIZE,
+                 prefix: str = "positions", flush_records: int = DEFAULT_FLUSH_RECORDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.record_size = record_size(width, height)
+        self.descr = npy_descr(width, height)
+        # Reserve room for the largest count, then patch the real one in on close
+        self._header_length = len(npy_header(self.descr, shard_size))
+        self._buffer = bytearray(flush_records * self.record_size)
+        self._buffered = 0
+        self._file = None
+        self._shard_count = 0
+        self.shards: List[str] = []
+        self.positions = 0
+
+    def write(self, records: bytes) -> None:
+        """Append whole encoded records."""
+        view = memoryview(records)
+        size = self.record_size
+        if len(view) % size:
+            raise ValueError("Records don't match the shard record size")
+        while view:
+            if self._file is None:
+                self._open_shard()
+            # Fill the buffer, without crossing the end of the current shard
+            room = min(len(self._buffer) - self._buffered,
+                       (self.shard_size - self._shard_count) * size - self._buffered)
+            chunk = view[:room]
+            self._buffer[self._buffered:self._buffered + len(chunk)] = chunk
+            self._buffered += len(chunk)
+            view = view[len(chunk):]
+            if self._buffered == len(self._buffer) or self._shard_count + self._buffered // size == self.shard_size:
+                self._flush()
+            if self._shard_count == self.shard_size:
+                self._close_shard()
+
+    def _open_shard(self) -> None:
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.shards):05d}.npy")
+        self._file = open(path, "wb")
+        self._file.write(npy_header(self.descr, 0, self._header_length))
+        self._shard_count = 0
+        self.shards.append(path)
+
+    def _flush(self) -> None:
+        if self._buffered:
+            self._file.write(memoryview(self._buffer)[:self._buffered])
+            records = self._buffered // self.record_size
+            self._shard_count += records
+            self.positions += records
+            self._buffered = 0
+
+    def _close_shard(self) -> None:
+        self._flush()
+        self._file.seek(0)
+        self._file.write(npy_header(self.descr, self._shard_count, self._header_length))
+        self._file.close()
+        self._file = None
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _score(game, depth: int) -> int:
+    if depth <= 0:
+        return game.evaluate()
+    return Searcher(game).iterative_deepening(depth)['score']
+
+
+def _self_play_result(game, seen: Dict[int, int]) -> Optional[int]:
+    """Return the result if the game is over, from white's point of view."""
+    color = game.turn
+    if seen[game.position_hash()] >= 3 or game.is_insufficient_material():
+        return 0
+    if not game.has_legal_move(color):
+        return (-1 if color == "white" else 1) if game.is_check(color) else 0
+    return None
+
+
+def play_self_play_game(rng: random.Random, depth: int, random_plies: int, max_plies: int) -> List[bytes]:
+    """
+    Play one engine game, opening with random moves for variety, and return the
+    records of the searched positions. Games reaching max_plies count as draws.
+    """
+    game = Game()
+    records = []
+    seen: Dict[int, int] = {}
+    result = 0
+    for ply in range(max_plies):
+        key = game.position_hash()
+        seen[key] = seen.get(key, 0) + 1
+        outcome = _self_play_result(game, seen)
+        if outcome is not None:
+            result = outcome
+            break
+        if ply < random_plies:
+            move = rng.choice(legal_moves(game, game.turn))
+        else:
+            search = Searcher(game).iterative_deepening(depth)
+            move = search['move']
+            # The result byte is filled in once the game is over
+            records.append(bytearray(encode_position(game, 0, search['score'])))
+        game.make_move(*move)
+
+    result_offset = len(records[0]) - RECORD_TAIL.size + 1 if records else 0
+    for record in records:
+        struct.pack_into("<b", record, result_offset, result)
+    return [bytes(record) for record in records]
+
+
+def _self_play_batch(seed: int, games: int, depth: int, random_plies: int, max_plies: int) -> bytes:
+    rng = random.Random(seed)
+    return b"".join(b"".join(play_self_play_game(rng, depth, random_plies, max_plies)) for _ in range(games))
+
+
+def _archive_batch(directory: str, start: int, stop: int, score_depth: int) -> bytes:
+    from archive import GameArchive, START_FEN
+
+    records = bytearray()
+    with GameArchive(directory) as archive:
+        for game_id in range(start, stop):
+            record = archive[game_id]
+            result = RESULT_VALUES.get(record['result'])
+            if result is None:
+                # Unfinished games have no label to learn from
+                continue
+            fen = record['start_fen']
+            game = Game() if fen == START_FEN else Game.from_fen(fen)
+            if (game.board.width, game.board.height) != (8, 8):
+                # Shards hold 8x8 planes
+                continue
+            for move in record['moves']:
+                records += encode_position(game, result, _score(game, score_depth))
+                game.make_move(*move)
+    return bytes(records)
+
+
+def _run_batches(batch: Callable[..., bytes], arguments: Iterable[tuple], writer: ShardWriter,
+                 workers: Optional[int], progress: Optional[Callable[[int], None]]) -> None:
+    """Run batches across a pool and write their records in order, keeping few results in flight."""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: List = []
+        arguments = iter(arguments)
+        while True:
+            while len(pending) < 2 * workers:
+                args = next(arguments, None)
+                if args is None:
+                    break
+                pending.append(executor.submit(batch, *args))
+            if not pending:
+                return
+            writer.write(pending.pop(0).result())
+            if progress:
+                progress(writer.positions)
+
+
+def export_self_play(directory: str, games: int, depth: int = 2, random_plies: int = 8, max_plies: int = 200,
+                     shard_size: int = DEFAULT_SHARD_SIZE, workers: Optional[int] = None,
+                     batch_games: int = DEFAULT_BATCH_GAMES, seed: int = 0,
+                     progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    Play games engine against engine and export every searched position.
+
+    :param depth: Search depth for both the moves and the scores
+    :param random_plies: Opening plies played at random and not exported
+    :return: {'positions': records written, 'shards': shard paths}
+    """
+    batches = [(seed + index, min(batch_games, games - start), depth, random_plies, max_plies)
+               for index, start in enumerate(range(0, games, batch_games))]
+    with ShardWriter(directory, shard_size=shard_size) as writer:
+        _run_batches(_self_play_batch, batches, writer, workers, progress)
+    return {'positions': writer.positions, 'shards': writer.shards}
+
+
+def export_archive(archive_directory: str, directory: str, score_depth: int = 0,
+                   shard_size: int = DEFAULT_SHARD_SIZE, workers: Optional[int] = None,
+                   batch_games: int = 64, progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    Replay an archive and export the positions of its finished games.
+
+    :param score_depth: Search depth for the score; 0 uses the static evaluation
+    :return: {'positions': records written, 'shards': shard paths}
+    """
+    from archive import GameArchive
+
+    with GameArchive(archive_directory) as archive:
+        games = len(archive)
+    batches = [(archive_directory, start, min(start + batch_games, games), score_depth)
+               for start in range(0, games, batch_games)]
+    with ShardWriter(directory, shard_size=shard_size) as writer:
+        _run_batches(_archive_batch, batches, writer, workers, progress)
+    return {'positions': writer.positions, 'shards': writer.shards}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Export training positions to .npy shards.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    selfplay = commands.add_parser("selfplay", help="export positions from engine self-play")
+    selfplay.add_argument("output")
+    selfplay.add_argument("--games", type=int, default=100)
+    selfplay.add_argument("--depth", type=int, default=2)
+    selfplay.add_argument("--random-plies", type=int, default=8)
+    selfplay.add_argument("--seed", type=int, default=0)
+    replay = commands.add_parser("archive", help="export positions from a game archive")
+    replay.add_argument("archive")
+    replay.add_argument("output")
+    replay.add_argument("--score-depth", type=int, default=0)
+    for command in (selfplay, replay):
+        command.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE)
+        command.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = lambda positions: print(f"\r{positions} positions", end="", flush=True)
+    if args.command == "selfplay":
+        summary = export_self_play(args.output, args.games, args.depth, args.random_plies,
+                                   shard_size=args.shard_size, workers=args.workers, seed=args.seed,
+                                   progress=report)
+    else:
+        summary = export_archive(args.archive, args.output, args.score_depth,
+                                 shard_size=args.shard_size, workers=args.workers, progress=report)
+    print(f"\rWrote {summary['positions']} positions to {len(summary['shards'])} shards "
+          f"in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,96 @@
+"""
+Fixed-size transposition table stored in a flat buffer.
+
+Each slot is 16 bytes: the position key XORed with the packed data word, then
+the data word itself. A reader only accepts a slot whose two words XOR back to
+the key it asked for, so the table can live in multiprocessing.shared_memory
+and be written by several processes without locks; a torn write simply reads
+as a miss.
+"""
+
+import struct
+from typing import Optional, Tuple
+
+EXACT = 0
+LOWER = 1  # score is a lower bound (beta cutoff)
+UPPER = 2  # score is an upper bound (no move raised alpha)
+
+ENTRY = struct.Struct("<QQ")
+ENTRY_SIZE = ENTRY.size
+
+_SCORE_BITS = 24
+_SCORE_OFFSET = 1 << (_SCORE_BITS - 1)
+# Moves are stored as 6-bit x/y pairs, which covers boards up to 64x64
+NO_MOVE = (1 << 24) - 1
+
+Move = Tuple[Tuple[int, int], Tuple[int, int]]
+
+
+def pack_move(move: Optional[Move]) -> int:
+    """Pack a move into 24 bits; None and moves off a 64x64 board become NO_MOVE."""
+    if move is None:
+        return NO_MOVE
+    (x1, y1), (x2, y2) = move
+    if max(x1, y1, x2, y2) >= 64:
+        return NO_MOVE
+    return x1 | (y1 << 6) | (x2 << 12) | (y2 << 18)
+
+
+def unpack_move(packed: int) -> Optional[Move]:
+    if packed == NO_MOVE:
+        return None
+    return ((packed & 63, (packed >> 6) & 63), ((packed >> 12) & 63, (packed >> 18) & 63))
+
+
+class TranspositionTable:
+    def __init__(self, entries: int = 1 << 16, buffer=None):
+        """
+        :param entries: Number of slots
+        :param buffer: Writable buffer of at least entries * ENTRY_SIZE bytes to use,
+                       e.g. SharedMemory.buf. A private bytearray is allocated when omitted.
+        """
+        self.entries = entries
+        self.buffer = memoryview(buffer if buffer is not None else bytearray(entries * ENTRY_SIZE))
+        if len(self.buffer) < entries * ENTRY_SIZE:
+            raise ValueError(f"Buffer too small for {entries} entries")
+
+    @staticmethod
+    def size_for(megabytes: float) -> int:
+        """Return the number of entries that fit in the given size."""
+        return max(1, int(megabytes * 1024 * 1024) // ENTRY_SIZE)
+
+    def clear(self) -> None:
+        self.buffer[:self.entries * ENTRY_SIZE] = bytes(self.entries * ENTRY_SIZE)
+
+    def store(self, key: int, move: Optional[Move], score: int, depth: int, flag: int) -> None:
+        """
+        Store a search result. A slot is replaced unless it holds the same
+        position searched deeper.
+        """
+        offset = (key % self.entries) * ENTRY_SIZE
+        checked, data = ENTRY.unpack_from(self.buffer, offset)
+        if checked ^ data == key and (data >> 8) & 0xFF > depth:
+            return
+        score = max(-_SCORE_OFFSET, min(_SCORE_OFFSET - 1, score)) + _SCORE_OFFSET
+        data = flag | (min(depth, 255) << 8) | (score << 16) | (pack_move(move) << 40)
+        ENTRY.pack_into(self.buffer, offset, key ^ data, data)
+
+    def probe(self, key: int) -> Optional[Tuple[Optional[Move], int, int, int]]:
+        """
+        Look up a position.
+
+        :return: (move, score, depth, flag), or None if the position is not stored
+        """
+        checked, data = ENTRY.unpack_from(self.buffer, (key % self.entries) * ENTRY_SIZE)
+        if not data or checked ^ data != key:
+            return None
+        flag = data & 0xFF
+        depth = (data >> 8) & 0xFF
+        score = ((data >> 16) & ((1 << _SCORE_BITS) - 1)) - _SCORE_OFFSET
+        return unpack_move(data >> 40), score, depth, flag
+
+    def hashfull(self, sample: int = 1000) -> int:
+        """Return the permille of used slots among the first sample slots."""
+        sample = min(sample, self.entries)
+        used = sum(1 for i in range(sample) if ENTRY.unpack_from(self.buffer, i * ENTRY_SIZE)[1])
+        return used * 1000 // sample
@@ -0,0 +1,273 @@
+"""
+UCI (Universal Chess Interface) front end for the engine.
+
+Reads commands on stdin and answers on stdout, so tournament managers and
+GUIs can drive the searcher directly:
+
+    python uci.py
+
+The engine keeps one Game for the whole session. A "position" command that
+extends the previous one only plays the new moves, and "go" searches on a
+background thread so "stop", "isready" and "quit" are answered while it runs.
+With the BookFile option set, positions in the opening book are answered from
+the book without searching; TablebasePath does the same for covered endings.
+
+"go ponder" searches the position after the expected reply while the opponent
+thinks, filling the shared transposition table. "ponderhit" turns it into the
+real search: its time budget counts from when pondering started, so a long
+ponder answers at once. On a miss the GUI sends "stop" and the new position.
+Squares use algebraic names with file a at x = 0 and rank 1 at y = 0.
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from game import Game
+from notation import move_from_uci, move_to_uci
+from opening_book import OpeningBook
+from search import Searcher, MATE_SCORE, MATE_THRESHOLD, MAX_DEPTH, legal_moves
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+ENGINE_NAME = "Python Chess"
+ENGINE_AUTHOR = "Python Chess contributors"
+DEFAULT_HASH_MB = 16
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"
+
+def _score_text(score: int) -> str:
+    if abs(score) > MATE_THRESHOLD:
+        plies = MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+class UCIEngine:
+    def __init__(self, output: Callable[[str], None] = None, hash_mb: float = DEFAULT_HASH_MB):
+        """
+        :param output: Called with every line the engine sends, printing to stdout by default
+        :param hash_mb: Transposition table size in megabytes
+        """
+        self.output = output or (lambda line: print(line, flush=True))
+        self.tt = TranspositionTable(TranspositionTable.size_for(hash_mb))
+        self.game = Game()
+        # Start FEN and moves of the current position, to play only new moves next time
+        self._position: Tuple[str, List[str]] = (START_FEN, [])
+        self.book: Optional[OpeningBook] = None
+        self.own_book = True
+        self.tablebases: Optional[Tablebases] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Set while a "go ponder" search runs, until ponderhit or stop
+        self._pondering = threading.Event()
+        self._searcher: Optional[Searcher] = None
+        # Time budget of the pondering search and when it started, applied on ponderhit
+        self._ponder_limit: Optional[float] = None
+        self._ponder_start = 0.0
+
+    def handle(self, line: str) -> bool:
+        """Process one command line. Returns False once the engine should exit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        try:
+            return self._dispatch(tokens[0], tokens[1:])
+        except (ValueError, IndexError, KeyError, OSError) as exc:
+            # A bad command from the GUI must not take the engine down
+            self.output(f"info string error in '{line.strip()}': {exc}")
+            return True
+
+    def _dispatch(self, command: str, args: List[str]) -> bool:
+        if command == "uci":
+            self.output(f"id name {ENGINE_NAME}")
+            self.output(f"id author {ENGINE_AUTHOR}")
+            self.output(f"option name Hash type spin default {DEFAULT_HASH_MB} min 1 max 1024")
+            self.output("option name Ponder type check default false")
+            self.output("option name OwnBook type check default true")
+            self.output("option name BookFile type string default <empty>")
+            self.output("option name TablebasePath type string default <empty>")
+            self.output("uciok")
+        elif command == "isready":
+            self.output("readyok")
+        elif command == "setoption":
+            self._set_option(args)
+        elif command == "ucinewgame":
+            self.stop()
+            self.tt.clear()
+            self._set_position(START_FEN, [], force=True)
+        elif command == "position":
+            self.stop()
+            self._position_command(args)
+        elif command == "go":
+            self.stop()
+            self._go(args)
+        elif command == "ponderhit":
+            self._ponderhit()
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    def stop(self) -> None:
+        """Stop a running search and wait for it to report its best move."""
+        if self._thread is not None:
+            self._stop.set()
+            self._pondering.clear()
+            self._thread.join()
+            self._thread = None
+
+    def _set_option(self, args: List[str]) -> None:
+        text = " ".join(args)
+        name, _, value = text.partition(" value ")
+        name = name.replace("name ", "", 1).strip().lower()
+        value = value.strip()
+        self.stop()
+        if name == "hash" and value:
+            self.tt = TranspositionTable(TranspositionTable.size_for(float(value)))
+        elif name == "ownbook":
+            self.own_book = value.lower() == "true"
+        elif name == "bookfile":
+            if self.book is not None:
+                self.book.close()
+                self.book = None
+            if value and value != "<empty>":
+                self.book = OpeningBook(value)
+        elif name == "tablebasepath":
+            if self.tablebases is not None:
+                self.tablebases.close()
+                self.tablebases = None
+            if value and value != "<empty>":
+                self.tablebases = Tablebases(value)
+
+    def _position_command(self, args: List[str]) -> None:
+        moves_at = args.index("moves") if "moves" in args else len(args)
+        if args and args[0] == "fen":
+            fen = " ".join(args[1:moves_at])
+        else:
+            fen = START_FEN
+        self._set_position(fen, args[moves_at + 1:])
+
+    def _set_position(self, fen: str, moves: List[str], force: bool = False) -> None:
+        start_fen, played = self._position
+        if not force and fen == start_fen and moves[:len(played)] == played:
+            # Same game continued: keep the board and play only the new moves
+            new_moves = moves[len(played):]
+        else:
+            self.game = Game() if fen == START_FEN else Game.from_fen(fen)
+            new_moves = moves
+        played_count = len(moves) - len(new_moves)
+        for text in new_moves:
+            try:
+                illegal = self.game.apply_moves([move_from_uci(text)]) is not None
+            except ValueError:
+                illegal = True
+            if illegal:
+                # Out of sync with the GUI: keep the position before the bad move
+                self.output(f"info string illegal move {text}, ignoring it and the moves after it")
+                break
+            played_count += 1
+        self._position = (fen, list(moves[:played_count]))
+
+    def _go(self, args: List[str]) -> None:
+        params = {}
+        for name, value in zip(args, args[1:]):
+            if value.lstrip("-").isdigit():
+                params[name] = int(value)
+        depth = params.get("depth", MAX_DEPTH)
+        time_limit = None
+        if "movetime" in params:
+            time_limit = params["movetime"] / 1000
+        elif "infinite" not in args:
+            clock, increment = ("wtime", "winc") if self.game.turn == "white" else ("btime", "binc")
+            if clock in params:
+                moves_to_go = params.get("movestogo", 30)
+                budget = params[clock] / moves_to_go + params.get(increment, 0) / 2
+                # Never plan to use more than half the clock on one move
+                time_limit = min(budget, params[clock] / 2) / 1000
+
+        ponder = "ponder" in args
+        # A book answer would be a bestmove during ponder, which the protocol forbids
+        if self.own_book and self.book is not None and not ponder:
+            move = self.game.book_move(self.book)
+            if move is not None:
+                self.output(f"bestmove {move_to_uci(move)}")
+                return
+
+        self._stop.clear()
+        self._searcher = Searcher(self.game, tt=self.tt, stop=self._stop, tablebases=self.tablebases)
+        if ponder:
+            self._ponder_limit = time_limit
+            self._ponder_start = time.perf_counter()
+            self._pondering.set()
+            # No deadline until ponderhit
+            time_limit = None
+        self._thread = threading.Thread(target=self._search, args=(depth, time_limit), daemon=True)
+        self._thread.start()
+
+    def _ponderhit(self) -> None:
+        """The expected move was played: keep the pondering search, now on the clock."""
+        if not self._pondering.is_set():
+            return
+        if self._ponder_limit is not None:
+            # Read by the search thread at its next stop check
+            self._searcher.ponder_deadline = self._ponder_start + self._ponder_limit
+        self._pondering.clear()
+
+    def _search(self, depth: int, time_limit: Optional[float]) -> None:
+        searcher = self._searcher
+        start = time.perf_counter()
+        total_nodes = 0
+        completed: Optional[dict] = None
+
+        def report(result: dict) -> None:
+            nonlocal total_nodes, completed
+            completed = result
+            total_nodes += result['nodes']
+            elapsed = max(time.perf_counter() - start, 1e-6)
+            pv = " ".join(move_to_uci(move) for move in result['pv'])
+            self.output(f"info depth {result['depth']} score {_score_text(result['score'])} "
+                        f"nodes {total_nodes} time {int(elapsed * 1000)} "
+                        f"nps {int(total_nodes / elapsed)} pv {pv}")
+
+        game = self.game
+        stack_size = len(game.move_stack)
+        try:
+            result = searcher.iterative_deepening(depth, time_limit, on_iteration=report)
+        except Exception as exc:
+            # The GUI waits for a bestmove whatever happens, so answer with the
+            # deepest completed iteration or any legal move
+            self.output(f"info string search failed: {exc!r}")
+            while len(game.move_stack) > stack_size:
+                game.unmake_move()
+            if completed is not None:
+                result = completed
+            else:
+                moves = legal_moves(game, game.turn)
+                result = {'move': moves[0] if moves else None, 'pv': moves[:1]}
+        # A finished ponder search holds its answer until ponderhit or stop
+        while self._pondering.is_set() and not self._stop.wait(0.01):
+            pass
+        self._ponder_limit = None
+        move = result['move']
+        if move is None:
+            self.output("bestmove 0000")
+        elif len(result['pv']) > 1:
+            self.output(f"bestmove {move_to_uci(move)} ponder {move_to_uci(result['pv'][1])}")
+        else:
+            self.output(f"bestmove {move_to_uci(move)}")
+
+
+def main(stream=None) -> None:
+    engine = UCIEngine()
+    for line in stream or sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Zobrist keys for hashing positions.
+
+Keys are derived from the piece type, color and square with a fixed mixing
+function rather than a random table, so every process (and every board size)
+agrees on the same hash for the same position without sharing any state.
+"""
+
+from typing import Dict, Tuple
+
+MASK_64 = (1 << 64) - 1
+
+PIECE_INDEX: Dict[str, int] = {"Pawn": 0, "Knight": 1, "Bishop": 2, "Rook": 3, "Queen": 4, "King": 5}
+
+
+def _splitmix64(value: int) -> int:
+    value = (value + 0x9E3779B97F4A7C15) & MASK_64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+
+# XORed into the position hash when black is to move
+BLACK_TO_MOVE = _splitmix64(0xB1ACC)
+
+_cache: Dict[Tuple[str, str, int, int], int] = {}
+
+
+def piece_key(piece, position: Tuple[int, int]) -> int:
+    """Return the 64-bit key for piece standing on position."""
+    name = piece.__class__.__name__
+    x, y = position
+    cache_key = (name, piece.color, x, y)
+    key = _cache.get(cache_key)
+    if key is None:
+        index = PIECE_INDEX.get(name, len(PIECE_INDEX)) * 2 + (piece.color == "black")
+        key = _splitmix64((index << 40) | (x << 20) | y)
+        _cache[cache_key] = key
+    return key
@@ -42,7 +42,7 @@ async function initPyodide() {
     
     // Load Python files
     // In a real deployment, we'd fetch these. For now, we assume they are served at ../backend/
-    const files = ['board.py', 'chess_piece.py', 'game.py', 'pieces.py'];
+    const files = ['board.py', 'chess_piece.py', 'game.py', 'pieces.py', 'profiling.py', 'evaluation.py', 'zobrist.py'];
     
     for (const file of files) {
         try {
@@ -79,6 +79,7 @@ function renderBoard() {
     // Python get_board_state returns rows from y=7 down to y=0.
     // So state[0] is row 7 (Black pieces), state[7] is row 0 (White pieces).
     const state = pythonGame.get_board_state().toJs();
+    const targets = selectedSquare ? legalTargetsOf(selectedSquare) : [];
 
     // Determine rendering order based on flip state
     const yRange = boardFlipped ? [7, 6, 5, 4, 3, 2, 1, 0] : [0, 1, 2, 3, 4, 5, 6, 7];
@@ -107,12 +108,24 @@ function renderBoard() {
                 square.classList.add('selected');
             }
 
+            if (targets.some(([tx, ty]) => tx === x && ty === 7 - y)) {
+                square.classList.add('valid-move');
+            }
+
             square.onclick = () => handleSquareClick(x, 7 - y);
             boardDiv.appendChild(square);
         }
     }
 }
 
+function legalTargetsOf(square) {
+    // Python caches the legal moves of the current position, so this is cheap on every render
+    const proxy = pythonGame.legal_targets([square.x, square.y]);
+    const targets = proxy.toJs();
+    proxy.destroy();
+    return targets;
+}
+
 async function handleSquareClick(x, y) {
     if (!pythonGame) return;
 
@@ -153,6 +166,8 @@ async function handleSquareClick(x, y) {
             const captured = response.get('captured');
             const isCheck = response.get('is_check');
             const isCheckmate = response.get('is_checkmate');
+            const isStalemate = response.get('is_stalemate');
+            const isDraw = response.get('is_draw');
             const winner = response.get('winner');
             
             if (responseProxy && typeof responseProxy.destroy === 'function') {
@@ -181,6 +196,10 @@ async function handleSquareClick(x, y) {
                 
                 if (isCheckmate) {
                     logMsg += ` - Checkmate`;
+                } else if (isStalemate) {
+                    logMsg += ` - Stalemate`;
+                } else if (isDraw) {
+                    logMsg += ` - Draw`;
                 } else if (isCheck) {
                     logMsg += ` - Check`;
                 }
@@ -192,6 +211,8 @@ async function handleSquareClick(x, y) {
                 
                 if (isCheckmate) {
                     statusEl.innerText = `Checkmate! ${winner} wins!`;
+                } else if (isDraw) {
+                    statusEl.innerText = message;
                 } else if (isCheck) {
                     statusEl.innerText = `${pythonGame.turn.charAt(0).toUpperCase() + pythonGame.turn.slice(1)}'s turn (Check!)`;
                 } else {
@@ -284,8 +305,7 @@ function log(msg) {
 
 function resetGame() {
     if (pythonGame) {
-        pyodide.runPython("game = Game()");
-        pythonGame = pyodide.globals.get('game');
+        pyodide.runPython("game.reset()");
         selectedSquare = null;
         document.getElementById('status').innerText = "White's Turn";
         renderBoard();
@@ -0,0 +1,116 @@
+"""Tests for the append-only game archive: round trips, reopening and crash recovery."""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from archive import (ArchiveWriter, GameArchive, OFFSET, RESULTS, START_FEN,  # noqa: E402
+                     _segment_paths, encode_game)
+from game import Game  # noqa: E402
+from search import legal_moves  # noqa: E402
+
+OTHER_FEN = "4k3/8/8/8/8/8/3PPP2/4K3 w - - 0 1"
+
+
+def random_games(count: int, seed: int = 0):
+    """Yield (moves, result, start FEN) of random legal games."""
+    rng = random.Random(seed)
+    for number in range(count):
+        start_fen = OTHER_FEN if number % 5 == 4 else START_FEN
+        game = Game.from_fen(start_fen)
+        moves = []
+        for _ in range(rng.randrange(0, 30)):
+            candidates = legal_moves(game, game.turn)
+            if not candidates:
+                break
+            move = rng.choice(candidates)
+            game.make_move(*move)
+            moves.append(move)
+        yield moves, rng.choice(RESULTS), start_fen
+
+
+def write(directory, games, **options):
+    with ArchiveWriter(str(directory), sync=False, **options) as writer:
+        return [writer.append(moves, result, fen) for moves, result, fen in games]
+
+
+def assert_archive(directory, games):
+    with GameArchive(str(directory)) as archive:
+        assert len(archive) == len(games)
+        expected = [{'moves': moves, 'result': result, 'start_fen': fen} for moves, result, fen in games]
+        assert list(archive) == expected
+        for game_id in (0, len(games) // 2, len(games) - 1):
+            assert archive[game_id] == expected[game_id]
+
+
+def test_append_and_reopen(tmp_path):
+    games = list(random_games(23))
+    assert write(tmp_path, games[:10], segment_games=4, batch_size=3) == list(range(10))
+    # Reopening keeps the segment size the archive was created with
+    assert write(tmp_path, games[10:], segment_games=100) == list(range(10, 23))
+    assert_archive(tmp_path, games)
+    assert os.path.exists(_segment_paths(str(tmp_path), 5)[1])
+
+
+def test_replay(tmp_path):
+    games = list(random_games(5))
+    write(tmp_path, games)
+    with GameArchive(str(tmp_path)) as archive:
+        for game_id, (moves, _, fen) in enumerate(games):
+            expected = Game.from_fen(fen)
+            for move in moves:
+                expected.make_move(*move)
+            assert archive.replay(game_id).to_fen() == expected.to_fen()
+
+
+def test_refresh_sees_new_games(tmp_path):
+    games = list(random_games(6))
+    write(tmp_path, games[:2])
+    with GameArchive(str(tmp_path)) as archive:
+        write(tmp_path, games[2:], segment_games=4)
+        assert len(archive) == 2
+        archive.refresh()
+        assert len(archive) == 6
+        assert archive[5]['moves'] == games[5][0]
+
+
+@pytest.mark.parametrize("torn_bytes", [1, 7])
+def test_torn_batch_is_dropped_on_reopen(tmp_path, torn_bytes):
+    games = list(random_games(8))
+    write(tmp_path, games[:6], segment_games=4)
+    data_path, index_path = _segment_paths(str(tmp_path), 1)
+    # A crash mid-flush: half of a record and a partial index entry reached the disk
+    record = encode_game(*games[6][:2])
+    with open(data_path, "ab") as data:
+        data.write(record[:len(record) // 2])
+    with open(index_path, "ab") as index:
+        index.write(OFFSET.pack(os.path.getsize(data_path))[:torn_bytes])
+
+    # Readers ignore the partial index entry
+    assert_archive(tmp_path, games[:6])
+    # Writers truncate both files back to the last committed game and carry on
+    assert write(tmp_path, games[6:]) == [6, 7]
+    assert_archive(tmp_path, games)
+
+
+def test_records_past_the_index_are_discarded(tmp_path):
+    games = list(random_games(4))
+    write(tmp_path, games[:3])
+    data_path, _ = _segment_paths(str(tmp_path), 0)
+    committed = os.path.getsize(data_path)
+    # Records written and synced, but the crash came before their index entries
+    with open(data_path, "ab") as data:
+        data.write(encode_game(*games[3][:2]) * 2)
+    with ArchiveWriter(str(tmp_path), sync=False) as writer:
+        assert len(writer) == 3
+    assert os.path.getsize(data_path) == committed
+    assert_archive(tmp_path, games[:3])
+
+
+def test_not_an_archive(tmp_path):
+    with pytest.raises(ValueError):
+        GameArchive(str(tmp_path))
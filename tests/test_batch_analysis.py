@@ -0,0 +1,34 @@
+"""Tests for the shared-memory position batches."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from batch_analysis import PositionBatch  # noqa: E402
+from game import Game  # noqa: E402
+
+LARGE_FEN = "/".join(["12"] * 11) + "/R3K2k4 w - - 0 1"
+
+
+def test_positions_round_trip():
+    games = [Game(), Game.from_fen("8/8/8/4k3/8/8/8/4K2R b - - 0 1")]
+    with PositionBatch.from_games(games) as batch:
+        for index, game in enumerate(games):
+            decoded = batch.get_position(index)
+            assert decoded.to_fen() == game.to_fen()
+
+
+@pytest.mark.parametrize("order", [(False, True), (True, False)])
+def test_mixed_board_sizes_are_rejected(order):
+    games = [Game.from_fen(LARGE_FEN) if large else Game() for large in order]
+    with pytest.raises(ValueError, match="batch holds"):
+        PositionBatch.from_games(games)
+
+
+def test_set_position_checks_board_size():
+    with PositionBatch(1) as batch:
+        with pytest.raises(ValueError):
+            batch.set_position(0, Game.from_fen(LARGE_FEN))
@@ -0,0 +1,51 @@
+"""The packed move path must order and search exactly like the (start, end) tuple path."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from game import Game  # noqa: E402
+from move_ordering import MoveOrderer, UnorderedMoves  # noqa: E402
+from moves import new_buffer, generate_moves, to_tuples, unpack  # noqa: E402
+from search import Searcher, capture_moves, pseudo_legal_moves  # noqa: E402
+
+FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1",
+    "r2q1rk1/pp2bppp/2n1bn2/2ppp3/4P3/2PP1NP1/PP1N1PBP/R1BQ1RK1 w - - 0 1",
+    "8/5pk1/6p1/8/1r6/6P1/R4PK1/8 b - - 0 1",
+]
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_ordered_packed_matches_ordered(fen):
+    game = Game.from_fen(fen)
+    board = game.board
+    orderer = MoveOrderer()
+    moves = pseudo_legal_moves(game, game.turn)
+    # Give killers, history and a hash move something to rank
+    orderer.record_cutoff(board, moves[-1], 2, 3)
+    orderer.record_cutoff(board, moves[-2], 2, 2)
+    orderer.record_cutoff(board, moves[len(moves) // 2], 5, 4)
+    buffer = new_buffer()
+    count = generate_moves(board, game.turn, buffer)
+    for ply, hash_move in ((0, None), (2, moves[3]), (5, moves[0])):
+        expected = list(orderer.ordered(board, moves, ply, hash_move))
+        assert [unpack(move) for move in orderer.ordered_packed(board, buffer, count, ply, hash_move)] == expected
+    captures = list(orderer.ordered(board, capture_moves(game, game.turn), 0))
+    assert [unpack(move) for move in orderer.ordered_packed(board, buffer, count, 0, captures_only=True)] == captures
+    assert [unpack(move) for move in UnorderedMoves().ordered_packed(board, buffer, count, 0)] == \
+        to_tuples(buffer, count)
+
+
+@pytest.mark.parametrize("fen", FENS)
+def test_packed_search_matches_tuple_search(fen):
+    results = []
+    for packed_moves in (True, False):
+        game = Game.from_fen(fen)
+        result = Searcher(game, packed_moves=packed_moves).iterative_deepening(3)
+        assert game.to_fen() == Game.from_fen(fen).to_fen()
+        results.append(result)
+    assert results[0] == results[1]
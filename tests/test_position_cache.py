@@ -0,0 +1,107 @@
+"""Tests for the shared position cache: LRU eviction, byte accounting and Game wiring."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from game import Game  # noqa: E402
+from position_cache import ENTRY_BYTES, MOVE_BYTES, PositionCache  # noqa: E402
+from search import Searcher  # noqa: E402
+
+MOVES = {(0, 0): [(0, 1), (0, 2)], (1, 0): [(2, 2)]}
+
+
+def key(number: int):
+    return number, 8, 8
+
+
+def test_hits_misses_and_costs():
+    cache = PositionCache()
+    assert cache.get_check(key(1), "white") is None
+    cache.put_check(key(1), "white", True)
+    cache.put_legal_moves(key(1), MOVES)
+    assert cache.get_check(key(1), "white") is True
+    assert cache.get_check(key(1), "black") is None
+    assert cache.get_legal_moves(key(1)) == MOVES
+    assert cache.bytes == ENTRY_BYTES + 3 * MOVE_BYTES
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 2, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_results_are_not_overwritten():
+    cache = PositionCache()
+    cache.put_legal_moves(key(1), MOVES)
+    cache.put_legal_moves(key(1), {})
+    assert cache.get_legal_moves(key(1)) == MOVES
+    assert cache.bytes == ENTRY_BYTES + 3 * MOVE_BYTES
+
+
+def test_least_recently_used_is_evicted():
+    cache = PositionCache(max_bytes=3 * ENTRY_BYTES)
+    for number in range(3):
+        cache.put_check(key(number), "white", False)
+    # Touching entry 0 makes entry 1 the oldest
+    assert cache.get_check(key(0), "white") is False
+    cache.put_check(key(3), "white", False)
+    assert len(cache) == 3
+    assert cache.get_check(key(1), "white") is None
+    assert cache.get_check(key(0), "white") is False
+    assert cache.evictions == 1
+    assert cache.bytes == 3 * ENTRY_BYTES
+
+
+def test_byte_accounting_survives_eviction_and_invalidation():
+    cache = PositionCache(max_bytes=ENTRY_BYTES * 4 + MOVE_BYTES * 10)
+    for number in range(50):
+        cache.put_check(key(number), "black", True)
+        if number % 3 == 0:
+            cache.put_legal_moves(key(number), MOVES)
+        assert cache.bytes <= cache.max_bytes
+    expected = sum(ENTRY_BYTES + (3 * MOVE_BYTES if number % 3 == 0 else 0)
+                   for number in range(50) if cache.get_check(key(number), "black") is not None)
+    assert cache.bytes == expected
+
+    cached = next(number for number in range(50) if cache.get_check(key(number), "black") is not None)
+    assert cache.invalidate(key(cached))
+    assert not cache.invalidate(key(cached))
+    cache.clear()
+    assert (len(cache), cache.bytes) == (0, 0)
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = PositionCache(max_bytes=1)
+    cache.put_legal_moves(key(1), MOVES)
+    assert cache.get_legal_moves(key(1)) == MOVES
+    cache.put_check(key(2), "white", False)
+    assert len(cache) == 1
+
+
+def test_board_size_is_part_of_the_key():
+    cache = PositionCache()
+    small = Game.from_fen("8/8/8/8/8/8/8/R3K2k w - - 0 1")
+    large = Game.from_fen("/".join(["12"] * 11) + "/R3K2k4 w - - 0 1")
+    small.cache = large.cache = cache
+    assert small.position_hash() == large.position_hash()
+    assert len(small.legal_targets((0, 0))) == 10
+    assert len(large.legal_targets((0, 0))) == 14
+
+
+def test_moves_and_edits_never_serve_stale_results():
+    cache = PositionCache()
+    game = Game(cache=cache)
+    before = game.legal_targets((4, 1))
+    game.make_move((4, 1), (4, 3))
+    game.make_move((4, 6), (4, 4))
+    assert game.legal_targets((4, 3)) == []
+    game.unmake_move()
+    game.unmake_move()
+    assert game.legal_targets((4, 1)) == before
+
+
+def test_search_leaves_the_cache_alone():
+    cache = PositionCache()
+    game = Game(cache=cache)
+    Searcher(game).search(3)
+    assert len(cache) == 0
@@ -0,0 +1,107 @@
+"""Tests for the position index: a multi-run build must match a brute-force replay."""
+
+import os
+import random
+import sys
+from collections import defaultdict
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from archive import ArchiveWriter, GameArchive  # noqa: E402
+from game import Game  # noqa: E402
+from position_index import PositionIndex, build_index  # noqa: E402
+from search import legal_moves  # noqa: E402
+
+RESULT_SLOTS = {"1-0": "white", "1/2-1/2": "draws", "0-1": "black"}
+
+
+@pytest.fixture(scope="module")
+def archive_path(tmp_path_factory):
+    """Random games from the start position, so early positions are shared."""
+    path = tmp_path_factory.mktemp("archive")
+    rng = random.Random(7)
+    with ArchiveWriter(str(path), sync=False) as writer:
+        for _ in range(60):
+            game = Game()
+            for _ in range(rng.randrange(0, 12)):
+                moves = legal_moves(game, game.turn)
+                # Favour a few moves so games transpose and repeat openings
+                game.make_move(*rng.choice(moves[:3] if rng.random() < 0.7 else moves))
+            writer.append_game(game, rng.choice(["1-0", "0-1", "1/2-1/2", "*"]))
+    return str(path)
+
+
+def brute_force(archive: GameArchive, plies=None) -> dict:
+    """Explorer statistics per position hash, from replaying every game."""
+    stats = defaultdict(lambda: {'games': 0, 'white': 0, 'draws': 0, 'black': 0,
+                                 'moves': defaultdict(lambda: [0, 0, 0, 0]), 'postings': []})
+    for game_id, record in enumerate(archive):
+        game = Game.from_fen(record['start_fen'])
+        moves = record['moves'][:plies] if plies is not None else record['moves']
+        seen = set()
+        for ply in range(len(moves) + 1):
+            key = game.position_hash()
+            if key not in seen:
+                seen.add(key)
+                entry = stats[key]
+                entry['games'] += 1
+                entry['postings'].append((game_id, ply))
+                slot = RESULT_SLOTS.get(record['result'])
+                if slot:
+                    entry[slot] += 1
+                if ply < len(moves):
+                    move = entry['moves'][moves[ply]]
+                    move[0] += 1
+                    if slot:
+                        move[1 + list(RESULT_SLOTS.values()).index(slot)] += 1
+            if ply < len(moves):
+                game.make_move(*moves[ply])
+    return stats
+
+
+@pytest.mark.parametrize("run_size, plies", [(1 << 20, None), (17, None), (5, 4)])
+def test_lookup_matches_brute_force(archive_path, tmp_path, run_size, plies):
+    index_path = str(tmp_path / "games.pidx")
+    with GameArchive(archive_path) as archive:
+        counts = build_index(archive, index_path, plies, run_size)
+        expected = brute_force(archive, plies)
+    assert counts['games'] == 60
+    assert counts['positions'] == len(expected)
+    assert counts['postings'] == sum(entry['games'] for entry in expected.values())
+    # Only the temporary runs' directory is gone afterwards
+    assert os.listdir(tmp_path) == ["games.pidx"]
+
+    with PositionIndex(index_path) as index:
+        assert len(index) == len(expected)
+        for key, entry in expected.items():
+            found = index.lookup(key)
+            assert {name: found[name] for name in ('games', 'white', 'draws', 'black')} == \
+                {name: entry[name] for name in ('games', 'white', 'draws', 'black')}
+            assert {row['move']: [row['games'], row['white'], row['draws'], row['black']]
+                    for row in found['moves']} == dict(entry['moves'])
+            # Most played first
+            assert [row['games'] for row in found['moves']] == \
+                sorted((row['games'] for row in found['moves']), reverse=True)
+            assert index.games(key) == entry['postings']
+            assert index.games(key, limit=1) == entry['postings'][:1]
+        assert index.lookup(12345) is None
+        assert index.games(12345) == []
+
+
+def test_start_position_counts_every_game(archive_path, tmp_path):
+    index_path = str(tmp_path / "games.pidx")
+    with GameArchive(archive_path) as archive:
+        build_index(archive, index_path)
+    with PositionIndex(index_path) as index:
+        entry = index.lookup(Game().position_hash())
+        assert entry['games'] == 60
+        assert sum(row['games'] for row in entry['moves']) <= 60
+
+
+def test_not_an_index(tmp_path):
+    path = tmp_path / "empty.pidx"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError):
+        PositionIndex(str(path))
@@ -0,0 +1,140 @@
+"""
+Consistency checks for the generated endgame tablebases.
+
+Every position's stored value must follow from the values of the positions its
+legal moves reach, as played by the real Game: a mate or stalemate with no
+moves, the fastest win when any move reaches a lost position, the longest
+resistance when every move reaches a won one, and a draw otherwise.
+
+KQK and KRK take seconds. KRRK, which checks that defender captures are scored
+from the KRK table, takes minutes like every class with two pieces beside the
+king, so its tests are marked slow and only run with --run-slow.
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from game import Game  # noqa: E402
+from search import legal_moves  # noqa: E402
+from tablebase import SIZE, Tablebases, generate  # noqa: E402
+
+SAMPLES = 400
+
+
+def _generate(directory, names):
+    generated = {}
+    for name in names:
+        generate(name, str(directory / f"{name}.tb"), generated)
+    return Tablebases(str(directory))
+
+
+@pytest.fixture(scope="module")
+def tablebases(tmp_path_factory):
+    tables = _generate(tmp_path_factory.mktemp("tablebases"), ("KQK", "KRK"))
+    yield tables
+    tables.close()
+
+
+@pytest.fixture(scope="module")
+def krrk_tablebases(tmp_path_factory):
+    # KRRK reuses KRK for the positions after a rook capture
+    tables = _generate(tmp_path_factory.mktemp("krrk"), ("KRK", "KRRK"))
+    yield tables
+    tables.close()
+
+
+def position_fen(name: str, squares, turn: str) -> str:
+    """FEN with the strong king, the pieces of name and the lone king on squares."""
+    letters = ["K"] + list(name[1:-1]) + ["k"]
+    grid = [[None] * SIZE for _ in range(SIZE)]
+    for letter, square in zip(letters, squares):
+        grid[square // SIZE][square % SIZE] = letter
+    ranks = []
+    for row in reversed(grid):
+        rank, empty = "", 0
+        for letter in row:
+            if letter is None:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += letter
+        ranks.append(rank + (str(empty) if empty else ""))
+    return f"{'/'.join(ranks)} {turn} - - 0 1"
+
+
+def random_positions(name: str, turn: str, count: int, seed: str):
+    """Yield count legal positions of a material class with turn to move."""
+    rng = random.Random(seed)
+    waiting = "black" if turn == "w" else "white"
+    found = 0
+    while found < count:
+        squares = rng.sample(range(SIZE * SIZE), len(name))
+        game = Game.from_fen(position_fen(name, squares, turn))
+        if game.is_check(waiting):
+            continue
+        found += 1
+        yield game
+
+
+def expected_value(tablebases: Tablebases, game: Game) -> dict:
+    """The probe result the successors of game imply."""
+    moves = legal_moves(game, game.turn)
+    if not moves:
+        if game.is_check(game.turn):
+            return {'result': 'loss', 'dtm': 0}
+        return {'result': 'draw', 'dtm': None}
+    wins, losses = [], []
+    for move in moves:
+        game.make_move(*move)
+        entry = tablebases.probe(game)
+        game.unmake_move()
+        # No table applies once too little material is left to mate
+        if entry is None or entry['result'] == 'draw':
+            continue
+        (losses if entry['result'] == 'win' else wins).append(entry['dtm'])
+    if wins:
+        return {'result': 'win', 'dtm': 1 + min(wins)}
+    if len(losses) == len(moves):
+        return {'result': 'loss', 'dtm': 1 + max(losses)}
+    return {'result': 'draw', 'dtm': None}
+
+
+def check_successors(tablebases: Tablebases, name: str, turn: str) -> None:
+    for game in random_positions(name, turn, SAMPLES, seed=name + turn):
+        assert tablebases.probe(game) == expected_value(tablebases, game), game.to_fen()
+
+
+@pytest.mark.parametrize("name", ["KQK", "KRK"])
+@pytest.mark.parametrize("turn", ["w", "b"])
+def test_values_follow_from_successors(tablebases, name, turn):
+    check_successors(tablebases, name, turn)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("turn", ["w", "b"])
+def test_krrk_values_follow_from_successors(krrk_tablebases, turn):
+    check_successors(krrk_tablebases, "KRRK", turn)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("fen", [
+    "R7/8/8/8/8/2k5/1R6/7K b - - 0 1",
+    "8/8/8/8/8/2k5/1R6/R6K b - - 0 1",
+])
+def test_capture_into_won_class_still_loses(krrk_tablebases, fen):
+    game = Game.from_fen(fen)
+    entry = krrk_tablebases.probe(game)
+    assert entry['result'] == 'loss'
+    assert entry == expected_value(krrk_tablebases, game)
+
+
+def test_pawn_classes_are_rejected():
+    with pytest.raises(ValueError):
+        generate("KPK")
@@ -0,0 +1,59 @@
+"""Tests for the match schedule and the Elo/SPRT statistics."""
+
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from tournament import (DEFAULT_OPENINGS, elo_estimate, elo_from_score, expected_score,  # noqa: E402
+                        opening_schedule, sprt_bounds, sprt_llr)
+
+
+def test_schedule_never_repeats_a_game():
+    schedule = opening_schedule(100)
+    assert len(schedule) == 100
+    assert len(set(schedule)) == 100
+    # Every start is played once with each color
+    starts = [fen for fen, _ in schedule]
+    assert all(starts.count(fen) == 2 for fen in starts)
+    assert starts[:2 * len(DEFAULT_OPENINGS):2] == DEFAULT_OPENINGS
+
+
+def test_schedule_is_reproducible():
+    assert opening_schedule(40, seed=3) == opening_schedule(40, seed=3)
+    assert opening_schedule(40, seed=3) != opening_schedule(40, seed=4)
+
+
+def test_schedule_without_variation_is_capped():
+    assert len(opening_schedule(2 * len(DEFAULT_OPENINGS), random_plies=0)) == 16
+    with pytest.raises(ValueError):
+        opening_schedule(2 * len(DEFAULT_OPENINGS) + 1, random_plies=0)
+
+
+def test_elo_and_score_are_inverse():
+    for elo in (-400, -50, 0, 35, 200):
+        assert elo_from_score(expected_score(elo)) == pytest.approx(elo)
+    assert expected_score(0) == 0.5
+
+
+def test_elo_estimate():
+    elo, error = elo_estimate(60, 20, 20)
+    assert elo == pytest.approx(elo_from_score(0.7))
+    assert 0 < error < math.inf
+    # More games of the same shape narrow the interval
+    assert elo_estimate(600, 200, 200)[1] < error
+    assert elo_estimate(0, 0, 0) == (0.0, math.inf)
+    assert elo_estimate(0, 10, 0) == (0.0, math.inf)
+
+
+def test_sprt():
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert lower == pytest.approx(-math.log(19))
+    assert upper == pytest.approx(math.log(19))
+    # A clearly stronger engine accepts H1, an equal one drifts towards H0
+    assert sprt_llr(600, 200, 200, 0, 10) >= upper
+    assert sprt_llr(300, 400, 300, 0, 10) < 0
+    assert sprt_llr(0, 0, 0, 0, 10) == 0.0
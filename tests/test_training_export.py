@@ -0,0 +1,115 @@
+"""Tests for the .npy shard writer: headers patched on close must describe the data exactly."""
+
+import ast
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from archive import ArchiveWriter  # noqa: E402
+from game import Game  # noqa: E402
+from training_export import (NPY_MAGIC, PLANES, RECORD_TAIL, ShardWriter, encode_position,  # noqa: E402
+                             export_archive, npy_descr, npy_header, record_size)
+
+RECORD_SIZE = record_size()
+
+
+def read_npy(path: str):
+    """Parse a version 1.0 .npy file by hand: (header dict, data offset, data bytes)."""
+    with open(path, "rb") as f:
+        content = f.read()
+    assert content[:len(NPY_MAGIC)] == NPY_MAGIC
+    (length,) = struct.unpack_from("<H", content, len(NPY_MAGIC))
+    start = len(NPY_MAGIC) + 2
+    text = content[start:start + length].decode("latin1")
+    assert text.endswith("\n")
+    return ast.literal_eval(text.strip()), start + length, content[start + length:]
+
+
+def records(count: int, start: int = 0) -> bytes:
+    # Distinct scores make every record recognisable
+    return b"".join(encode_position(Game(), 0, score) for score in range(start, start + count))
+
+
+def scores(data: bytes):
+    return [RECORD_TAIL.unpack_from(data, offset + RECORD_SIZE - RECORD_TAIL.size)[2]
+            for offset in range(0, len(data), RECORD_SIZE)]
+
+
+def test_header_layout():
+    header = npy_header(npy_descr(), 12)
+    assert len(header) % 64 == 0
+    # Padding to a reserved length keeps the data offset when the count shrinks
+    assert len(npy_header(npy_descr(), 3, len(header))) == len(header)
+    with pytest.raises(ValueError):
+        npy_header(npy_descr(), 10 ** 12, 64)
+
+
+@pytest.mark.parametrize("chunks", [[12], [1] * 12, [5, 4, 3], [7, 5]])
+def test_shards_are_split_and_patched(tmp_path, chunks):
+    with ShardWriter(str(tmp_path), shard_size=5, flush_records=3) as writer:
+        written = 0
+        for chunk in chunks:
+            writer.write(records(chunk, written))
+            written += chunk
+    assert writer.positions == 12
+    assert [os.path.basename(path) for path in writer.shards] == \
+        ["positions-00000.npy", "positions-00001.npy", "positions-00002.npy"]
+
+    offsets = set()
+    all_scores = []
+    for path, count in zip(writer.shards, (5, 5, 2)):
+        header, offset, data = read_npy(path)
+        assert header == {'descr': ast.literal_eval(npy_descr()), 'fortran_order': False, 'shape': (count,)}
+        assert offset % 64 == 0
+        assert len(data) == count * RECORD_SIZE
+        offsets.add(offset)
+        all_scores += scores(data)
+    # Every shard reserved the same header length
+    assert len(offsets) == 1
+    assert all_scores == list(range(12))
+
+
+def test_partial_records_are_rejected(tmp_path):
+    with ShardWriter(str(tmp_path)) as writer:
+        with pytest.raises(ValueError):
+            writer.write(records(1)[:-1])
+
+
+def test_record_planes():
+    record = encode_position(Game.from_fen("8/8/8/8/8/8/8/4K2k b - - 0 1"), -1, -2_000_000)
+    planes, tail = record[:PLANES * 64], record[PLANES * 64:]
+    white_king, black_king = PLANES // 2 - 1, PLANES - 1
+    assert [index for index, value in enumerate(planes) if value] == [white_king * 64 + 4, black_king * 64 + 7]
+    # Black to move, result and a score clamped into range
+    assert RECORD_TAIL.unpack(tail) == (1, -1, -1_000_000)
+
+
+def test_export_archive_labels_finished_games(tmp_path):
+    with ArchiveWriter(str(tmp_path / "games"), sync=False) as archive:
+        for result in ("1-0", "*", "0-1"):
+            game = Game()
+            game.make_move((4, 1), (4, 3))
+            game.make_move((4, 6), (4, 4))
+            archive.append_game(game, result)
+    report = export_archive(str(tmp_path / "games"), str(tmp_path / "data"), workers=1)
+    # Two plies each from the two finished games; the unfinished one has no label
+    assert report['positions'] == 4
+    header, _, data = read_npy(report['shards'][0])
+    assert header['shape'] == (4,)
+    results = [RECORD_TAIL.unpack_from(data, offset + RECORD_SIZE - RECORD_TAIL.size)[1]
+               for offset in range(0, len(data), RECORD_SIZE)]
+    assert results == [1, 1, -1, -1]
+
+
+def test_numpy_loads_shards(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    with ShardWriter(str(tmp_path), shard_size=4) as writer:
+        writer.write(records(6))
+    first = numpy.load(writer.shards[0])
+    assert first.shape == (4,)
+    assert first['planes'].shape == (4, PLANES, 8, 8)
+    assert list(numpy.load(writer.shards[1])['score']) == [4, 5]